@@ -0,0 +1,98 @@
+"""
+Інвалідація кешу за тегами (лічильники поколінь)
+
+cache.clear() у продакшені видаляє не тільки сторінки: з REDIS_URL сесії
+(кошик, обране) теж лежать у кеші. Тому закешовані записи реєструються під
+тегами - "home", "menu", "pixels", "search", "catalog", "sale",
+"category:<id>" - і скидаються тільки ті, що змінились.
+
+Для кожного тегу в кеші лежить номер покоління, який входить у ключ
+запису. invalidate(tag) збільшує покоління: старі записи перестають
+читатись і вичищаються кешем за своїм timeout.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.views.decorators.cache import cache_page as django_cache_page
+
+
+# Теги, під якими реєструється кожна сторінка (меню і пікселі є в base.html)
+PAGE_TAGS = ('menu', 'pixels')
+
+
+# Кеш у пам'яті процесу: інші процеси (cron, воркер задач) його не бачать
+LOCAL_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def is_shared():
+    """Чи бачить веб-сервіс invalidate() і прогрів з іншого процесу"""
+    return settings.CACHES['default']['BACKEND'] not in LOCAL_BACKENDS
+
+
+def _generation_key(tag):
+    return f'tag-gen:{tag}'
+
+
+def _new_generation():
+    # Після втрати лічильника (рестарт Redis) нове покоління не збіжеться зі старим
+    return int(time.time() * 1000)
+
+
+def generations(tags):
+    """Поточні покоління тегів (одним get_many; відсутні створюються)"""
+    keys = [_generation_key(tag) for tag in tags]
+    found = cache.get_many(keys)
+    missing = [key for key in keys if key not in found]
+    if missing:
+        for key in missing:
+            cache.add(key, _new_generation(), None)
+        found.update(cache.get_many(missing))
+    return [found.get(key, 0) for key in keys]
+
+
+def tagged_key(key, tags):
+    """Ключ запису з поколіннями його тегів"""
+    tags = sorted(set(tags))
+    version = ':'.join(f'{tag}={generation}' for tag, generation in zip(tags, generations(tags)))
+    return f'{key}:{hashlib.md5(version.encode()).hexdigest()[:12]}'
+
+
+def get_cached(key, tags, default=None):
+    return cache.get(tagged_key(key, tags), default)
+
+
+def set_cached(key, value, timeout, tags):
+    cache.set(tagged_key(key, tags), value, timeout)
+
+
+def invalidate(*tags):
+    """Скидає всі записи, зареєстровані під будь-яким з тегів"""
+    for tag in dict.fromkeys(tags):
+        key = _generation_key(tag)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _new_generation(), None)
+
+
+def cache_page(timeout, tags=()):
+    """
+    cache_page з тегами: покоління тегів входять у key_prefix сторінки
+
+    Args:
+        tags: список тегів або функція (request, *args, **kwargs) -> список
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            view_tags = tags(request, *args, **kwargs) if callable(tags) else tags
+            key_prefix = tagged_key('page', [*PAGE_TAGS, *view_tags])
+            return django_cache_page(timeout, key_prefix=key_prefix)(view)(request, *args, **kwargs)
+        return wrapper
+    return decorator
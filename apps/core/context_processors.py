@@ -1,27 +1,11 @@
-from apps.products.models import Category
 from apps.cart.cart import Cart
 from apps.wishlist.wishlist import Wishlist
-from django.db.models import Prefetch, Count, Q
-from django.core.cache import cache
+from apps.products.services.category_tree import get_tree
 
 
 def base_context(request):
-    main_categories = cache.get('main_categories_menu')
-    
-    if main_categories is None:
-        children_queryset = Category.objects.filter(
-            is_active=True,
-            parent__isnull=False
-        ).select_related('parent').only('id', 'name', 'slug', 'parent_id', 'sort_order')
-        
-        main_categories = list(Category.objects.filter(
-            parent=None, 
-            is_active=True
-        ).prefetch_related(
-            Prefetch('children', queryset=children_queryset)
-        ).only('id', 'name', 'slug', 'sort_order').order_by('sort_order', 'name'))
-        
-        cache.set('main_categories_menu', main_categories, 3600)
+    # Меню з дерева категорій процесу - без запиту до бази і кешу
+    main_categories = get_tree().menu()
     
     context = {
         'main_categories': main_categories,
@@ -2,7 +2,10 @@
 Моделі для core додатку - банери головної сторінки
 """
 from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.core.validators import FileExtensionValidator
+from apps.core.cache_tags import invalidate
 
 
 class Banner(models.Model):
@@ -80,10 +83,6 @@ class Banner(models.Model):
         if not self.alt_text:
             self.alt_text = f"Банер: {self.title}"
         super().save(*args, **kwargs)
-        
-        # Очищаємо кеш головної сторінки при зміні банерів
-        from django.core.cache import cache
-        cache.clear()
 
 
 
@@ -146,10 +145,6 @@ class SiteSettings(models.Model):
         if not self.pk and SiteSettings.objects.exists():
             return
         super().save(*args, **kwargs)
-        
-        # Очищаємо кеш головної сторінки при зміні налаштувань
-        from django.core.cache import cache
-        cache.clear()
 
 
 class TrackingPixel(models.Model):
@@ -230,3 +225,16 @@ class TrackingPixel(models.Model):
     
     def __str__(self):
         return f"{self.name} ({self.get_pixel_type_display()})"
+
+
+@receiver([post_save, post_delete], sender=Banner)
+def banner_changed(sender, **kwargs):
+    """Банери є тільки на головній - скидаємо її кеш"""
+    invalidate('home')
+
+
+@receiver([post_save, post_delete], sender=SiteSettings)
+@receiver([post_save, post_delete], sender=TrackingPixel)
+def pixels_changed(sender, **kwargs):
+    """Коди пікселів вбудовані в кожну сторінку (тег "pixels")"""
+    invalidate('pixels')
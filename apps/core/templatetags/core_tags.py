@@ -2,15 +2,31 @@
 Template tags для Core контенту
 """
 from django import template
+from apps.core.cache_tags import get_cached, set_cached
 from apps.core.models import TrackingPixel, SiteSettings
 
 register = template.Library()
 
+# Скидаються сигналами моделей (тег "pixels")
+PIXELS_TIMEOUT = 60 * 60
+
 
 @register.simple_tag
 def get_site_settings():
     """Отримати глобальні налаштування сайту"""
-    return SiteSettings.objects.first()
+    site_settings = get_cached('site_settings', ['pixels'])
+    if site_settings is None:
+        site_settings = SiteSettings.objects.first()
+        set_cached('site_settings', site_settings, PIXELS_TIMEOUT, ['pixels'])
+    return site_settings
+
+
+def _active_pixels():
+    pixels = get_cached('tracking_pixels', ['pixels'])
+    if pixels is None:
+        pixels = list(TrackingPixel.objects.filter(is_active=True))
+        set_cached('tracking_pixels', pixels, PIXELS_TIMEOUT, ['pixels'])
+    return pixels
 
 
 @register.simple_tag(takes_context=True)
@@ -19,7 +35,7 @@ def get_tracking_pixels(context):
     request = context.get('request')
     if not request:
         # Якщо немає request, повертаємо всі активні
-        return TrackingPixel.objects.filter(is_active=True)
+        return _active_pixels()
     
     # Визначаємо поточну сторінку за URL
     path = request.path.rstrip('/')
@@ -53,7 +69,7 @@ def get_tracking_pixels(context):
         current_page = 'order'
     
     # Отримуємо всі активні піксель
-    all_pixels = TrackingPixel.objects.filter(is_active=True)
+    all_pixels = _active_pixels()
     
     # Фільтруємо за сторінками
     filtered_pixels = []
@@ -4,11 +4,12 @@ Core Views - основні представлення сайту
 from django.shortcuts import render
 from django.views.generic import TemplateView
 from django.http import JsonResponse, HttpResponse
-from django.db.models import Q, Prefetch
+from django.db.models import Q
 from django.db import connection
-from django.views.decorators.cache import cache_page
 from django.utils.decorators import method_decorator
+from apps.core.cache_tags import cache_page, get_cached, set_cached
 from apps.products.models import Product, Category, ProductReview
+from apps.products.services.product_cards import CARD_FIELDS
 from .models import Banner
 
 # PostgreSQL Full-Text Search (якщо доступний)
@@ -24,7 +25,7 @@ def healthcheck(request):
     return HttpResponse("OK", status=200)
 
 
-@method_decorator(cache_page(60 * 10), name='dispatch')
+@method_decorator(cache_page(60 * 10, ['home']), name='dispatch')
 class HomeView(TemplateView):
     """Головна сторінка"""
     template_name = 'core/home.html'
@@ -39,8 +40,6 @@ class HomeView(TemplateView):
         from django.utils import timezone
         now = timezone.now()
         
-        from apps.products.models import ProductImage
-        
         sale_products = Product.objects.filter(
             is_active=True,
             is_sale=True,
@@ -50,23 +49,15 @@ class HomeView(TemplateView):
             Q(sale_start_date__isnull=True) | Q(sale_start_date__lte=now)
         ).filter(
             Q(sale_end_date__isnull=True) | Q(sale_end_date__gt=now)
-        ).select_related('primary_category').prefetch_related(
-            Prefetch('images',
-                queryset=ProductImage.objects.filter(is_main=True).only('image', 'image_url', 'is_main', 'product_id'),
-                to_attr='main_images'
-            )
-        ).order_by('sort_order', '-created_at')[:8]
+        ).only(*CARD_FIELDS).order_by('sort_order', '-created_at')[:8]
         
         from apps.products.models import TopProduct
         top_product_entries = TopProduct.objects.filter(
             is_active=True,
             product__is_active=True,
             product__stock__gt=0
-        ).select_related('product__primary_category').prefetch_related(
-            Prefetch('product__images',
-                queryset=ProductImage.objects.filter(is_main=True).only('image', 'image_url', 'is_main', 'product_id'),
-                to_attr='main_images'
-            )
+        ).select_related('product').only(
+            'product', *(f'product__{field}' for field in CARD_FIELDS)
         ).order_by('sort_order', '-created_at')[:8]
         
         top_products = [entry.product for entry in top_product_entries]
@@ -74,12 +65,7 @@ class HomeView(TemplateView):
         # Отримуємо схвалені відгуки
         reviews = ProductReview.objects.filter(
             is_approved=True
-        ).select_related('product').prefetch_related(
-            Prefetch('product__images',
-                queryset=ProductImage.objects.filter(is_main=True).only('image', 'image_url', 'is_main', 'product_id'),
-                to_attr='main_images'
-            )
-        ).order_by('-created_at')[:6]
+        ).select_related('product').order_by('-created_at')[:6]
         
         context.update({
             'banners': banners,
@@ -125,15 +111,13 @@ class SearchView(TemplateView):
     template_name = 'core/search.html'
     
     def get_context_data(self, **kwargs):
-        from django.core.cache import cache
-        
         context = super().get_context_data(**kwargs)
         query = self.request.GET.get('q', '').strip()
         
         if query:
             # Перевіряємо кеш
             cache_key = f'search_initial:{query.lower()}'
-            cached_data = cache.get(cache_key)
+            cached_data = get_cached(cache_key, ['search'])
             
             if cached_data:
                 context.update(cached_data)
@@ -152,11 +136,7 @@ class SearchView(TemplateView):
                         similarity=TrigramSimilarity('name', query)
                     ).filter(
                         Q(name__icontains=query) | Q(similarity__gt=0.3)
-                    ).order_by('-similarity', 'name').select_related('primary_category').only(
-                        'id', 'name', 'slug', 'retail_price', 'sale_price', 'is_sale',
-                        'sale_start_date', 'sale_end_date', 'is_top', 'is_new',
-                        'primary_category__name', 'primary_category__slug'
-                    ).distinct()[:20]
+                    ).order_by('-similarity', 'name').only(*CARD_FIELDS).distinct()[:20]
                 else:
                     products = Product.objects.filter(
                         is_active=True,
@@ -165,11 +145,7 @@ class SearchView(TemplateView):
                         Q(name__icontains=query) | 
                         Q(sku__icontains=query) |
                         Q(primary_category__name__icontains=query)
-                    ).select_related('primary_category').only(
-                        'id', 'name', 'slug', 'retail_price', 'sale_price', 'is_sale',
-                        'sale_start_date', 'sale_end_date', 'is_top', 'is_new',
-                        'primary_category__name', 'primary_category__slug'
-                    ).order_by('name').distinct()[:20]
+                    ).only(*CARD_FIELDS).order_by('name').distinct()[:20]
                 
                 data = {
                     'products': products,
@@ -178,7 +154,7 @@ class SearchView(TemplateView):
                 }
                 
                 # Кешуємо на 5 хвилин
-                cache.set(cache_key, data, 300)
+                set_cached(cache_key, data, 300, ['search'])
                 context.update(data)
         
         return context
@@ -192,8 +168,6 @@ def search_autocomplete(request):
         return JsonResponse({'results': []})
     
     try:
-        from apps.products.models import ProductImage
-        
         db_engine = connection.settings_dict['ENGINE']
         use_postgres_search = 'postgresql' in db_engine and POSTGRES_AVAILABLE
         
@@ -207,15 +181,7 @@ def search_autocomplete(request):
                 similarity=TrigramSimilarity('name', query)
             ).filter(
                 Q(name__icontains=query) | Q(similarity__gt=0.4)
-            ).order_by('-similarity', 'name').select_related('primary_category').prefetch_related(
-                Prefetch('images', 
-                    queryset=ProductImage.objects.filter(is_main=True).only('image', 'image_url', 'is_main'),
-                    to_attr='main_images'
-                )
-            ).only(
-                'id', 'name', 'slug', 'retail_price', 'sale_price', 'is_sale', 
-                'sale_start_date', 'sale_end_date', 'primary_category__name', 'primary_category__slug'
-            )[:5]
+            ).order_by('-similarity', 'name').only(*CARD_FIELDS)[:5]
         else:
             products = Product.objects.filter(
                 is_active=True,
@@ -224,22 +190,11 @@ def search_autocomplete(request):
                 Q(name__icontains=query) | 
                 Q(sku__icontains=query) |
                 Q(primary_category__name__icontains=query)
-            ).select_related('primary_category').prefetch_related(
-                Prefetch('images',
-                    queryset=ProductImage.objects.filter(is_main=True).only('image', 'image_url', 'is_main'),
-                    to_attr='main_images'
-                )
-            ).only(
-                'id', 'name', 'slug', 'retail_price', 'sale_price', 'is_sale',
-                'sale_start_date', 'sale_end_date', 'primary_category__name', 'primary_category__slug'
-            ).order_by('name')[:5]
+            ).only(*CARD_FIELDS).order_by('name')[:5]
         
         results = []
         for p in products:
-            image_url = None
-            if hasattr(p, 'main_images') and p.main_images:
-                img = p.main_images[0]
-                image_url = img.image_url if img.image_url else (img.image.url if img.image else None)
+            image_url = p.thumbnail_url or None
             
             price = p.sale_price if p.is_sale_active() else p.retail_price
             
@@ -260,8 +215,6 @@ def search_autocomplete(request):
 
 def search_paginated(request):
     """API для пагінованого пошуку - оптимізований з кешуванням"""
-    from django.core.cache import cache
-    
     query = request.GET.get('q', '').strip()
     page = int(request.GET.get('page', 1))
     per_page = int(request.GET.get('per_page', 20))
@@ -271,7 +224,7 @@ def search_paginated(request):
     
     # Перевіряємо кеш
     cache_key = f'search:{query.lower()}:page{page}:per{per_page}'
-    cached_result = cache.get(cache_key)
+    cached_result = get_cached(cache_key, ['search'])
     if cached_result:
         return JsonResponse(cached_result)
     
@@ -291,9 +244,7 @@ def search_paginated(request):
             ).filter(
                 Q(name__icontains=query) | Q(similarity__gt=0.3)
             ).order_by('-similarity', 'name').select_related('primary_category').only(
-                'id', 'name', 'slug', 'retail_price', 'sale_price', 'is_sale',
-                'sale_start_date', 'sale_end_date', 'is_top', 'is_new',
-                'primary_category__name', 'primary_category__slug'
+                *CARD_FIELDS, 'primary_category__name'
             ).distinct()
         else:
             base_queryset = Product.objects.filter(
@@ -304,17 +255,15 @@ def search_paginated(request):
                 Q(sku__icontains=query) |
                 Q(primary_category__name__icontains=query)
             ).select_related('primary_category').only(
-                'id', 'name', 'slug', 'retail_price', 'sale_price', 'is_sale',
-                'sale_start_date', 'sale_end_date', 'is_top', 'is_new',
-                'primary_category__name', 'primary_category__slug'
+                *CARD_FIELDS, 'primary_category__name'
             ).order_by('name').distinct()
         
         # Загальна кількість (кешуємо окремо)
         count_cache_key = f'search_count:{query.lower()}'
-        total_count = cache.get(count_cache_key)
+        total_count = get_cached(count_cache_key, ['search'])
         if total_count is None:
             total_count = base_queryset.count()
-            cache.set(count_cache_key, total_count, 300)  # 5 хвилин
+            set_cached(count_cache_key, total_count, 300, ['search'])  # 5 хвилин
         
         # Пагінація
         offset = (page - 1) * per_page
@@ -323,16 +272,8 @@ def search_paginated(request):
         # Формуємо результати
         results = []
         for p in products:
-            # Отримуємо тільки головне зображення без додаткових запитів
-            image_url = None
-            try:
-                main_image = p.images.filter(is_main=True).only('image', 'image_url').first()
-                if not main_image:
-                    main_image = p.images.only('image', 'image_url').first()
-                if main_image:
-                    image_url = main_image.image_url if main_image.image_url else (main_image.image.url if main_image.image else None)
-            except:
-                pass
+            # Мініатюра - з полів картки, без запиту до картинок
+            image_url = p.thumbnail_url or None
             
             # Перевіряємо наявність
             is_in_stock = p.is_in_stock() if hasattr(p, 'is_in_stock') else True
@@ -371,7 +312,7 @@ def search_paginated(request):
         }
         
         # Кешуємо результат на 5 хвилин
-        cache.set(cache_key, response_data, 300)
+        set_cached(cache_key, response_data, 300, ['search'])
         
         return JsonResponse(response_data)
     except Exception as e:
@@ -236,11 +236,13 @@ class Promotion(models.Model):
         elif self.apply_to == 'non_sale':
             return not product.is_sale_active()
         elif self.apply_to == 'categories':
-            product_categories = list(product.categories.all())
-            if product.primary_category:
-                product_categories.append(product.primary_category)
-            promo_categories = list(self.categories.all())
-            return any(cat in promo_categories for cat in product_categories)
+            # Обрана категорія діє і на всі свої підкатегорії
+            from apps.products.services.category_tree import get_tree
+            product_categories = {category.id for category in product.categories.all()}
+            if product.primary_category_id:
+                product_categories.add(product.primary_category_id)
+            promo_categories = get_tree().subtree_ids(category.id for category in self.categories.all())
+            return not product_categories.isdisjoint(promo_categories)
         return False
     
     def calculate_discount(self, order_total):
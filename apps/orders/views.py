@@ -10,6 +10,7 @@ import json
 import logging
 from apps.cart.cart import Cart
 from apps.products.models import Product
+from apps.products.services.category_membership import refresh_memberships
 from .models import Order, OrderItem, Promotion
 from .forms import OrderCreateForm
 from .services.novapost import NovaPostService
@@ -80,6 +81,7 @@ def order_create(request):
                         order.status = 'confirmed'
                         order.save()
                         
+                        sold_out = []
                         for item in cart:
                             OrderItem.objects.create(
                                 order=order,
@@ -90,6 +92,10 @@ def order_create(request):
                             product = item['product']
                             product.stock -= item['quantity']
                             product.save()
+                            if product.stock <= 0:
+                                sold_out.append(product.id)
+                        # Розпродані товари зникають зі сторінок категорій
+                        refresh_memberships(sold_out)
                         
                         if cart.promo_code:
                             try:
@@ -215,10 +221,14 @@ def order_payment_webhook(request):
                 order.save()
                 
                 # Декрементимо stock (тільки тут!)
+                sold_out = []
                 for item in order.items.all():
                     product = item.product
                     product.stock -= item.quantity
                     product.save()
+                    if product.stock <= 0:
+                        sold_out.append(product.id)
+                refresh_memberships(sold_out)
                 
                 # Промокод
                 if order.promo_code:
@@ -285,10 +295,14 @@ def order_payment_callback(request, order_id):
                         order.save()
                         
                         # Декремент stock
+                        sold_out = []
                         for item in order.items.all():
                             product = item.product
                             product.stock -= item.quantity
                             product.save()
+                            if product.stock <= 0:
+                                sold_out.append(product.id)
+                        refresh_memberships(sold_out)
                         
                         # Промокод
                         if order.promo_code:
@@ -4,11 +4,16 @@ from django.contrib import messages
 from django.db import models
 from django.http import HttpResponse
 from django.utils import timezone
-from django.core.cache import cache
 import csv
+from apps.core.cache_tags import invalidate
 from .models import Category, Product, TopProduct
 from .models_sales import Sale
+from .models_jobs import SyncJob
 from .forms import ProductAdminForm
+from .services.cache_invalidation import category_tags, invalidate_catalog, invalidate_products
+from .services.category_membership import category_product_ids, refresh_category_memberships, refresh_memberships
+from .services.product_cards import category_card_product_ids, refresh_cards
+from .services.sync_engine import FEED_FIELDS
 
 
 @admin.register(Category)
@@ -47,6 +52,29 @@ class CategoryAdmin(admin.ModelAdmin):
     
     def get_queryset(self, request):
         return super().get_queryset(request).select_related('parent')
+    
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        # Батьківська категорія чи активність змінюють сторінки, де показуються товари гілки
+        refresh_category_memberships([obj.pk])
+        if 'slug' in form.changed_data:
+            refresh_cards(category_card_product_ids([obj.pk]))
+        invalidate('menu', *category_tags([obj.pk]))
+    
+    def delete_model(self, request, obj):
+        # Дочірні категорії стають кореневими - товари гілки зникають зі сторінок предків
+        product_ids = category_product_ids([obj.pk])
+        super().delete_model(request, obj)
+        refresh_memberships(product_ids)
+        refresh_cards(product_ids)
+        invalidate_catalog()
+    
+    def delete_queryset(self, request, queryset):
+        product_ids = category_product_ids(queryset.values_list('id', flat=True))
+        super().delete_queryset(request, queryset)
+        refresh_memberships(product_ids)
+        refresh_cards(product_ids)
+        invalidate_catalog()
 
 
 @admin.register(Product)
@@ -93,7 +121,7 @@ class ProductAdmin(admin.ModelAdmin):
     def get_product_image(self, obj):
         main_image = obj.images.filter(is_main=True).first() or obj.images.first()
         if main_image:
-            return format_html('<img src="{}" class="admin-thumbnail-small" />', main_image.get_image_url())
+            return format_html('<img src="{}" class="admin-thumbnail-small" />', main_image.get_image_url('thumb'))
         return format_html('<div class="admin-icon-placeholder">📦</div>')
     get_product_image.short_description = 'Фото'
     
@@ -131,21 +159,25 @@ class ProductAdmin(admin.ModelAdmin):
     
     def mark_as_top(self, request, queryset):
         updated = queryset.update(is_top=True)
+        invalidate_products(queryset.values_list('id', flat=True))
         self.message_user(request, f"Позначено як ХІТ: {updated} товарів", messages.SUCCESS)
     mark_as_top.short_description = "⭐ Позначити ХІТ ПРОДАЖ"
     
     def unmark_as_top(self, request, queryset):
         updated = queryset.update(is_top=False)
+        invalidate_products(queryset.values_list('id', flat=True))
         self.message_user(request, f"Знято ХІТ ПРОДАЖ: {updated} товарів", messages.SUCCESS)
     unmark_as_top.short_description = "Зняти ХІТ ПРОДАЖ"
     
     def mark_as_new(self, request, queryset):
         updated = queryset.update(is_new=True)
+        invalidate_products(queryset.values_list('id', flat=True))
         self.message_user(request, f"Позначено НОВИНКА: {updated} товарів", messages.SUCCESS)
     mark_as_new.short_description = "⭐ Позначити НОВИНКА"
     
     def unmark_as_new(self, request, queryset):
         updated = queryset.update(is_new=False)
+        invalidate_products(queryset.values_list('id', flat=True))
         self.message_user(request, f"Знято НОВИНКА: {updated} товарів", messages.SUCCESS)
     unmark_as_new.short_description = "Зняти НОВИНКА"
     
@@ -154,6 +186,8 @@ class ProductAdmin(admin.ModelAdmin):
             sale_price__isnull=False,
             sale_price__lt=models.F('retail_price')
         ).update(is_sale=True)
+        refresh_memberships(queryset.values_list('id', flat=True))
+        invalidate_products(queryset.values_list('id', flat=True))
         self.message_user(request, f"Активовано акцію для {count} товарів", messages.SUCCESS)
     activate_sale.short_description = "🔥 Активувати акцію"
     
@@ -165,6 +199,8 @@ class ProductAdmin(admin.ModelAdmin):
             sale_start_date=None,
             sale_end_date=None
         )
+        refresh_memberships(queryset.values_list('id', flat=True))
+        invalidate_products(queryset.values_list('id', flat=True))
         self.message_user(request, f"Деактивовано акцію для {updated} товарів", messages.WARNING)
     deactivate_sale.short_description = "❌ Деактивувати акцію"
     
@@ -200,6 +236,20 @@ class ProductAdmin(admin.ModelAdmin):
     def get_queryset(self, request):
         return super().get_queryset(request).select_related('primary_category').prefetch_related('images', 'categories')
     
+    def save_model(self, request, obj, form, change):
+        # Ручну правку даних з фіду наступна синхронізація повертає до фіду
+        if FEED_FIELDS.intersection(form.changed_data):
+            obj.feed_hash = ''
+        super().save_model(request, obj, form, change)
+    
+    def save_related(self, request, form, formsets, change):
+        # Після збереження M2M категорій - щоб скинути і нові категорії товару
+        super().save_related(request, form, formsets, change)
+        refresh_memberships([form.instance.pk])
+        # Картинки (інлайн) і категорії в картці товару
+        refresh_cards([form.instance.pk])
+        invalidate_products([form.instance.pk])
+    
     def has_add_permission(self, request):
         return False
     
@@ -337,8 +387,9 @@ class SaleAdmin(admin.ModelAdmin):
     
     @staticmethod
     def _invalidate_sale_cache():
+        # Акція може зачепити товари будь-яких категорій - скидаємо каталог
         try:
-            cache.clear()
+            invalidate_catalog()
         except Exception:
             pass
 
@@ -361,7 +412,7 @@ class TopProductAdmin(admin.ModelAdmin):
     def get_product_image(self, obj):
         main_image = obj.product.images.filter(is_main=True).first() or obj.product.images.first()
         if main_image:
-            return format_html('<img src="{}" class="admin-thumbnail-small" />', main_image.get_image_url())
+            return format_html('<img src="{}" class="admin-thumbnail-small" />', main_image.get_image_url('thumb'))
         return format_html('<div class="admin-icon-placeholder">📦</div>')
     get_product_image.short_description = 'Фото'
     
@@ -389,3 +440,31 @@ class TopProductAdmin(admin.ModelAdmin):
     
     def get_queryset(self, request):
         return super().get_queryset(request).select_related('product').prefetch_related('product__images')
+    
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        invalidate('home')
+    
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        invalidate('home')
+
+
+@admin.register(SyncJob)
+class SyncJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'kind', 'status', 'progress', 'created_at', 'started_at', 'get_duration']
+    list_filter = ['status', 'kind']
+    readonly_fields = [
+        'kind', 'status', 'progress', 'stats', 'error', 'output',
+        'created_at', 'started_at', 'finished_at', 'heartbeat_at',
+    ]
+    ordering = ['-created_at']
+
+    def get_duration(self, obj):
+        if obj.duration is None:
+            return '—'
+        return f'{obj.duration:.1f} с'
+    get_duration.short_description = 'Тривалість'
+
+    def has_add_permission(self, request):
+        return False
@@ -1,11 +1,16 @@
 """
 Команда для швидкого додавання URL зображень без завантаження файлів
 """
-import xml.etree.ElementTree as ET
 import requests
 from django.core.management.base import BaseCommand
 from apps.products.models import Product
-from apps.products.utils.image_downloader import download_product_images
+from apps.products.utils.feed_fetcher import fetch_feed
+from apps.products.utils.feed_reader import ParseError, SupplierFeed
+from apps.products.utils.image_downloader import add_product_images
+
+
+# Товарів в одному bulk_create картинок
+BATCH_SIZE = 500
 
 
 class Command(BaseCommand):
@@ -18,9 +23,15 @@ class Command(BaseCommand):
             default='https://smtm.com.ua/_prices/import-retail-ua-2.xml',
             help='URL XML фіду'
         )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Обробити навіть якщо фід не змінився з останнього запуску'
+        )
 
     def handle(self, *args, **options):
         url = options['url']
+        force = options['force']
 
         self.stdout.write(self.style.SUCCESS('🖼️  ШВИДКЕ ДОДАВАННЯ URL ЗОБРАЖЕНЬ'))
         self.stdout.write('='*60)
@@ -40,71 +51,64 @@ class Command(BaseCommand):
 
         try:
             self.stdout.write(f'\n📥 Завантаження XML з {url}...')
-            response = requests.get(url, timeout=60)
-            response.raise_for_status()
-            root = ET.fromstring(response.content)
-
-            offers_elem = root.find('.//offers')
-            if not offers_elem:
-                self.stdout.write(self.style.ERROR('❌ Не знайдено offers в XML'))
+            payload = fetch_feed(url)
+            if not force and payload.is_processed('bulk_add_image_urls'):
+                self.stdout.write(self.style.SUCCESS('✅ Фід не змінився з останнього запуску - пропускаємо (--force для примусової обробки)'))
                 return
 
+            # Створюємо індекс картинок по vendor_code (потоково)
             self.stdout.write('🗂️  Створення індексу картинок...')
-            images_index = {}
-            
-            for offer in offers_elem.findall('offer'):
-                vendor_code = self._get_text(offer, 'vendorCode')
-                if vendor_code:
-                    pictures = offer.findall('picture')
-                    if pictures:
-                        images_index[vendor_code] = [p.text for p in pictures if p.text]
+            images_index = {
+                offer['vendor_code']: offer['pictures']
+                for offer in SupplierFeed(payload.path).iter_offers()
+                if offer['vendor_code'] and offer['pictures']
+            }
 
             self.stdout.write(f'Знайдено картинки для {len(images_index)} товарів\n')
 
+            # id фіксуються одразу: після додавання картинок товар випадає з вибірки
+            products = list(products_without_images.values_list('id', 'external_id', 'name'))
             added = 0
             skipped = 0
-
-            for idx, product in enumerate(products_without_images, 1):
-                if not product.external_id:
-                    skipped += 1
-                    continue
-
-                picture_urls = images_index.get(product.external_id, [])
-                if not picture_urls:
-                    skipped += 1
-                    continue
-
-                success_count, error_count = download_product_images(
-                    product, 
-                    picture_urls, 
-                    clear_existing=False,
-                    use_urls=True
-                )
-                
-                if success_count > 0:
-                    added += 1
-                    self.stdout.write(f'  [{idx}/{total_products}] {product.name[:50]}... ✅ {success_count}')
-                
-                if idx % 100 == 0:
-                    self.stdout.write(f'  📊 Оброблено: {idx}/{total_products} | Додано: {added}')
+            errors = 0
+
+            for i in range(0, total_products, BATCH_SIZE):
+                batch = products[i:i + BATCH_SIZE]
+                pictures = {
+                    product_id: images_index[external_id]
+                    for product_id, external_id, _ in batch if images_index.get(external_id)
+                }
+                try:
+                    added_images = add_product_images(pictures)
+                    skipped += len(batch) - len(added_images)
+                except Exception as e:
+                    added_images = {}
+                    errors += len(pictures)
+                    skipped += len(batch) - len(pictures)
+                    self.stdout.write(self.style.WARNING(f'  ⚠️  Пакет не записано: {e}'))
+                added += len(added_images)
+
+                for idx, (product_id, _, name) in enumerate(batch, i + 1):
+                    if product_id in added_images:
+                        self.stdout.write(f'  [{idx}/{total_products}] {name[:50]}... ✅ {added_images[product_id]}')
+                self.stdout.write(f'  📊 Оброблено: {i + len(batch)}/{total_products} | Додано: {added}')
 
             self.stdout.write('\n' + '='*60)
             self.stdout.write(self.style.SUCCESS('🎉 ЗАВЕРШЕНО!'))
             self.stdout.write(f'📊 Статистика:')
             self.stdout.write(f'   • Додано: {added}')
             self.stdout.write(f'   • Пропущено: {skipped}')
+            if errors > 0:
+                self.stdout.write(self.style.WARNING(f'   • Помилок: {errors}'))
             self.stdout.write('='*60)
+            if errors:
+                self.stdout.write(self.style.WARNING('⚠️  Були помилки - фід не позначено обробленим, наступний запуск повторить його'))
+            else:
+                payload.mark_processed('bulk_add_image_urls')
 
         except requests.RequestException as e:
             self.stdout.write(self.style.ERROR(f'❌ Помилка завантаження XML: {e}'))
-        except ET.ParseError as e:
+        except ParseError as e:
             self.stdout.write(self.style.ERROR(f'❌ Помилка парсингу XML: {e}'))
         except Exception as e:
             self.stdout.write(self.style.ERROR(f'❌ Непередбачена помилка: {e}'))
-
-    def _get_text(self, element, tag):
-        child = element.find(tag)
-        if child is not None and child.text:
-            return child.text.strip()
-        return ''
-
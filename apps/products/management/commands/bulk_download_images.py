@@ -1,13 +1,22 @@
 """
 Оптимізована команда для масового завантаження картинок
+
+Після додавання картинок URL перевіряються (HEAD/GET): биті посилання
+позначаються і не можуть бути головною картинкою товару.
 """
-import xml.etree.ElementTree as ET
 import requests
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timedelta
 from django.core.management.base import BaseCommand
-from apps.products.models import Product
-from apps.products.utils.image_downloader import download_product_images
+from django.db.models import F, Q
+from django.utils import timezone
+from apps.products.models import Product, ProductImage
+from apps.products.services.cache_invalidation import invalidate_products
+from apps.products.services.image_checker import ImageChecker, check_images
+from apps.products.utils.feed_fetcher import fetch_feed
+from apps.products.utils.feed_reader import ParseError, SupplierFeed
+from apps.products.utils.image_downloader import add_product_images
+from apps.products.utils.sync_report import SyncReport, add_report_arguments, reserve_stdout
 
 
 class Command(BaseCommand):
@@ -20,6 +29,11 @@ class Command(BaseCommand):
             default='https://smtm.com.ua/_prices/import-retail-ua-2.xml',
             help='URL XML фіду'
         )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Обробити навіть якщо фід не змінився з останнього запуску'
+        )
         parser.add_argument(
             '--batch-size',
             type=int,
@@ -39,21 +53,61 @@ class Command(BaseCommand):
             help='Максимальна кількість повторних спроб'
         )
         parser.add_argument(
-            '--workers',
+            '--skip-check',
+            action='store_true',
+            help='Не перевіряти URL картинок'
+        )
+        parser.add_argument(
+            '--check-workers',
+            type=int,
+            default=16,
+            help='Кількість потоків перевірки URL (за замовчуванням: 16)'
+        )
+        parser.add_argument(
+            '--per-host',
+            type=int,
+            default=4,
+            help='Одночасних запитів перевірки до одного хоста (за замовчуванням: 4)'
+        )
+        parser.add_argument(
+            '--recheck-days',
+            type=int,
+            default=7,
+            help='Перевіряти картинки, не перевірені стільки днів (биті - щоразу)'
+        )
+        parser.add_argument(
+            '--check-limit',
             type=int,
-            default=10,
-            help='Кількість паралельних потоків (за замовчуванням: 10)'
+            help='Максимум картинок для перевірки за запуск'
         )
+        add_report_arguments(parser)
 
     def handle(self, *args, **options):
+        # Лічильники останнього запуску (для звіту --report)
+        self.stats = {}
+        self.report = SyncReport('bulk_download_images', dry_run=options['dry_run'])
+        report_stream = reserve_stdout(self, options['report'])
+        try:
+            self._run(options)
+            if not options['skip_check'] and not options['dry_run'] and not self.stats.get('error'):
+                self._check(options)
+        finally:
+            self.report.finish(self.stats, self.stats.get('error', ''))
+            self.report.write(options['report'], report_stream)
+
+    def _run(self, options):
         url = options['url']
+        force = options['force']
         batch_size = options['batch_size']
         delay = options['delay']
         max_retries = options['max_retries']
-        workers = options['workers']
+        dry_run = options['dry_run']
+        report = self.report
 
         self.stdout.write(self.style.SUCCESS('🖼️  МАСОВЕ ЗАВАНТАЖЕННЯ КАРТИНОК'))
         self.stdout.write('='*60)
+        if dry_run:
+            self.stdout.write(self.style.WARNING('🧪 Пробний запуск: картинки не завантажуються'))
 
         # Знаходимо товари без картинок
         products_without_images = Product.objects.filter(
@@ -62,7 +116,9 @@ class Command(BaseCommand):
             external_id__isnull=False
         ).distinct()
         
-        total_products = products_without_images.count()
+        with report.stage('lookup'):
+            total_products = products_without_images.count()
+        self.stats['without_images'] = total_products
         self.stdout.write(f'Знайдено {total_products} товарів без картинок')
         
         if total_products == 0:
@@ -72,53 +128,46 @@ class Command(BaseCommand):
         try:
             # Завантажуємо XML з картинками
             self.stdout.write(f'\n📥 Завантаження XML з {url}...')
-            response = requests.get(url, timeout=60)
-            response.raise_for_status()
-            root = ET.fromstring(response.content)
-
-            # Створюємо індекс картинок по vendor_code
-            offers_elem = root.find('.//offers')
-            if not offers_elem:
-                self.stdout.write(self.style.ERROR('❌ Не знайдено offers в XML'))
+            with report.stage('download'):
+                payload = fetch_feed(url)
+            if not force and not dry_run and payload.is_processed('bulk_download_images'):
+                self.stdout.write(self.style.SUCCESS('✅ Фід не змінився з останнього запуску - пропускаємо (--force для примусової обробки)'))
+                self.stats['unchanged_feed'] = True
                 return
 
+            # Створюємо індекс картинок по vendor_code (потоково)
             self.stdout.write('🗂️  Створення індексу картинок...')
-            images_index = {}
-            
-            for offer in offers_elem.findall('offer'):
-                vendor_code = self._get_text(offer, 'vendorCode')
-                if vendor_code:
-                    pictures = offer.findall('picture')
-                    if pictures:
-                        images_index[vendor_code] = [p.text for p in pictures if p.text]
+            images_index = {
+                offer['vendor_code']: offer['pictures']
+                for offer in report.iterate('parse', SupplierFeed(payload.path).iter_offers())
+                if offer['vendor_code'] and offer['pictures']
+            }
 
             self.stdout.write(f'Знайдено картинки для {len(images_index)} товарів')
 
-            def process_product(product, current_num):
-                if not product.external_id:
-                    return 'skipped', None
-                
-                picture_urls = images_index.get(product.external_id, [])
-                if not picture_urls:
-                    return 'skipped', None
-                
+            if dry_run:
+                # Тільки рахуємо товари, для яких є що завантажувати
+                with report.stage('lookup'):
+                    candidates = sum(
+                        1 for external_id in products_without_images.values_list('external_id', flat=True).iterator()
+                        if images_index.get(external_id)
+                    )
+                self.stats.update(candidates=candidates, pictures_in_feed=len(images_index))
+                self.stdout.write(f'🧪 Було б оброблено товарів: {candidates}')
+                return
+
+            def add_batch(pictures):
                 for retry in range(max_retries):
                     try:
-                        success_count, error_count = download_product_images(
-                            product, 
-                            picture_urls, 
-                            clear_existing=False
-                        )
-                        
-                        if success_count > 0:
-                            return 'success', success_count
-                        elif error_count > 0:
-                            return 'error', error_count
+                        return add_product_images(pictures)
                     except Exception:
-                        if retry < max_retries - 1:
-                            time.sleep(delay * (retry + 1))
-                
-                return 'failed', None
+                        if retry == max_retries - 1:
+                            raise
+                        time.sleep(delay * (retry + 1))
+
+            # id фіксуються одразу: після додавання картинок товар випадає з вибірки
+            with report.stage('lookup'):
+                products = list(products_without_images.values_list('id', 'external_id', 'name'))
 
             processed = 0
             downloaded = 0
@@ -126,38 +175,33 @@ class Command(BaseCommand):
             errors = 0
 
             for i in range(0, total_products, batch_size):
-                batch = list(products_without_images[i:i + batch_size])
-                
+                batch = products[i:i + batch_size]
                 self.stdout.write(f'\n📦 Пакет {i//batch_size + 1}: товари {i+1}-{min(i+batch_size, total_products)}')
-                
-                with ThreadPoolExecutor(max_workers=workers) as executor:
-                    futures = {}
-                    for idx, product in enumerate(batch):
-                        current_num = i + idx + 1
-                        future = executor.submit(process_product, product, current_num)
-                        futures[future] = (product, current_num)
-                    
-                    for future in as_completed(futures):
-                        product, current_num = futures[future]
-                        status, count = future.result()
-                        
-                        processed += 1
-                        
-                        if status == 'success':
-                            downloaded += 1
-                            self.stdout.write(f'  [{current_num}/{total_products}] {product.name[:40]}... {self.style.SUCCESS("✅")} {count}')
-                        elif status == 'skipped':
-                            skipped += 1
-                        elif status == 'failed':
-                            skipped += 1
-                        elif status == 'error':
-                            errors += count
-                        
-                        self.stdout.flush()
-                
+
+                pictures = {
+                    product_id: images_index[external_id]
+                    for product_id, external_id, _ in batch if images_index.get(external_id)
+                }
+                with report.stage('images'):
+                    try:
+                        added = add_batch(pictures)
+                    except Exception as e:
+                        added = {}
+                        errors += len(pictures)
+                        self.stdout.write(self.style.WARNING(f'  ⚠️  Пакет не записано: {e}'))
+
+                processed += len(batch)
+                downloaded += len(added)
+                skipped += len(batch) - len(pictures)
+                for idx, (product_id, _, name) in enumerate(batch, i + 1):
+                    if product_id in added:
+                        self.stdout.write(f'  [{idx}/{total_products}] {name[:40]}... {self.style.SUCCESS("✅")} {added[product_id]}')
+                self.stdout.flush()
+
                 self.stdout.write(f'  📊 Оброблено: {processed}/{total_products} | Завантажено: {downloaded} | Пропущено: {skipped}')
 
             # Підсумок
+            self.stats.update(processed=processed, downloaded=downloaded, skipped=skipped, errors=errors)
             self.stdout.write('\n' + '='*60)
             self.stdout.write(self.style.SUCCESS('🎉 ЗАВАНТАЖЕННЯ ЗАВЕРШЕНО!'))
             self.stdout.write(f'📊 Загальна статистика:')
@@ -167,19 +211,49 @@ class Command(BaseCommand):
             if errors > 0:
                 self.stdout.write(self.style.WARNING(f'   • Помилок: {errors}'))
             self.stdout.write('='*60)
+            if errors:
+                self.stdout.write(self.style.WARNING('⚠️  Були помилки - фід не позначено обробленим, наступний запуск повторить його'))
+            else:
+                payload.mark_processed('bulk_download_images')
 
         except requests.RequestException as e:
+            self.stats['error'] = str(e)
             self.stdout.write(self.style.ERROR(f'❌ Помилка завантаження XML: {e}'))
-        except ET.ParseError as e:
+        except ParseError as e:
+            self.stats['error'] = str(e)
             self.stdout.write(self.style.ERROR(f'❌ Помилка парсингу XML: {e}'))
         except Exception as e:
+            self.stats['error'] = str(e)
             self.stdout.write(self.style.ERROR(f'❌ Непередбачена помилка: {e}'))
             import traceback
             self.stdout.write(traceback.format_exc())
 
-    def _get_text(self, element, tag):
-        """Безпечно отримує текст з XML елемента"""
-        child = element.find(tag)
-        if child is not None and child.text:
-            return child.text.strip()
-        return ''
+    def _check(self, options):
+        """Перевіряє URL нових, давно не перевірених та битих картинок"""
+        stale = timezone.now() - timedelta(days=options['recheck_days'])
+        images = ProductImage.objects.filter(
+            Q(checked_at__isnull=True) | Q(checked_at__lt=stale) | Q(is_broken=True),
+            product__is_active=True,
+        ).exclude(image_url='').only('id', 'product_id', 'image_url').order_by(F('checked_at').asc(nulls_first=True), 'id')
+        if options['check_limit']:
+            images = images[:options['check_limit']]
+
+        with self.report.stage('lookup'):
+            images = list(images)
+        self.stdout.write(f'\n🔍 Перевірка URL картинок: {len(images)}')
+        if not images:
+            return
+
+        checker = ImageChecker(workers=options['check_workers'], per_host=options['per_host'])
+        try:
+            with self.report.stage('check'):
+                stats, changed_products = check_images(images, checker)
+        finally:
+            checker.close()
+        invalidate_products(changed_products)
+
+        self.stats.update({f'check_{key}': value for key, value in stats.items()})
+        self.stdout.write(f'   • Перевірено картинок: {stats["checked"]} (унікальних URL: {stats["urls"]})')
+        if stats['broken']:
+            self.stdout.write(self.style.WARNING(f'   • Битих посилань: {stats["broken"]}'))
+        self.stdout.write(f'   • Змінено головну картинку: {stats["main_changed"]} товарів')
@@ -1,11 +1,11 @@
 from django.core.management.base import BaseCommand
-from django.core.cache import cache
+from apps.core.cache_tags import invalidate
 
 
 class Command(BaseCommand):
     help = 'Очищає кеш категорій'
 
     def handle(self, *args, **options):
-        cache.delete('main_categories_menu')
+        invalidate('menu')
         self.stdout.write(self.style.SUCCESS('✅ Кеш категорій очищено'))
 
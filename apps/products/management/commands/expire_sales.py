@@ -1,13 +1,18 @@
 """
 Management command для автоматичного завершення акцій
+
+Заодно оновлює сторінки категорій для акцій, що почались з моменту
+останнього запуску (ціна в таблиці товарів у категоріях).
 """
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 from apps.products.models import Product
+from apps.products.services.cache_invalidation import invalidate_products
+from apps.products.services.category_membership import refresh_memberships, started_sale_product_ids
 
 
 class Command(BaseCommand):
-    help = 'Автоматично завершує акції, термін дії яких закінчився'
+    help = 'Автоматично завершує акції, термін дії яких закінчився, і застосовує ті, що почались'
 
     def handle(self, *args, **options):
         now = timezone.now()
@@ -17,7 +22,8 @@ class Command(BaseCommand):
             sale_end_date__lte=now
         )
         
-        expired_names = list(expired_products.values_list('name', flat=True))
+        expired = list(expired_products.values_list('id', 'name'))
+        expired_names = [name for _, name in expired]
         count = len(expired_names)
         
         if count > 0:
@@ -28,6 +34,9 @@ class Command(BaseCommand):
                 sale_start_date=None,
                 sale_end_date=None
             )
+            # Ціна на сторінках категорій повертається до звичайної
+            refresh_memberships(product_id for product_id, _ in expired)
+            invalidate_products(product_id for product_id, _ in expired)
             self.stdout.write(
                 self.style.SUCCESS(f'✓ Завершено {count} акцій')
             )
@@ -39,3 +48,9 @@ class Command(BaseCommand):
                 self.style.SUCCESS('✓ Немає акцій для завершення')
             )
 
+        # Акції з sale_start_date, що вже настав: акційна ціна на сторінках категорій
+        started = started_sale_product_ids(now)
+        if started:
+            refresh_memberships(started)
+            invalidate_products(started)
+            self.stdout.write(self.style.SUCCESS(f'✓ Почалось акцій: {len(started)}'))
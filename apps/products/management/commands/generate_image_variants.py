@@ -0,0 +1,52 @@
+"""
+Зменшені копії (WebP + JPEG) картинок товарів для карток, пошуку та сторінки товару
+"""
+from django.core.management.base import BaseCommand
+from apps.products.services.image_variants import generate_pending_variants
+from apps.products.utils.sync_report import SyncReport, add_report_arguments, reserve_stdout
+
+
+class Command(BaseCommand):
+    help = 'Створює зменшені копії (WebP/JPEG) картинок товарів у сховищі медіа'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Кількість процесів (1 - без пулу)'
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            help='Максимум картинок за запуск'
+        )
+        parser.add_argument(
+            '--regenerate',
+            action='store_true',
+            help='Перестворити копії і для картинок, що вже їх мають'
+        )
+        add_report_arguments(parser, dry_run=False)
+
+    def handle(self, *args, **options):
+        # Лічильники останнього запуску (для звіту --report)
+        self.stats = {}
+        self.report = SyncReport('generate_image_variants')
+        report_stream = reserve_stdout(self, options['report'])
+        try:
+            self.stdout.write(self.style.SUCCESS('🖼️  ЗМЕНШЕНІ КОПІЇ КАРТИНОК'))
+            self.stdout.write('='*60)
+            self.stats.update(generate_pending_variants(
+                workers=options['workers'],
+                limit=options['limit'],
+                regenerate=options['regenerate'],
+                timer=self.report,
+                log=self.stdout.write,
+            ))
+            self.stdout.write('='*60)
+        except Exception as e:
+            self.stats['error'] = str(e)
+            self.stdout.write(self.style.ERROR(f'❌ Помилка: {e}'))
+        finally:
+            self.report.finish(self.stats, self.stats.get('error', ''))
+            self.report.write(options['report'], report_stream)
@@ -0,0 +1,203 @@
+"""
+Повний імпорт з фіду постачальника за один прохід
+
+Фід завантажується один раз, категорії читаються з початку файлу, а товари -
+одним потоковим проходом: нові створюються, існуючі синхронізуються
+(поля, характеристики, картинки). Замість трьох завантажень і трьох
+розборів XML (import_categories + import_products + sync_products) -
+одне завантаження і один розбір.
+"""
+import requests
+from django.core.management.base import BaseCommand, CommandError
+from apps.products.models import Product
+from apps.products.services.allocator import product_allocators
+from apps.products.services.attributes import AttributeDictionary
+from apps.products.services.cache_invalidation import invalidate_catalog
+from apps.products.services.category_import import import_categories
+from apps.products.services.category_membership import rebuild_memberships
+from apps.products.services.facets import rebuild_facets
+from apps.products.services.product_cards import rebuild_cards
+from apps.products.services.image_variants import add_variant_arguments, generate_pending_variants
+from apps.products.services.product_import import create_products_isolated
+from apps.products.services.sync_engine import ProductSyncEngine
+from apps.products.utils.feed_fetcher import fetch_feed
+from apps.products.utils.feed_reader import ParseError, SupplierFeed, iter_batches
+from apps.products.utils.stage_timer import StageTimer
+
+
+# Назви етапів для звіту (в порядку виконання)
+STAGE_LABELS = (
+    ('download', 'Завантаження фіду'),
+    ('categories', 'Категорії'),
+    ('parse', 'Розбір товарів'),
+    ('lookup', 'Пошук товарів у базі'),
+    ('new_products', 'Створення нових товарів'),
+    ('products', 'Оновлення полів'),
+    ('attributes', 'Характеристики'),
+    ('images', 'Картинки'),
+    ('variants', 'Зменшені копії картинок'),
+    ('memberships', 'Товари в категоріях'),
+    ('facets', 'Фасети характеристик'),
+    ('cards', 'Картки товарів'),
+)
+
+
+class Command(BaseCommand):
+    help = 'Повний імпорт (категорії, товари, характеристики, картинки) за одне завантаження фіду'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url',
+            type=str,
+            default='https://smtm.com.ua/_prices/import-retail-ua-2.xml',
+            help='URL XML фіду для імпорту'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=50,
+            help='Розмір пакету для обробки'
+        )
+        parser.add_argument(
+            '--skip-images',
+            action='store_true',
+            help='Не завантажувати картинки'
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Імпортувати навіть якщо фід не змінився з останнього запуску'
+        )
+        add_variant_arguments(parser)
+
+    def handle(self, *args, **options):
+        url = options['url']
+        batch_size = options['batch_size']
+        skip_images = options['skip_images']
+        force = options['force']
+        # Копії картинок створюються в кінці імпорту (None - не створювати)
+        variant_workers = None if skip_images or options['skip_variants'] else options['variant_workers']
+
+        self.stdout.write(self.style.SUCCESS('🚀 ПОВНИЙ ІМПОРТ З ФІДУ'))
+        self.stdout.write('='*60)
+
+        timer = StageTimer()
+        try:
+            self.stdout.write(f'📥 Завантаження даних з {url}...')
+            with timer.stage('download'):
+                payload = fetch_feed(url)
+
+            if not force and payload.is_processed('import_feed'):
+                self.stdout.write(self.style.SUCCESS('✅ Фід не змінився з останнього імпорту - пропускаємо (--force для примусової обробки)'))
+                return
+
+            feed = SupplierFeed(payload.path)
+
+            # Етап 1: категорії (розбір зупиняється після </categories>)
+            with timer.stage('categories'):
+                categories_data = list(feed.iter_categories())
+                categories_index = import_categories(categories_data)
+            self.stdout.write(f'📁 Категорій у фіді: {len(categories_data)}, імпортовано: {len(categories_index)}')
+            if not categories_index:
+                raise CommandError('❌ Не знайдено категорій у фіді')
+
+            # Етап 2: товари одним проходом
+            errors = self._import_offers(feed, categories_index, batch_size, skip_images, force, timer, variant_workers)
+            if errors:
+                self.stdout.write(self.style.WARNING('⚠️  Були помилки - фід не позначено обробленим, наступний запуск повторить його'))
+            else:
+                payload.mark_processed('import_feed')
+
+        # Імпорт, що впав, не повинен виглядати успішним для run_full_import і черги задач
+        except CommandError:
+            raise
+        except requests.RequestException as e:
+            raise CommandError(f'❌ Помилка завантаження XML: {e}') from e
+        except ParseError as e:
+            raise CommandError(f'❌ Помилка парсингу XML: {e}') from e
+        except Exception as e:
+            import traceback
+            self.stdout.write(traceback.format_exc())
+            raise CommandError(f'❌ Непередбачена помилка: {e}') from e
+
+    def _import_offers(self, feed, categories_index, batch_size, skip_images, force, timer, variant_workers=None):
+        """
+        Створює нові та синхронізує існуючі товари по мірі читання фіду
+
+        Returns:
+            int: кількість помилок
+        """
+        engine = ProductSyncEngine(
+            categories_index=categories_index,
+            skip_images=skip_images,
+            force=force,
+            timer=timer,
+            attributes=AttributeDictionary(),
+        )
+        slugs, skus = product_allocators()
+        processed = 0
+        created_count = 0
+        error_count = 0
+
+        offers = timer.iterate('parse', feed.iter_offers())
+        for batch_num, batch in enumerate(iter_batches(offers, batch_size), 1):
+            # Нові товари створюються до синхронізації, щоб той самий прохід
+            # записав їм відбиток фіду
+            with timer.stage('lookup'):
+                existing = set(
+                    Product.objects.filter(
+                        external_id__in=[offer['vendor_code'] for offer in batch if offer['vendor_code']]
+                    ).values_list('external_id', flat=True)
+                )
+            new_offers = [offer for offer in batch if offer['vendor_code'] and offer['vendor_code'] not in existing]
+            with timer.stage('new_products'):
+                created, _, errors = create_products_isolated(new_offers, categories_index, slugs, skus, engine.attributes)
+            created_count += created
+            error_count += errors
+            if errors:
+                self.stdout.write(f'    ❌ Не вдалося створити товарів: {errors}')
+
+            engine.process_batch(batch)
+
+            processed += len(batch)
+            if batch_num % 10 == 0:
+                self.stdout.write(f'    ✅ Оброблено: {processed} (створено: {created_count}, '
+                                f'оновлено: {engine.totals["updated"]})')
+
+        if variant_workers:
+            generate_pending_variants(workers=variant_workers, timer=timer, log=self.stdout.write)
+
+        # Категорії та товари змінювались пакетно - таблиця перебудовується повністю
+        with timer.stage('memberships'):
+            rebuild_memberships()
+        with timer.stage('facets'):
+            rebuild_facets()
+        with timer.stage('cards'):
+            rebuild_cards()
+
+        totals = engine.totals
+        self.stdout.write('\n' + '='*60)
+        self.stdout.write(self.style.SUCCESS('🎉 ІМПОРТ ЗАВЕРШЕНО!'))
+        self.stdout.write(f'📊 Статистика:')
+        self.stdout.write(f'   • Товарів у фіді: {processed}')
+        self.stdout.write(f'   • Створено нових товарів: {created_count}')
+        self.stdout.write(f'   • Без змін (пропущено за відбитком): {totals["unchanged"]}')
+        self.stdout.write(f'   • Оновлено товарів: {totals["updated"]}')
+        self.stdout.write(f'   • Перезаписано характеристик: {totals["attributes"]}')
+        self.stdout.write(f'   • Завантажено картинок: {totals["images"]}')
+        self.stdout.write(f'   • Пропущено (без артикулу): {totals["skipped"]}')
+        errors = error_count + totals['errors']
+        if errors > 0:
+            self.stdout.write(self.style.WARNING(f'   • Помилок: {errors}'))
+
+        self.stdout.write(f'⏱️  Час за етапами:')
+        for stage, label in STAGE_LABELS:
+            if stage in timer.timings:
+                self.stdout.write(f'   • {label}: {timer.timings[stage]:.2f} с')
+        self.stdout.write(f'   • Всього: {sum(timer.timings.values()):.2f} с')
+
+        # Після імпорту змінюються меню та списки товарів (сесії покупців не чіпаємо)
+        invalidate_catalog()
+        self.stdout.write(self.style.SUCCESS('   • Кеш каталогу скинуто ✓'))
+        self.stdout.write('='*60)
+        return errors
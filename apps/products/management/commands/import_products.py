@@ -1,14 +1,24 @@
 """
 Імпорт товарів з XML фіду постачальника (створення нових товарів)
 """
-import xml.etree.ElementTree as ET
 import requests
-import html
-from decimal import Decimal
+from itertools import islice
 from django.core.management.base import BaseCommand
 from django.db import transaction
-from django.utils.text import slugify
-from apps.products.models import Category, Product, ProductAttribute
+from apps.products.models import Category, Product
+from apps.products.services.allocator import product_allocators
+from apps.products.services.attributes import AttributeDictionary
+from apps.products.services.cache_invalidation import invalidate_catalog
+from apps.products.services.category_membership import rebuild_memberships
+from apps.products.services.facets import rebuild_facets
+from apps.products.services.product_cards import rebuild_cards
+from apps.products.services.image_variants import add_variant_arguments, generate_pending_variants
+from apps.products.services.product_import import create_products_isolated
+from apps.products.services.sync_engine import ProductSyncEngine
+from apps.products.utils.feed_fetcher import fetch_feed
+from apps.products.utils.feed_reader import ParseError, SupplierFeed, iter_batches
+from apps.products.utils.image_downloader import add_product_images
+from apps.products.utils.sync_report import SyncReport, add_report_arguments, dry_run_atomic, reserve_stdout
 
 
 class Command(BaseCommand):
@@ -32,211 +42,172 @@ class Command(BaseCommand):
             type=int,
             help='Обмежити кількість товарів для імпорту (для тестування)'
         )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Імпортувати навіть якщо фід не змінився з останнього запуску'
+        )
+        add_variant_arguments(parser)
+        add_report_arguments(parser)
 
     def handle(self, *args, **options):
+        # Лічильники останнього запуску (для звіту --report)
+        self.stats = {}
+        self.report = SyncReport('import_products', dry_run=options['dry_run'])
+        report_stream = reserve_stdout(self, options['report'])
+        try:
+            self._run(options)
+        finally:
+            self.report.finish(self.stats, self.stats.get('error', ''))
+            self.report.write(options['report'], report_stream)
+
+    def _run(self, options):
         url = options['url']
         batch_size = options['batch_size']
         limit = options.get('limit')
+        force = options['force']
+        dry_run = options['dry_run']
 
         self.stdout.write(self.style.SUCCESS('🆕 ІМПОРТ НОВИХ ТОВАРІВ'))
         self.stdout.write('='*60)
+        if dry_run:
+            self.stdout.write(self.style.WARNING('🧪 Пробний запуск: зміни не записуються в базу'))
 
         try:
-            # Завантажуємо XML
+            # Завантажуємо XML у кеш на диску (умовний запит, потоково)
             self.stdout.write(f'📥 Завантаження даних з {url}...')
-            response = requests.get(url, timeout=60)
-            response.raise_for_status()
-            
-            root = ET.fromstring(response.content)
-            
-            # Перевіряємо категорії
-            categories_count = Category.objects.count()
-            if categories_count == 0:
-                self.stdout.write(self.style.ERROR('❌ Немає категорій в базі! Спочатку виконайте: python manage.py import_categories'))
-                return
-            
-            # Створюємо індекс категорій
-            categories_index = {
-                cat.external_id: cat 
-                for cat in Category.objects.all() 
-                if cat.external_id
-            }
-            self.stdout.write(f'📁 Завантажено {len(categories_index)} категорій')
-            
-            # Знаходимо товари
-            offers_elem = root.find('.//offers')
-            if offers_elem is None:
-                self.stdout.write(self.style.ERROR('❌ Не знайдено блок offers в XML'))
+            with self.report.stage('download'):
+                payload = fetch_feed(url)
+
+            # Частковий імпорт (--limit) не вважається обробкою фіду
+            if not force and not limit and not dry_run and payload.is_processed('import_products'):
+                self.stdout.write(self.style.SUCCESS('✅ Фід не змінився з останнього імпорту - пропускаємо (--force для примусової обробки)'))
+                self.stats['unchanged_feed'] = True
                 return
-            
-            offers = offers_elem.findall('offer')
-            total_offers = len(offers)
-            
-            if limit:
-                offers = offers[:limit]
-                self.stdout.write(f'📦 Обмеження: {limit} товарів з {total_offers}')
-            else:
-                self.stdout.write(f'📦 Знайдено {total_offers} товарів у фіді')
-            
-            # Лічильники
-            created_count = 0
-            updated_count = 0
-            skipped_count = 0
-            error_count = 0
-
-            # Обробляємо товари пакетами
-            for i in range(0, len(offers), batch_size):
-                batch = offers[i:i + batch_size]
-                
-                self.stdout.write(f'\n📦 Пакет {i//batch_size + 1}: товари {i+1}-{min(i+batch_size, len(offers))}')
-                
-                with transaction.atomic():
-                    for offer in batch:
-                        try:
-                            vendor_code = self._get_text(offer, 'vendorCode')
-                            if not vendor_code:
-                                skipped_count += 1
-                                continue
-
-                            # Перевіряємо чи існує товар
-                            product_exists = Product.objects.filter(external_id=vendor_code).exists()
-                            
-                            # Дані з XML
-                            available = offer.get('available', 'true') == 'true'
-                            price = self._get_text(offer, 'price')
-                            name = self._get_text(offer, 'name')
-                            description = self._get_text(offer, 'description')
-                            category_id = self._get_text(offer, 'categoryId')
-                            vendor = self._get_text(offer, 'vendor')
-                            
-                            if not name or not price:
-                                skipped_count += 1
-                                continue
-                            
-                            # Категорія
-                            category = None
-                            if category_id and category_id in categories_index:
-                                category = categories_index[category_id]
-                            
-                            if not category:
-                                skipped_count += 1
-                                continue
-                            
-                            # Ціна
-                            try:
-                                retail_price = Decimal(price)
-                            except (ValueError, TypeError):
-                                skipped_count += 1
-                                continue
-                            
-                            # Створюємо або оновлюємо товар
-                            if product_exists:
-                                product = Product.objects.get(external_id=vendor_code)
-                                product.name = name[:200]
-                                product.retail_price = retail_price
-                                product.stock = 5 if available else 0
-                                product.description = html.unescape(description) if description else ''
-                                product.vendor_name = vendor[:200] if vendor else ''
-                                product.primary_category = category
-                                product.save()
-                                
-                                # Додаємо в categories
-                                if not product.categories.filter(id=category.id).exists():
-                                    product.categories.add(category)
-                                
-                                updated_count += 1
-                            else:
-                                # Генеруємо slug
-                                base_slug = slugify(name)
-                                slug = base_slug
-                                counter = 1
-                                while Product.objects.filter(slug=slug).exists():
-                                    slug = f"{base_slug}-{counter}"
-                                    counter += 1
-                                
-                                # Створюємо товар
-                                product = Product.objects.create(
-                                    external_id=vendor_code,
-                                    name=name[:200],
-                                    slug=slug,
-                                    retail_price=retail_price,
-                                    stock=5 if available else 0,
-                                    description=html.unescape(description) if description else '',
-                                    vendor_name=vendor[:200] if vendor else '',
-                                    primary_category=category,
-                                    is_active=True,
-                                )
-                                
-                                # Додаємо категорію в M2M
-                                product.categories.add(category)
-                                created_count += 1
-                            
-                            # Характеристики
-                            params = offer.findall('param')
-                            if params:
-                                ProductAttribute.objects.filter(product=product).delete()
-                                
-                                for param_idx, param in enumerate(params):
-                                    param_name = param.get('name')
-                                    param_value = param.text
-                                    
-                                    if param_name and param_value:
-                                        ProductAttribute.objects.create(
-                                            product=product,
-                                            name=param_name[:100],
-                                            value=param_value[:200],
-                                            sort_order=param_idx,
-                                        )
-                            
-                            # Додаємо зображення як URL
-                            pictures = offer.findall('picture')
-                            if pictures and not product.images.exists():
-                                for idx, picture in enumerate(pictures):
-                                    picture_url = picture.text
-                                    if picture_url:
-                                        try:
-                                            from apps.products.models import ProductImage
-                                            ProductImage.objects.create(
-                                                product=product,
-                                                image_url=picture_url,
-                                                is_main=(idx == 0),
-                                                sort_order=idx,
-                                            )
-                                        except Exception:
-                                            pass
-
-                        except Exception as e:
-                            error_count += 1
-                            self.stdout.write(f'    ❌ Помилка обробки товару {vendor_code}: {e}')
-
-                # Прогрес
-                processed = min(i + batch_size, len(offers))
-                self.stdout.write(f'    ✅ Оброблено: {processed}/{len(offers)} '
-                                f'(створено: {created_count}, оновлено: {updated_count})')
-
-            # Підсумок
-            self.stdout.write('\n' + '='*60)
-            self.stdout.write(self.style.SUCCESS('🎉 ІМПОРТ ЗАВЕРШЕНО!'))
-            self.stdout.write(f'📊 Статистика:')
-            self.stdout.write(f'   • Створено нових товарів: {created_count}')
-            self.stdout.write(f'   • Оновлено існуючих: {updated_count}')
-            self.stdout.write(f'   • Пропущено: {skipped_count}')
-            if error_count > 0:
-                self.stdout.write(self.style.WARNING(f'   • Помилок: {error_count}'))
-            self.stdout.write('='*60)
+
+            with dry_run_atomic(dry_run):
+                imported = self._import(SupplierFeed(payload.path), batch_size, limit)
+            if imported and not dry_run:
+                # Нові товари з'являються у списках і категоріях
+                with self.report.stage('memberships'):
+                    rebuild_memberships()
+                with self.report.stage('facets'):
+                    rebuild_facets()
+                with self.report.stage('cards'):
+                    rebuild_cards()
+                invalidate_catalog()
+                if not options['skip_variants']:
+                    self.stats['variants'] = generate_pending_variants(
+                        workers=options['variant_workers'], timer=self.report, log=self.stdout.write,
+                    )
+                if self.stats.get('errors'):
+                    self.stdout.write(self.style.WARNING('⚠️  Були помилки - фід не позначено обробленим, наступний запуск повторить його'))
+                elif not limit:
+                    payload.mark_processed('import_products')
 
         except requests.RequestException as e:
+            self.stats['error'] = str(e)
             self.stdout.write(self.style.ERROR(f'❌ Помилка завантаження XML: {e}'))
-        except ET.ParseError as e:
+        except ParseError as e:
+            self.stats['error'] = str(e)
             self.stdout.write(self.style.ERROR(f'❌ Помилка парсингу XML: {e}'))
         except Exception as e:
+            self.stats['error'] = str(e)
             self.stdout.write(self.style.ERROR(f'❌ Непередбачена помилка: {e}'))
             import traceback
             self.stdout.write(traceback.format_exc())
 
-    def _get_text(self, element, tag):
-        """Безпечно отримує текст з XML елемента"""
-        child = element.find(tag)
-        if child is not None and child.text:
-            return child.text.strip()
-        return ''
+    def _import(self, feed, batch_size, limit):
+        """Обробляє товари фіду пакетами по мірі читання"""
+        report = self.report
+        # Перевіряємо категорії
+        with report.stage('lookup'):
+            categories_count = Category.objects.count()
+        if categories_count == 0:
+            self.stdout.write(self.style.ERROR('❌ Немає категорій в базі! Спочатку виконайте: python manage.py import_categories'))
+            return False
+
+        # Створюємо індекс категорій
+        with report.stage('lookup'):
+            categories_index = {
+                cat.external_id: cat
+                for cat in Category.objects.all()
+                if cat.external_id
+            }
+        self.stdout.write(f'📁 Завантажено {len(categories_index)} категорій')
+
+        offers = feed.iter_offers()
+        if limit:
+            offers = islice(offers, limit)
+            self.stdout.write(f'📦 Обмеження: {limit} товарів')
+        offers = report.iterate('parse', offers)
+
+        # Slug та артикули нових товарів видаються в пам'яті (один запит на весь імпорт)
+        with report.stage('lookup'):
+            slugs, skus = product_allocators()
+            attributes = AttributeDictionary()
+        # Існуючі товари оновлюються пакетно (картинки додаються як URL нижче)
+        engine = ProductSyncEngine(categories_index=categories_index, skip_images=True, timer=report, attributes=attributes)
+
+        # Лічильники
+        processed = 0
+        created_count = 0
+        skipped_count = 0
+        error_count = 0
+
+        # Обробляємо товари пакетами по мірі читання фіду
+        for batch_num, batch in enumerate(iter_batches(offers, batch_size), 1):
+            self.stdout.write(f'\n📦 Пакет {batch_num}: товари {processed+1}-{processed+len(batch)}')
+
+            with report.stage('lookup'):
+                existing = dict(
+                    Product.objects.filter(
+                        external_id__in=[offer['vendor_code'] for offer in batch if offer['vendor_code']]
+                    ).values_list('external_id', 'id')
+                )
+            skipped_count += sum(1 for offer in batch if not offer['vendor_code'])
+            new_offers = [offer for offer in batch if offer['vendor_code'] and offer['vendor_code'] not in existing]
+            existing_offers = [offer for offer in batch if offer['vendor_code'] in existing]
+
+            # Поганий товар коштує один товар, а не весь пакет
+            with report.stage('new_products'):
+                created, skipped, errors = create_products_isolated(new_offers, categories_index, slugs, skus, attributes)
+            created_count += created
+            skipped_count += skipped
+            error_count += errors
+            if errors:
+                self.stdout.write(f'    ❌ Не вдалося створити товарів: {errors}')
+
+            # Картинки існуючих товарів не залежать від створення нових
+            pictures = {existing[offer['vendor_code']]: offer['pictures'] for offer in existing_offers}
+            try:
+                with report.stage('images'), transaction.atomic():
+                    add_product_images(pictures)
+            except Exception as e:
+                error_count += len(pictures)
+                self.stdout.write(f'    ❌ Помилка запису картинок пакету: {e}')
+
+            engine.process_batch(existing_offers)
+
+            # Прогрес
+            processed += len(batch)
+            self.stdout.write(f'    ✅ Оброблено: {processed} '
+                            f'(створено: {created_count}, оновлено: {engine.totals["updated"]})')
+
+        # Підсумок
+        error_count += engine.totals['errors']
+        self.stats.update(
+            processed=processed, created=created_count, updated=engine.totals['updated'],
+            skipped=skipped_count, errors=error_count,
+        )
+        self.stdout.write('\n' + '='*60)
+        self.stdout.write(self.style.SUCCESS('🎉 ІМПОРТ ЗАВЕРШЕНО!'))
+        self.stdout.write(f'📊 Статистика:')
+        self.stdout.write(f'   • Товарів у фіді: {processed}')
+        self.stdout.write(f'   • Створено нових товарів: {created_count}')
+        self.stdout.write(f'   • Оновлено існуючих: {engine.totals["updated"]}')
+        self.stdout.write(f'   • Пропущено: {skipped_count}')
+        if error_count > 0:
+            self.stdout.write(self.style.WARNING(f'   • Помилок: {error_count}'))
+        self.stdout.write('='*60)
+        return True
@@ -0,0 +1,18 @@
+"""
+Повна перебудова таблиці товарів у категоріях (після деплою або ручних змін у базі)
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from apps.products.services.category_membership import rebuild_memberships
+
+
+class Command(BaseCommand):
+    help = 'Перебудовує таблицю товарів у категоріях (ProductCategoryMembership)'
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        count = rebuild_memberships()
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Записано {count} рядків за {time.monotonic() - started:.2f} с'
+        ))
@@ -0,0 +1,18 @@
+"""
+Повна перебудова фасетів характеристик по категоріях (після деплою або ручних змін у базі)
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from apps.products.services.facets import rebuild_facets
+
+
+class Command(BaseCommand):
+    help = 'Перебудовує фасети характеристик категорій (CategoryFacetIndex)'
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        count = rebuild_facets()
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Фасети побудовано для {count} категорій за {time.monotonic() - started:.2f} с'
+        ))
@@ -0,0 +1,22 @@
+"""
+Повна перебудова даних карток товарів (після деплою або ручних змін у базі)
+
+Після деплою шаблон картки міг змінитись - закешований HTML карток скидається.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from apps.core.cache_tags import invalidate
+from apps.products.services.product_cards import CARDS_TAG, rebuild_cards
+
+
+class Command(BaseCommand):
+    help = 'Перераховує головну картинку та категорії в картках товарів'
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        count = rebuild_cards()
+        invalidate(CARDS_TAG)
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Оновлено {count} карток за {time.monotonic() - started:.2f} с'
+        ))
@@ -0,0 +1,44 @@
+"""
+Воркер фонових задач синхронізації (черга SyncJob)
+"""
+import time
+from django.core.management.base import BaseCommand
+from apps.products.services.sync_jobs import claim_next, run_job
+
+
+class Command(BaseCommand):
+    help = 'Виконує задачі синхронізації з черги (по одній одночасно)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Виконати задачі, що вже в черзі, і завершитись (для cron)'
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=10,
+            help='Пауза між перевірками черги в секундах (без --once)'
+        )
+
+    def handle(self, *args, **options):
+        once = options['once']
+        sleep = options['sleep']
+
+        self.stdout.write(self.style.SUCCESS('⚙️  ВОРКЕР ЗАДАЧ СИНХРОНІЗАЦІЇ'))
+        while True:
+            job = claim_next()
+            if job is None:
+                if once:
+                    self.stdout.write('✅ Черга порожня (або інша задача вже виконується)')
+                    return
+                time.sleep(sleep)
+                continue
+
+            self.stdout.write(f'▶️  Задача #{job.id} ({job.get_kind_display()})')
+            run_job(job)
+            if job.status == job.STATUS_SUCCESS:
+                self.stdout.write(self.style.SUCCESS(f'   ✅ Завершено за {job.duration:.1f} с'))
+            else:
+                self.stdout.write(self.style.ERROR(f'   ❌ Помилка: {job.error}'))
@@ -1,14 +1,20 @@
 """
 Синхронізація товарів з постачальником з автоматичним завантаженням картинок
 """
-import xml.etree.ElementTree as ET
 import requests
-import html
-from decimal import Decimal
+from django.core.management import call_command
 from django.core.management.base import BaseCommand
-from django.db import transaction
-from apps.products.models import Category, Product, ProductAttribute
-from apps.products.utils import download_product_images
+from django.db import connection
+from apps.products.models import Category
+from apps.products.services.cache_invalidation import invalidate_products
+from apps.products.services.category_membership import refresh_memberships
+from apps.products.services.facets import rebuild_facets
+from apps.products.services.product_cards import refresh_cards
+from apps.products.services.sync_engine import ProductSyncEngine
+from apps.products.services.sync_shards import run_sharded
+from apps.products.utils.feed_fetcher import fetch_feed
+from apps.products.utils.feed_reader import ParseError, SupplierFeed, iter_batches
+from apps.products.utils.sync_report import SyncReport, add_report_arguments, dry_run_atomic, reserve_stdout
 
 
 class Command(BaseCommand):
@@ -37,214 +43,206 @@ class Command(BaseCommand):
             action='store_true',
             help='Завантажувати тільки картинки (не оновлювати ціни)'
         )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Обробити фід і всі товари, навіть якщо фід або відбиток товару не змінився'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Кількість процесів: товари діляться на частини за хешем артикулу'
+        )
+        parser.add_argument(
+            '--warm-cache',
+            action='store_true',
+            help='Після синхронізації прогріти кеш сторінок (warm_cache), якщо щось змінилось'
+        )
+        add_report_arguments(parser)
 
     def handle(self, *args, **options):
+        # Лічильники останнього запуску (читає воркер фонових задач)
+        self.stats = {}
+        self.warm_cache = options['warm_cache']
+        self.report = SyncReport('sync_products', dry_run=options['dry_run'])
+        report_stream = reserve_stdout(self, options['report'])
+        try:
+            self._run(options)
+        finally:
+            self.report.finish(self.stats, self.stats.get('error', ''))
+            self.report.write(options['report'], report_stream)
+
+    def _run(self, options):
         url = options['url']
         batch_size = options['batch_size']
         skip_images = options['skip_images']
         images_only = options['images_only']
+        force = options['force']
+        dry_run = options['dry_run']
+        workers = max(1, options['workers'])
+        if workers > 1 and connection.vendor == 'sqlite':
+            # SQLite не витримує паралельних записів з кількох процесів
+            self.stdout.write(self.style.WARNING('⚠️  SQLite: паралельна обробка недоступна, працюємо в одному процесі'))
+            workers = 1
+        if dry_run:
+            # Відкат можливий тільки в одній транзакції; картинки не завантажуємо
+            workers = 1
+            skip_images = True
 
         action = "🖼️  КАРТИНКИ" if images_only else ("📊 ЦІНИ ТА НАЯВНІСТЬ" if skip_images else "🔄 ПОВНА СИНХРОНІЗАЦІЯ")
         self.stdout.write(self.style.SUCCESS(f'{action} ТОВАРІВ'))
         self.stdout.write('='*60)
+        if dry_run:
+            self.stdout.write(self.style.WARNING('🧪 Пробний запуск: зміни не записуються в базу'))
 
         try:
-            # Завантажуємо XML
+            # Завантажуємо XML у кеш на диску (умовний запит, потоково)
             self.stdout.write(f'📥 Завантаження даних з {url}...')
-            response = requests.get(url, timeout=60)
-            response.raise_for_status()
-            
-            root = ET.fromstring(response.content)
-            
-            # Знаходимо товари
-            offers_elem = root.find('.//offers')
-            if offers_elem is None:
-                self.stdout.write(self.style.ERROR('❌ Не знайдено блок offers в XML'))
+            with self.report.stage('download'):
+                payload = fetch_feed(url)
+
+            # Для кожного режиму окремо запам'ятовуємо оброблену версію фіду
+            consumer = 'sync_products:images' if images_only else ('sync_products:prices' if skip_images else 'sync_products')
+            if not force and not dry_run and payload.is_processed(consumer):
+                self.stdout.write(self.style.SUCCESS('✅ Фід не змінився з останньої синхронізації - пропускаємо (--force для примусової обробки)'))
+                self.stats['unchanged_feed'] = True
                 return
-            
-            offers = offers_elem.findall('offer')
-            total_offers = len(offers)
-            self.stdout.write(f'📦 Знайдено {total_offers} товарів у фіді')
-            
-            if not images_only:
-                # Перевіряємо категорії
-                categories_count = Category.objects.count()
-                if categories_count == 0:
-                    self.stdout.write(self.style.ERROR('❌ Немає категорій в базі! Спочатку виконайте: python manage.py import_categories'))
-                    return
-                
-                # Створюємо індекс категорій
-                categories_index = {
-                    cat.external_id: cat 
-                    for cat in Category.objects.all() 
-                    if cat.external_id
-                }
-                self.stdout.write(f'📁 Завантажено {len(categories_index)} категорій')
-
-            # Лічильники
-            updated_count = 0
-            images_updated = 0
-            skipped_count = 0
-            error_count = 0
-
-            # Обробляємо товари пакетами
-            for i in range(0, total_offers, batch_size):
-                batch = offers[i:i + batch_size]
-                
-                self.stdout.write(f'\n📦 Пакет {i//batch_size + 1}: товари {i+1}-{min(i+batch_size, total_offers)}')
-                
-                with transaction.atomic():
-                    for offer in batch:
-                        try:
-                            vendor_code = self._get_text(offer, 'vendorCode')
-                            if not vendor_code:
-                                skipped_count += 1
-                                continue
-
-                            # Знаходимо товар в базі
-                            try:
-                                product = Product.objects.get(external_id=vendor_code)
-                            except Product.DoesNotExist:
-                                skipped_count += 1
-                                continue
-
-                            # Оновлюємо дані товару (якщо не тільки картинки)
-                            if not images_only:
-                                available = offer.get('available', 'true') == 'true'
-                                price = self._get_text(offer, 'price')
-                                name = self._get_text(offer, 'name')
-                                description = self._get_text(offer, 'description')
-                                category_id = self._get_text(offer, 'categoryId')
-                                vendor = self._get_text(offer, 'vendor')
-
-                                # Оновлюємо основні дані
-                                updated = False
-                                
-                                if price:
-                                    try:
-                                        new_price = Decimal(price)
-                                        if product.retail_price != new_price:
-                                            product.retail_price = new_price
-                                            updated = True
-                                    except (ValueError, TypeError):
-                                        pass
-
-                                # is_active контролюється вручну адміном, не чіпаємо
-                                # available впливає тільки на stock (наявність)
-                                new_stock = 5 if available else 0
-                                if product.stock != new_stock:
-                                    product.stock = new_stock
-                                    updated = True
-
-                                if name and product.name != name[:200]:
-                                    product.name = name[:200]
-                                    updated = True
-
-                                if description:
-                                    clean_desc = html.unescape(description)
-                                    if product.description != clean_desc:
-                                        product.description = clean_desc
-                                        updated = True
-
-                                if vendor and product.vendor_name != vendor[:200]:
-                                    product.vendor_name = vendor[:200]
-                                    updated = True
-
-                                # Оновлюємо категорію
-                                if category_id and category_id in categories_index:
-                                    new_category = categories_index[category_id]
-                                    if product.primary_category != new_category:
-                                        product.primary_category = new_category
-                                        updated = True
-                                    
-                                    # Додаємо в categories якщо немає
-                                    if not product.categories.filter(id=new_category.id).exists():
-                                        product.categories.add(new_category)
-
-                                if updated:
-                                    product.save()
-                                    updated_count += 1
-
-                                # Оновлюємо характеристики
-                                params = offer.findall('param')
-                                if params:
-                                    # Видаляємо старі
-                                    product.attributes.all().delete()
-                                    
-                                    # Додаємо нові
-                                    for param_idx, param in enumerate(params):
-                                        param_name = param.get('name')
-                                        param_value = param.text
-                                        
-                                        if param_name and param_value:
-                                            ProductAttribute.objects.create(
-                                                product=product,
-                                                name=param_name[:100],
-                                                value=param_value[:200],
-                                                sort_order=param_idx,
-                                            )
-
-                            # Завантажуємо картинки (якщо не skip_images)
-                            if not skip_images:
-                                pictures = offer.findall('picture')
-                                if pictures:
-                                    picture_urls = [p.text for p in pictures if p.text]
-                                    
-                                    has_images = product.images.exists()
-                                    if not has_images:
-                                        try:
-                                            success, errors = download_product_images(
-                                                product, 
-                                                picture_urls, 
-                                                clear_existing=False
-                                            )
-                                            if success > 0:
-                                                images_updated += 1
-                                        except Exception as e:
-                                            self.stdout.write(f'    ❌ Помилка завантаження картинок для {product.name}: {e}')
-
-                        except Exception as e:
-                            error_count += 1
-                            self.stdout.write(f'    ❌ Помилка обробки товару {vendor_code}: {e}')
-
-                # Прогрес
-                processed = min(i + batch_size, total_offers)
-                if images_only:
-                    self.stdout.write(f'    ✅ Оброблено: {processed}/{total_offers} (картинки: {images_updated})')
+
+            if workers > 1:
+                synced = self._sync_parallel(payload.path, workers, batch_size, skip_images, images_only, force)
+            else:
+                with dry_run_atomic(dry_run):
+                    synced = self._sync(SupplierFeed(payload.path), batch_size, skip_images, images_only, force)
+            if synced and not dry_run:
+                # Товари з помилками мають повторитись наступним запуском
+                if self.stats.get('errors'):
+                    self.stdout.write(self.style.WARNING('⚠️  Були помилки - фід не позначено обробленим, наступний запуск повторить його'))
                 else:
-                    self.stdout.write(f'    ✅ Оброблено: {processed}/{total_offers} '
-                                    f'(оновлено: {updated_count}, картинки: {images_updated})')
-
-            # Підсумок
-            self.stdout.write('\n' + '='*60)
-            self.stdout.write(self.style.SUCCESS('🎉 СИНХРОНІЗАЦІЯ ЗАВЕРШЕНА!'))
-            self.stdout.write(f'📊 Статистика:')
-            if not images_only:
-                self.stdout.write(f'   • Оновлено товарів: {updated_count}')
-            self.stdout.write(f'   • Завантажено картинок: {images_updated}')
-            self.stdout.write(f'   • Пропущено: {skipped_count}')
-            if error_count > 0:
-                self.stdout.write(self.style.WARNING(f'   • Помилок: {error_count}'))
-            
-            # Очищення кешу після синхронізації
-            from django.core.cache import cache
-            cache.clear()
-            self.stdout.write(self.style.SUCCESS('   • Кеш очищено ✓'))
-            
-            self.stdout.write('='*60)
+                    payload.mark_processed(consumer)
 
         except requests.RequestException as e:
+            self.stats['error'] = str(e)
             self.stdout.write(self.style.ERROR(f'❌ Помилка завантаження XML: {e}'))
-        except ET.ParseError as e:
+        except ParseError as e:
+            self.stats['error'] = str(e)
             self.stdout.write(self.style.ERROR(f'❌ Помилка парсингу XML: {e}'))
         except Exception as e:
+            self.stats['error'] = str(e)
             self.stdout.write(self.style.ERROR(f'❌ Непередбачена помилка: {e}'))
             import traceback
             self.stdout.write(traceback.format_exc())
 
-    def _get_text(self, element, tag):
-        """Безпечно отримує текст з XML елемента"""
-        child = element.find(tag)
-        if child is not None and child.text:
-            return child.text.strip()
-        return ''
+    def _sync(self, feed, batch_size, skip_images, images_only, force):
+        """Обробляє товари фіду пакетами по мірі читання"""
+        categories_index = {}
+        if not images_only:
+            # Перевіряємо категорії
+            with self.report.stage('lookup'):
+                categories_count = Category.objects.count()
+            if categories_count == 0:
+                self.stdout.write(self.style.ERROR('❌ Немає категорій в базі! Спочатку виконайте: python manage.py import_categories'))
+                return False
+
+            # Створюємо індекс категорій
+            with self.report.stage('lookup'):
+                categories_index = {
+                    cat.external_id: cat
+                    for cat in Category.objects.all()
+                    if cat.external_id
+                }
+            self.stdout.write(f'📁 Завантажено {len(categories_index)} категорій')
+
+        engine = ProductSyncEngine(
+            categories_index=categories_index,
+            skip_images=skip_images,
+            images_only=images_only,
+            force=force,
+            timer=self.report,
+        )
+        processed = 0
+
+        # Обробляємо товари пакетами по мірі читання фіду
+        offers = self.report.iterate('parse', feed.iter_offers())
+        for batch_num, batch in enumerate(iter_batches(offers, batch_size), 1):
+            self.stdout.write(f'\n📦 Пакет {batch_num}: товари {processed+1}-{processed+len(batch)}')
+
+            stats = engine.process_batch(batch)
+            if stats.get('errors'):
+                self.stdout.write(self.style.WARNING(f'    ⚠️  Помилок у пакеті: {stats["errors"]}'))
+
+            # Прогрес
+            processed += len(batch)
+            totals = engine.totals
+            if images_only:
+                self.stdout.write(f'    ✅ Оброблено: {processed} (картинки: {totals["images"]}, '
+                                f'запитів до БД: {stats["queries"]})')
+            else:
+                self.stdout.write(f'    ✅ Оброблено: {processed} '
+                                f'(без змін: {totals["unchanged"]}, змінено: {totals["changed"]}, '
+                                f'нових: {totals["missing"]}, картинки: {totals["images"]}, '
+                                f'запитів до БД: {stats["queries"]})')
+
+        self._summary(engine.totals, processed, images_only, engine.changed_ids)
+        return True
+
+    def _sync_parallel(self, path, workers, batch_size, skip_images, images_only, force):
+        """Обробляє фід частинами у пулі процесів (--workers N)"""
+        if not images_only and not Category.objects.exists():
+            self.stdout.write(self.style.ERROR('❌ Немає категорій в базі! Спочатку виконайте: python manage.py import_categories'))
+            return False
+
+        self.stdout.write(f'⚙️  Паралельна обробка: {workers} процесів')
+
+        def on_shard_done(shard, totals, processed):
+            self.stdout.write(f'    ✅ Частина {shard + 1}/{workers}: {processed} товарів '
+                            f'(змінено: {totals.get("changed", 0)}, помилок: {totals.get("errors", 0)})')
+
+        totals, processed, changed_ids = run_sharded(
+            path,
+            workers,
+            batch_size,
+            {'skip_images': skip_images, 'images_only': images_only, 'force': force},
+            on_shard_done=on_shard_done,
+            timer=self.report,
+        )
+        self._summary(totals, processed, images_only, changed_ids)
+        return True
+
+    def _summary(self, totals, processed, images_only, changed_ids):
+        """Виводить підсумок синхронізації"""
+        self.stats.update(totals, processed=processed)
+        self.stdout.write('\n' + '='*60)
+        self.stdout.write(self.style.SUCCESS('🎉 СИНХРОНІЗАЦІЯ ЗАВЕРШЕНА!'))
+        self.stdout.write(f'📊 Статистика:')
+        self.stdout.write(f'   • Товарів у фіді: {processed}')
+        if not images_only:
+            self.stdout.write(f'   • Без змін (пропущено за відбитком): {totals["unchanged"]}')
+            self.stdout.write(f'   • Змінено у фіді: {totals["changed"]}')
+            self.stdout.write(f'   • Оновлено товарів: {totals["updated"]}')
+            self.stdout.write(f'   • Перезаписано характеристик: {totals["attributes"]}')
+        self.stdout.write(f'   • Нових у фіді (немає в базі): {totals["missing"]}')
+        self.stdout.write(f'   • Завантажено картинок: {totals["images"]}')
+        self.stdout.write(f'   • Пропущено (без артикулу): {totals["skipped"]}')
+        self.stdout.write(f'   • Запитів до БД: {totals["queries"]}')
+        if totals['errors'] > 0:
+            self.stdout.write(self.style.WARNING(f'   • Помилок: {totals["errors"]}'))
+        if self.report.dry_run:
+            self.stdout.write(self.style.WARNING('   • Пробний запуск: зміни відкочено'))
+            self.stdout.write('='*60)
+            return
+
+        # Ціна, наявність і категорії змінених товарів на сторінках категорій
+        refresh_memberships(changed_ids)
+        # Головна картинка та категорії в картках змінених товарів
+        refresh_cards(changed_ids)
+        # Характеристики, наявність і категорії впливають на фасети всіх гілок
+        if changed_ids:
+            rebuild_facets()
+        # Скидаємо кеш тільки сторінок змінених товарів
+        invalidate_products(changed_ids)
+        self.stdout.write(self.style.SUCCESS(f'   • Кеш скинуто для {len(changed_ids)} товарів ✓'))
+
+        self.stdout.write('='*60)
+        if self.warm_cache and changed_ids:
+            call_command('warm_cache', stdout=self.stdout)
@@ -1,14 +1,23 @@
 """
 Швидке оновлення цін та наявності з XLS файлу постачальника
 Використовується для оновлення кожні 2 години
+
+Файл (XLSX або CSV) читається потоково, товари кожного пакету
+завантажуються одним запитом, зміни записуються одним bulk_update.
 """
 import requests
-import openpyxl
-from io import BytesIO
 from decimal import Decimal
+from django.core.management import call_command
 from django.core.management.base import BaseCommand
 from django.db import transaction
 from apps.products.models import Product
+from apps.products.services.cache_invalidation import invalidate_products
+from apps.products.services.category_membership import refresh_memberships
+from apps.products.services.facets import rebuild_facets
+from apps.products.utils.feed_fetcher import fetch_feed
+from apps.products.utils.feed_reader import iter_batches
+from apps.products.utils.price_reader import iter_price_rows
+from apps.products.utils.sync_report import SyncReport, add_report_arguments, dry_run_atomic, reserve_stdout
 
 
 class Command(BaseCommand):
@@ -19,126 +28,175 @@ class Command(BaseCommand):
             '--url',
             type=str,
             default='https://smtm.com.ua/_prices/price-retail.xls',
-            help='URL XLS файлу для оновлення'
+            help='URL або шлях до файлу XLSX/CSV для оновлення'
         )
         parser.add_argument(
             '--batch-size',
             type=int,
-            default=100,
+            default=500,
             help='Розмір пакету для обробки'
         )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Оновити навіть якщо файл не змінився з останнього запуску'
+        )
+        parser.add_argument(
+            '--warm-cache',
+            action='store_true',
+            help='Після оновлення прогріти кеш сторінок (warm_cache), якщо щось змінилось'
+        )
+        add_report_arguments(parser)
 
     def handle(self, *args, **options):
+        # Лічильники останнього запуску (читає воркер фонових задач)
+        self.stats = {}
+        self.changed_ids = set()
+        self.report = SyncReport('update_prices_xls', dry_run=options['dry_run'])
+        report_stream = reserve_stdout(self, options['report'])
+        try:
+            self._update(options)
+        finally:
+            self.report.finish(self.stats, self.stats.get('error', ''))
+            self.report.write(options['report'], report_stream)
+
+    def _update(self, options):
         url = options['url']
         batch_size = options['batch_size']
+        force = options['force']
+        dry_run = options['dry_run']
+        report = self.report
 
         self.stdout.write(self.style.SUCCESS('🔄 ОНОВЛЕННЯ ЦІН ТА НАЯВНОСТІ'))
         self.stdout.write('='*60)
         self.stdout.write(f'📥 Завантаження даних з {url}...')
+        if dry_run:
+            self.stdout.write(self.style.WARNING('🧪 Пробний запуск: зміни не записуються в базу'))
 
         try:
-            # Завантажуємо XLS
-            response = requests.get(url, timeout=30)
-            response.raise_for_status()
-            
-            # Завантажуємо workbook
-            workbook = openpyxl.load_workbook(BytesIO(response.content), read_only=True)
-            sheet = workbook.active
-            
-            # Пропускаємо заголовок (перший рядок)
-            rows = list(sheet.iter_rows(min_row=2, values_only=True))
-            total_rows = len(rows)
-            
-            self.stdout.write(f'📦 Знайдено {total_rows} записів для оновлення')
+            # Завантажуємо XLS у кеш на диску (умовний запит)
+            with report.stage('download'):
+                payload = fetch_feed(url, timeout=30)
+            if not force and not dry_run and payload.is_processed('update_prices_xls'):
+                self.stdout.write(self.style.SUCCESS('✅ Файл не змінився з останнього оновлення - пропускаємо (--force для примусової обробки)'))
+                self.stats['unchanged_feed'] = True
+                return
             
+            # Рядки читаються потоково (XLSX або CSV), заголовок пропускається
+            rows = report.iterate('parse', iter_price_rows(payload.path))
+
             # Лічильники
+            processed = 0
             updated_count = 0
             not_found_count = 0
             error_count = 0
-            
-            # Обробляємо пакетами
-            for i in range(0, total_rows, batch_size):
-                batch = rows[i:i + batch_size]
-                
-                with transaction.atomic():
-                    for row in batch:
-                        try:
-                            # Структура файлу: артикул, назва, ціна, наявність
-                            # Наявність: 0,1,2,3,4,5 (якщо 5 = 5 або більше)
-                            if len(row) < 4:
-                                continue
-                            
-                            vendor_code = str(row[0]).strip() if row[0] else None
-                            price = row[2]
-                            stock = row[3]
-                            
-                            if not vendor_code:
-                                continue
-                            
-                            # Знаходимо товар
-                            try:
-                                product = Product.objects.get(external_id=vendor_code)
-                            except Product.DoesNotExist:
-                                not_found_count += 1
-                                continue
-                            
-                            # Оновлюємо дані
-                            updated = False
-                            
-                            # Оновлюємо ціну
-                            if price:
-                                try:
-                                    new_price = Decimal(str(price))
-                                    if product.retail_price != new_price:
-                                        product.retail_price = new_price
-                                        updated = True
-                                except (ValueError, TypeError, Decimal.InvalidOperation):
-                                    pass
-                            
-                            # Оновлюємо наявність
-                            if stock is not None:
-                                try:
-                                    new_stock = int(stock)
-                                    if product.stock != new_stock:
-                                        product.stock = new_stock
-                                        updated = True
-                                except (ValueError, TypeError):
-                                    pass
-                            
-                            if updated:
-                                product.save(update_fields=['retail_price', 'stock'])
-                                updated_count += 1
-                        
-                        except Exception as e:
-                            error_count += 1
-                            self.stdout.write(f'  ❌ Помилка обробки: {e}')
-                
-                # Прогрес
-                processed = min(i + batch_size, total_rows)
-                self.stdout.write(f'  ✅ Оброблено: {processed}/{total_rows}')
-            
-            workbook.close()
+
+            # Обробляємо пакетами по мірі читання файлу
+            with dry_run_atomic(dry_run):
+                for batch in iter_batches(rows, batch_size):
+                    updated, not_found, errors = self._update_batch(batch)
+                    updated_count += updated
+                    not_found_count += not_found
+                    error_count += errors
+
+                    # Прогрес
+                    processed += len(batch)
+                    self.stdout.write(f'  ✅ Оброблено: {processed}')
             
             # Підсумок
+            self.stats.update(processed=processed, updated=updated_count, not_found=not_found_count, errors=error_count)
             self.stdout.write('\n' + '='*60)
             self.stdout.write(self.style.SUCCESS('🎉 ОНОВЛЕННЯ ЗАВЕРШЕНО!'))
             self.stdout.write(f'📊 Статистика:')
+            self.stdout.write(f'   • Записів у файлі: {processed}')
             self.stdout.write(f'   • Оновлено товарів: {updated_count}')
             self.stdout.write(f'   • Не знайдено в базі: {not_found_count}')
             if error_count > 0:
                 self.stdout.write(self.style.WARNING(f'   • Помилок: {error_count}'))
             
-            # Очищення кешу після оновлення
-            from django.core.cache import cache
-            cache.clear()
-            self.stdout.write(self.style.SUCCESS('   • Кеш очищено ✓'))
+            if dry_run:
+                self.stdout.write('='*60)
+                return
+
+            refresh_memberships(self.changed_ids)
+            if self.changed_ids:
+                rebuild_facets()
+            # Скидаємо кеш тільки сторінок змінених товарів
+            invalidate_products(self.changed_ids)
+            self.stdout.write(self.style.SUCCESS(f'   • Кеш скинуто для {len(self.changed_ids)} товарів ✓'))
             
             self.stdout.write('='*60)
+            if error_count:
+                self.stdout.write(self.style.WARNING('⚠️  Були помилки - фід не позначено обробленим, наступний запуск повторить його'))
+            else:
+                payload.mark_processed('update_prices_xls')
+            if options['warm_cache'] and self.changed_ids:
+                call_command('warm_cache', stdout=self.stdout)
 
         except requests.RequestException as e:
+            self.stats['error'] = str(e)
             self.stdout.write(self.style.ERROR(f'❌ Помилка завантаження XLS: {e}'))
         except Exception as e:
+            self.stats['error'] = str(e)
             self.stdout.write(self.style.ERROR(f'❌ Непередбачена помилка: {e}'))
             import traceback
             self.stdout.write(traceback.format_exc())
 
+    def _update_batch(self, batch):
+        """
+        Оновлює ціни та наявність пакету рядків
+
+        Товари пакету завантажуються одним in_bulk, зміни записуються одним
+        bulk_update. Returns: (оновлено, не знайдено, помилок)
+        """
+        # Структура файлу: артикул, назва, ціна, наявність
+        # Наявність: 0,1,2,3,4,5 (якщо 5 = 5 або більше)
+        rows = {}
+        for row in batch:
+            if len(row) < 4 or not row[0]:
+                continue
+            rows[str(row[0]).strip()] = (row[2], row[3])
+
+        with self.report.stage('lookup'):
+            products = Product.objects.only('id', 'external_id', 'retail_price', 'stock', 'feed_hash').in_bulk(
+                rows.keys(), field_name='external_id'
+            )
+        not_found = len(rows) - len(products)
+        errors = 0
+        changed = []
+
+        for vendor_code, product in products.items():
+            price, stock = rows[vendor_code]
+            updated = False
+
+            # Оновлюємо ціну
+            if price:
+                try:
+                    new_price = Decimal(str(price))
+                    if product.retail_price != new_price:
+                        product.retail_price = new_price
+                        updated = True
+                except (ValueError, TypeError, ArithmeticError):
+                    errors += 1
+
+            # Оновлюємо наявність
+            if stock is not None:
+                try:
+                    new_stock = int(Decimal(str(stock)))
+                    if product.stock != new_stock:
+                        product.stock = new_stock
+                        updated = True
+                except (ValueError, TypeError, ArithmeticError):
+                    errors += 1
+
+            if updated:
+                # Наступна синхронізація з фідом не пропустить товар за відбитком
+                product.feed_hash = ''
+                changed.append(product)
+                self.changed_ids.add(product.id)
+
+        if changed:
+            with self.report.stage('write'), transaction.atomic():
+                Product.objects.bulk_update(changed, ['retail_price', 'stock', 'feed_hash'])
+        return len(changed), not_found, errors
+
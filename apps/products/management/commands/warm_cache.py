@@ -0,0 +1,63 @@
+"""
+Прогрів кешу головної, акцій та сторінок категорій після синхронізації
+"""
+from django.core.management.base import BaseCommand
+from apps.products.services.cache_warmer import site_target, warm_cache, warm_urls
+
+
+class Command(BaseCommand):
+    help = 'Рендерить головну, акції та перші сторінки категорій, щоб заповнити кеш до приходу відвідувачів'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--categories',
+            type=int,
+            default=10,
+            help='Кількість головних категорій для прогріву'
+        )
+        parser.add_argument(
+            '--pages',
+            type=int,
+            default=2,
+            help='Кількість сторінок кожної категорії'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Кількість паралельних потоків'
+        )
+        parser.add_argument(
+            '--site-url',
+            type=str,
+            help='Адреса сайту, напр. https://example.com (ключ кешу залежить від хоста); '
+                 'за замовчуванням - SITE_URL'
+        )
+
+    def handle(self, *args, **options):
+        host, secure = site_target(options['site_url'])
+        scheme = 'https' if secure else 'http'
+        # Лічильники останнього запуску (читає воркер фонових задач)
+        self.stats = {}
+
+        self.stdout.write(self.style.SUCCESS('🔥 ПРОГРІВ КЕШУ'))
+        self.stdout.write('='*60)
+
+        groups = warm_urls(categories=options['categories'], pages=options['pages'])
+        self.stdout.write(f'🌐 {scheme}://{host}: до {sum(map(len, groups))} сторінок, потоків: {options["workers"]}')
+
+        results = warm_cache(groups, host, secure=secure, workers=options['workers'])
+        failed = 0
+        for result in results:
+            if result['status'] == 200:
+                self.stdout.write(f'  ✅ {result["seconds"]:.2f} с  {result["url"]}')
+            else:
+                failed += 1
+                self.stdout.write(self.style.WARNING(
+                    f'  ⚠️  {result["status"] or result["error"]}  {result["seconds"]:.2f} с  {result["url"]}'
+                ))
+
+        total = sum(result['seconds'] for result in results)
+        self.stats.update(pages=len(results), failed=failed, seconds=round(total, 3))
+        self.stdout.write('='*60)
+        self.stdout.write(self.style.SUCCESS(f'🎉 Прогріто {len(results) - failed}/{len(results)} сторінок ({total:.2f} с)'))
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0031_add_performance_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='attributes_hash',
+            field=models.CharField(blank=True, editable=False, help_text='Відбиток списку <param> з фіду; однаковий хеш - характеристики не перезаписуються', max_length=40, verbose_name='Хеш характеристик'),
+        ),
+    ]
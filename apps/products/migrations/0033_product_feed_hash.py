@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0032_product_attributes_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='feed_hash',
+            field=models.CharField(blank=True, editable=False, help_text='Відбиток товару з фіду на момент останньої синхронізації', max_length=40, verbose_name='Хеш товару у фіді'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0033_product_feed_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('sync', 'Синхронізація цін та наявності')], default='sync', max_length=20, verbose_name='Тип')),
+                ('status', models.CharField(choices=[('queued', 'В черзі'), ('running', 'Виконується'), ('success', 'Успішно'), ('failed', 'Помилка')], db_index=True, default='queued', max_length=20, verbose_name='Статус')),
+                ('progress', models.CharField(blank=True, help_text='Останній рядок виводу команди', max_length=255, verbose_name='Прогрес')),
+                ('stats', models.JSONField(blank=True, default=dict, verbose_name='Лічильники')),
+                ('error', models.TextField(blank=True, verbose_name='Помилка')),
+                ('output', models.TextField(blank=True, verbose_name='Вивід')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Створено')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Почато')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Завершено')),
+                ('heartbeat_at', models.DateTimeField(blank=True, help_text='Оновлюється під час виконання; задача без активності вважається завислою', null=True, verbose_name='Остання активність')),
+            ],
+            options={
+                'verbose_name': 'Задача синхронізації',
+                'verbose_name_plural': 'Задачі синхронізації',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0034_syncjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productimage',
+            name='check_status',
+            field=models.PositiveSmallIntegerField(blank=True, help_text='0 - сервер недоступний', null=True, verbose_name='HTTP статус перевірки'),
+        ),
+        migrations.AddField(
+            model_name='productimage',
+            name='content_length',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='Розмір, байт'),
+        ),
+        migrations.AddField(
+            model_name='productimage',
+            name='checked_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Перевірено'),
+        ),
+        migrations.AddField(
+            model_name='productimage',
+            name='is_broken',
+            field=models.BooleanField(default=False, help_text='Не показується і не може бути головним', verbose_name='Бите посилання'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0035_productimage_check'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productimage',
+            name='variants',
+            field=models.JSONField(blank=True, default=dict, verbose_name='Зменшені копії'),
+        ),
+        migrations.AddField(
+            model_name='productimage',
+            name='variants_at',
+            field=models.DateTimeField(blank=True, help_text='Порожньо - копії ще не створювались', null=True, verbose_name='Копії створено'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0036_productimage_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductCategoryMembership',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('is_visible', models.BooleanField(default=True, help_text='Товар активний і є в наявності', verbose_name='Показується')),
+                ('created_at', models.DateTimeField(verbose_name='Створено товар')),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Поточна ціна')),
+                ('name', models.CharField(max_length=200, verbose_name='Назва товару')),
+                ('category', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='memberships', to='products.category')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='category_memberships', to='products.product')),
+            ],
+            options={
+                'verbose_name': 'Товар у категорії',
+                'verbose_name_plural': 'Товари в категоріях',
+                'indexes': [
+                    models.Index(fields=['category', 'is_visible', '-created_at', '-product'], name='membership_new_idx'),
+                    models.Index(fields=['category', 'is_visible', 'price'], name='membership_price_idx'),
+                    models.Index(fields=['category', 'is_visible', 'name'], name='membership_name_idx'),
+                ],
+                'constraints': [
+                    models.UniqueConstraint(fields=('category', 'product'), name='membership_category_product'),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0037_productcategorymembership'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryFacetIndex',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.JSONField(default=list, verbose_name='Фасети')),
+                ('product_count', models.PositiveIntegerField(default=0, verbose_name='Товарів')),
+                ('built_at', models.DateTimeField(auto_now=True, verbose_name='Побудовано')),
+                ('category', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='facet_index', to='products.category')),
+            ],
+            options={
+                'verbose_name': 'Фасети категорії',
+                'verbose_name_plural': 'Фасети категорій',
+            },
+        ),
+    ]
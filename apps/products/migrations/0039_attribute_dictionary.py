@@ -0,0 +1,67 @@
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import Trim
+
+
+def fill_dictionary(apps, schema_editor):
+    """Переносить рядки назв і значень характеристик у словники"""
+    ProductAttribute = apps.get_model('products', 'ProductAttribute')
+    AttributeName = apps.get_model('products', 'AttributeName')
+    AttributeValue = apps.get_model('products', 'AttributeValue')
+
+    names = ProductAttribute.objects.annotate(text=Trim('name')).values_list('text', flat=True).order_by().distinct()
+    AttributeName.objects.bulk_create([AttributeName(name=name) for name in names], batch_size=1000)
+    values = ProductAttribute.objects.annotate(text=Trim('value')).values_list('text', flat=True).order_by().distinct()
+    AttributeValue.objects.bulk_create([AttributeValue(value=value) for value in values], batch_size=1000)
+
+    # Один UPDATE на всю таблицю замість збереження кожного рядка
+    ProductAttribute.objects.update(
+        name_ref=Subquery(AttributeName.objects.filter(name=Trim(OuterRef('name'))).values('id')[:1]),
+        value_ref=Subquery(AttributeValue.objects.filter(value=Trim(OuterRef('value'))).values('id')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0038_categoryfacetindex'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttributeName',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='Назва')),
+            ],
+            options={
+                'verbose_name': 'Назва характеристики',
+                'verbose_name_plural': 'Назви характеристик',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='AttributeValue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.CharField(max_length=200, unique=True, verbose_name='Значення')),
+            ],
+            options={
+                'verbose_name': 'Значення характеристики',
+                'verbose_name_plural': 'Значення характеристик',
+                'ordering': ['value'],
+            },
+        ),
+        migrations.AddField(
+            model_name='productattribute',
+            name='name_ref',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='products.attributename'),
+        ),
+        migrations.AddField(
+            model_name='productattribute',
+            name='value_ref',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='products.attributevalue'),
+        ),
+        migrations.RunPython(fill_dictionary, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """
+    Окремо від 0039: у PostgreSQL не можна змінювати таблицю в тій же
+    транзакції, де оновлювались її зовнішні ключі (pending trigger events)
+    """
+
+    dependencies = [
+        ('products', '0039_attribute_dictionary'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='productattribute',
+            name='name',
+        ),
+        migrations.RemoveField(
+            model_name='productattribute',
+            name='value',
+        ),
+        migrations.RenameField(
+            model_name='productattribute',
+            old_name='name_ref',
+            new_name='name',
+        ),
+        migrations.RenameField(
+            model_name='productattribute',
+            old_name='value_ref',
+            new_name='value',
+        ),
+        migrations.AlterField(
+            model_name='productattribute',
+            name='name',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='product_attributes', to='products.attributename', verbose_name='Назва характеристики'),
+        ),
+        migrations.AlterField(
+            model_name='productattribute',
+            name='value',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='product_attributes', to='products.attributevalue', verbose_name='Значення'),
+        ),
+        migrations.AlterModelOptions(
+            name='productattribute',
+            options={'ordering': ['sort_order', 'id'], 'verbose_name': 'Характеристика товару', 'verbose_name_plural': 'Характеристики товарів'},
+        ),
+    ]
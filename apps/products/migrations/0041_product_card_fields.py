@@ -0,0 +1,31 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0040_productattribute_dictionary_refs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='main_image_url',
+            field=models.CharField(blank=True, editable=False, max_length=500, verbose_name='Картинка картки'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='thumbnail_url',
+            field=models.CharField(blank=True, editable=False, max_length=500, verbose_name='Мініатюра'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='main_image_srcset',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='{"webp": ..., "jpeg": ...}', verbose_name='srcset картинки картки'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='card_category_slugs',
+            field=models.TextField(blank=True, editable=False, verbose_name='Категорії картки'),
+        ),
+    ]
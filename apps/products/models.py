@@ -1,11 +1,19 @@
 """
 Моделі товарів та категорій
 """
-from django.db import models
+import hashlib
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import models, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.urls import reverse
 from django.utils.text import slugify
 import time
 
+from apps.core.cache_tags import invalidate
+
 
 class Category(models.Model):
     """Категорії товарів з підтримкою ієрархії"""
@@ -42,6 +50,8 @@ class Category(models.Model):
     is_active = models.BooleanField('Активна', default=True)
     sort_order = models.PositiveIntegerField('Порядок сортування', default=0)
     created_at = models.DateTimeField('Створено', auto_now_add=True)
+    # Разом з кількістю категорій - версія дерева категорій (services.category_tree)
+    updated_at = models.DateTimeField('Оновлено', auto_now=True)
     
     # SEO поля
     meta_title = models.CharField('SEO заголовок', max_length=200, blank=True)
@@ -63,12 +73,9 @@ class Category(models.Model):
         return reverse('products:category', kwargs={'slug': self.slug})
     
     def get_all_children(self):
-        """Повертає всі дочірні категорії рекурсивно"""
-        children = []
-        for child in self.children.filter(is_active=True):
-            children.append(child)
-            children.extend(child.get_all_children())
-        return children
+        """Повертає всі активні дочірні категорії на всіх рівнях (з дерева категорій)"""
+        from apps.products.services.category_tree import get_tree
+        return get_tree().descendants(self.id)
     
     def __str__(self):
         if self.parent:
@@ -146,6 +153,20 @@ class Product(models.Model):
         blank=True,
         help_text='Назва бренду/постачальника з фіду'
     )
+    feed_hash = models.CharField(
+        'Хеш товару у фіді',
+        max_length=40,
+        blank=True,
+        editable=False,
+        help_text='Відбиток товару з фіду на момент останньої синхронізації'
+    )
+    attributes_hash = models.CharField(
+        'Хеш характеристик',
+        max_length=40,
+        blank=True,
+        editable=False,
+        help_text='Відбиток списку <param> з фіду; однаковий хеш - характеристики не перезаписуються'
+    )
     stock = models.PositiveIntegerField('Кількість на складі', default=0)
     is_active = models.BooleanField('Активний', default=True)
     is_featured = models.BooleanField('Рекомендований', default=False)
@@ -174,6 +195,16 @@ class Product(models.Model):
     meta_title = models.CharField('SEO заголовок', max_length=200, blank=True)
     meta_description = models.TextField('SEO опис', max_length=300, blank=True)
     
+    # Дані картки товару у списках (services/product_cards.py): без запитів
+    # до картинок і категорій на кожну картку
+    main_image_url = models.CharField('Картинка картки', max_length=500, blank=True, editable=False)
+    thumbnail_url = models.CharField('Мініатюра', max_length=500, blank=True, editable=False)
+    main_image_srcset = models.JSONField(
+        'srcset картинки картки', default=dict, blank=True, editable=False,
+        help_text='{"webp": ..., "jpeg": ...}'
+    )
+    card_category_slugs = models.TextField('Категорії картки', blank=True, editable=False)
+    
     class Meta:
         verbose_name = 'Товар'
         verbose_name_plural = 'Товари'
@@ -270,14 +301,16 @@ class Product(models.Model):
     
     def get_similar_products(self, limit=4):
         """Повертає схожі товари з тієї ж основної категорії"""
-        if not self.primary_category:
+        from apps.products.services.product_cards import CARD_FIELDS
+        
+        if not self.primary_category_id:
             return Product.objects.none()
         
         return Product.objects.filter(
-            primary_category=self.primary_category,
+            primary_category_id=self.primary_category_id,
             is_active=True,
             stock__gt=0
-        ).exclude(id=self.id).order_by('?')[:limit]
+        ).exclude(id=self.id).only(*CARD_FIELDS).order_by('?')[:limit]
     
     def is_in_stock(self):
         """Перевіряє чи є товар в наявності"""
@@ -297,6 +330,36 @@ class ProductImage(models.Model):
     is_main = models.BooleanField('Головне зображення', default=False)
     sort_order = models.PositiveIntegerField('Порядок', default=0)
     
+    # Результат останньої перевірки image_url (check_images / bulk_download_images)
+    check_status = models.PositiveSmallIntegerField(
+        'HTTP статус перевірки', null=True, blank=True,
+        help_text='0 - сервер недоступний'
+    )
+    content_length = models.PositiveIntegerField('Розмір, байт', null=True, blank=True)
+    checked_at = models.DateTimeField('Перевірено', null=True, blank=True)
+    is_broken = models.BooleanField(
+        'Бите посилання', default=False,
+        help_text='Не показується і не може бути головним'
+    )
+    
+    # Каталог у сховищі для копій, створених проксі картинок постачальника
+    PROXY_COPY_DIR = 'products/proxy/'
+    
+    # Розміри зменшених копій: назва -> сторона рамки, px (від меншої до більшої)
+    VARIANT_SIZES = (
+        ('thumb', 80),    # автодоповнення пошуку, адмінка
+        ('card', 300),    # картки товарів у списках
+        ('detail', 800),  # сторінка товару
+    )
+    
+    # Зменшені копії у сховищі (generate_image_variants):
+    # {розмір: {'width', 'height', 'webp': ім'я файлу, 'jpeg': ім'я файлу}}
+    variants = models.JSONField('Зменшені копії', default=dict, blank=True)
+    variants_at = models.DateTimeField(
+        'Копії створено', null=True, blank=True,
+        help_text='Порожньо - копії ще не створювались'
+    )
+    
     class Meta:
         verbose_name = 'Зображення товару'
         verbose_name_plural = 'Зображення товарів'
@@ -305,13 +368,73 @@ class ProductImage(models.Model):
             models.Index(fields=['product', 'is_main']),
         ]
     
-    def get_image_url(self):
-        """Повертає URL зображення (завантажене або зовнішнє)"""
+    def get_image_url(self, size=None, fmt='jpeg'):
+        """
+        Повертає URL зображення (завантажене або зовнішнє)
+        
+        Зовнішнє віддається через проксі (IMAGE_PROXY_ENABLED), який при першому
+        запиті копіює його у сховище - далі це звичайний image. З size
+        ('thumb', 'card', 'detail') - URL зменшеної копії у форматі fmt
+        ('webp' або 'jpeg'), якщо вона є. Для маленьких оригіналів великих
+        копій немає - тоді береться найбільша з менших.
+        """
+        if size and self.variants:
+            variant = self._variant(size)
+            if variant:
+                return default_storage.url(variant[fmt])
         if self.image:
             return self.image.url
+        if self.image_url and settings.IMAGE_PROXY_ENABLED:
+            return self.get_proxy_url()
         return self.image_url
     
+    @staticmethod
+    def proxy_version(image_url):
+        """Версія в URL проксі: змінюється разом з URL оригіналу"""
+        return hashlib.sha1(image_url.encode('utf-8')).hexdigest()[:12]
+    
+    @classmethod
+    def proxy_copy_name(cls, image_id, image_url, ext):
+        """Ім'я копії картинки постачальника у сховищі (з версією URL оригіналу)"""
+        return f'{cls.PROXY_COPY_DIR}{image_id}-{cls.proxy_version(image_url)}.{ext}'
+    
+    def is_stale_proxy_copy(self):
+        """Чи image - копія іншого (старого) URL постачальника"""
+        name = self.image.name if self.image else ''
+        return name.startswith(self.PROXY_COPY_DIR) and f'-{self.proxy_version(self.image_url)}.' not in name
+    
+    def get_proxy_url(self):
+        """URL проксі: копіює картинку постачальника у сховище і перенаправляє туди"""
+        return reverse('products:image_proxy', kwargs={
+            'image_id': self.id, 'version': self.proxy_version(self.image_url),
+        })
+    
+    def _variant(self, size):
+        """Копія розміру size або найбільша з менших"""
+        found = None
+        for name, _ in self.VARIANT_SIZES:
+            if name in self.variants:
+                found = self.variants[name]
+            if name == size:
+                break
+        return found
+    
+    def get_srcset(self, fmt='webp', max_size='detail'):
+        """srcset з копій до max_size включно: 'url 300w, url 800w'"""
+        entries = []
+        for name, _ in self.VARIANT_SIZES:
+            variant = self.variants.get(name)
+            if variant:
+                entries.append(f"{default_storage.url(variant[fmt])} {variant['width']}w")
+            if name == max_size:
+                break
+        return ', '.join(entries)
+    
     def save(self, *args, **kwargs):
+        # Змінений URL постачальника - стару копію з проксі видаляємо зі сховища
+        if self.image_url and self.is_stale_proxy_copy():
+            self.image.delete(save=False)
+            self.image = None
         super().save(*args, **kwargs)
     
     def __str__(self):
@@ -339,18 +462,46 @@ class ProductTag(models.Model):
         return self.name
 
 
+class AttributeName(models.Model):
+    """Словник назв характеристик (кожен рядок - один раз на весь каталог)"""
+    
+    name = models.CharField('Назва', max_length=100, unique=True)
+    
+    class Meta:
+        verbose_name = 'Назва характеристики'
+        verbose_name_plural = 'Назви характеристик'
+        ordering = ['name']
+    
+    def __str__(self):
+        return self.name
+
+
+class AttributeValue(models.Model):
+    """Словник значень характеристик"""
+    
+    value = models.CharField('Значення', max_length=200, unique=True)
+    
+    class Meta:
+        verbose_name = 'Значення характеристики'
+        verbose_name_plural = 'Значення характеристик'
+        ordering = ['value']
+    
+    def __str__(self):
+        return self.value
+
+
 class ProductAttribute(models.Model):
-    """Характеристики товарів"""
+    """Характеристики товарів (пара id зі словників назв і значень)"""
     
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='attributes')
-    name = models.CharField('Назва характеристики', max_length=100)
-    value = models.CharField('Значення', max_length=200)
+    name = models.ForeignKey(AttributeName, on_delete=models.PROTECT, related_name='product_attributes', verbose_name='Назва характеристики')
+    value = models.ForeignKey(AttributeValue, on_delete=models.PROTECT, related_name='product_attributes', verbose_name='Значення')
     sort_order = models.PositiveIntegerField('Порядок', default=0)
     
     class Meta:
         verbose_name = 'Характеристика товару'
         verbose_name_plural = 'Характеристики товарів'
-        ordering = ['sort_order', 'name']
+        ordering = ['sort_order', 'id']
     
     def __str__(self):
         return f"{self.name}: {self.value}"
@@ -410,3 +561,66 @@ class TopProduct(models.Model):
     
     def __str__(self):
         return f"Лідер продажу: {self.product.name}"
+
+
+class ProductCategoryMembership(models.Model):
+    """
+    Товар на сторінці категорії (денормалізована таблиця)
+
+    Рядок на кожну категорію, де показується товар: основна, додаткові та
+    всі їхні батьківські. Видимість і ключі сортування скопійовані з товару,
+    тому сторінка категорії читає один діапазон індексу без JOIN і DISTINCT.
+    Оновлюється services.category_membership - не редагувати вручну.
+    """
+
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='memberships', db_index=False)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='category_memberships')
+    is_visible = models.BooleanField('Показується', default=True, help_text='Товар активний і є в наявності')
+    created_at = models.DateTimeField('Створено товар')
+    price = models.DecimalField('Поточна ціна', max_digits=10, decimal_places=2)
+    name = models.CharField('Назва товару', max_length=200)
+
+    class Meta:
+        verbose_name = 'Товар у категорії'
+        verbose_name_plural = 'Товари в категоріях'
+        constraints = [
+            models.UniqueConstraint(fields=['category', 'product'], name='membership_category_product'),
+        ]
+        indexes = [
+            models.Index(fields=['category', 'is_visible', '-created_at', '-product'], name='membership_new_idx'),
+            models.Index(fields=['category', 'is_visible', 'price'], name='membership_price_idx'),
+            models.Index(fields=['category', 'is_visible', 'name'], name='membership_name_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.category_id}: {self.product_id}'
+
+
+class CategoryFacetIndex(models.Model):
+    """
+    Фасети категорії за характеристиками товарів (разом з підкатегоріями)
+
+    data - список [назва, [[значення, [id товарів]], ...]] у порядку показу.
+    Будується після синхронізації (services.facets) - не редагувати вручну.
+    """
+
+    category = models.OneToOneField(Category, on_delete=models.CASCADE, related_name='facet_index')
+    data = models.JSONField('Фасети', default=list)
+    product_count = models.PositiveIntegerField('Товарів', default=0)
+    built_at = models.DateTimeField('Побудовано', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Фасети категорії'
+        verbose_name_plural = 'Фасети категорій'
+
+    def __str__(self):
+        return f'Фасети: {self.category_id}'
+
+
+@receiver([post_save, post_delete], sender=Category)
+def category_changed(sender, **kwargs):
+    """Меню і дерево категорій (services.category_tree) будуються заново"""
+    from apps.products.services.category_tree import reset_tree
+    reset_tree()
+    # Закешовані сторінки з меню - після коміту, інакше кеш заповниться старими даними
+    transaction.on_commit(lambda: invalidate('menu'))
@@ -0,0 +1,76 @@
+"""
+Фонові задачі синхронізації з постачальником
+
+Endpoint /products/api/trigger-sync/ тільки ставить задачу в чергу,
+а виконує її окремий процес (python manage.py run_sync_jobs), щоб
+синхронізація не займала потік gunicorn на кілька хвилин.
+"""
+from django.db import models
+from django.utils import timezone
+
+
+class SyncJob(models.Model):
+    """Задача синхронізації в черзі"""
+
+    KIND_CHOICES = [
+        ('sync', 'Синхронізація цін та наявності'),
+    ]
+
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCESS = 'success'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'В черзі'),
+        (STATUS_RUNNING, 'Виконується'),
+        (STATUS_SUCCESS, 'Успішно'),
+        (STATUS_FAILED, 'Помилка'),
+    ]
+
+    kind = models.CharField('Тип', max_length=20, choices=KIND_CHOICES, default='sync')
+    status = models.CharField('Статус', max_length=20, choices=STATUS_CHOICES, default=STATUS_QUEUED, db_index=True)
+    progress = models.CharField('Прогрес', max_length=255, blank=True, help_text='Останній рядок виводу команди')
+    stats = models.JSONField('Лічильники', default=dict, blank=True)
+    error = models.TextField('Помилка', blank=True)
+    output = models.TextField('Вивід', blank=True)
+
+    created_at = models.DateTimeField('Створено', auto_now_add=True)
+    started_at = models.DateTimeField('Почато', null=True, blank=True)
+    finished_at = models.DateTimeField('Завершено', null=True, blank=True)
+    heartbeat_at = models.DateTimeField(
+        'Остання активність',
+        null=True,
+        blank=True,
+        help_text='Оновлюється під час виконання; задача без активності вважається завислою'
+    )
+
+    class Meta:
+        verbose_name = 'Задача синхронізації'
+        verbose_name_plural = 'Задачі синхронізації'
+        ordering = ['-created_at']
+
+    @property
+    def duration(self):
+        """Тривалість виконання в секундах (для задачі, що виконується - досі)"""
+        if not self.started_at:
+            return None
+        end = self.finished_at or timezone.now()
+        return (end - self.started_at).total_seconds()
+
+    def to_dict(self):
+        """Стан задачі для JSON відповіді"""
+        return {
+            'job_id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'progress': self.progress,
+            'stats': self.stats,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'duration': round(self.duration, 1) if self.duration is not None else None,
+        }
+
+    def __str__(self):
+        return f"{self.get_kind_display()} #{self.id} ({self.get_status_display()})"
@@ -72,25 +72,18 @@ class Sale(models.Model):
         return self.start_date <= now <= self.end_date
     
     def get_affected_products(self):
-        """Повертає всі товари, на які діє акція"""
+        """Повертає всі товари, на які діє акція (категорії - разом з підкатегоріями)"""
         from .models import Product
+        from .services.category_tree import get_tree
         products = set(self.products.all())
         
-        for category in self.categories.all():
-            category_products = Product.objects.filter(
-                Q(primary_category=category) | Q(categories=category),
+        category_ids = get_tree().subtree_ids(self.categories.values_list('id', flat=True))
+        if category_ids:
+            products.update(Product.objects.filter(
+                Q(primary_category_id__in=category_ids) | Q(categories__id__in=category_ids),
                 is_active=True,
                 stock__gt=0
-            ).distinct()
-            products.update(category_products)
-            
-            for child_category in category.get_all_children():
-                child_products = Product.objects.filter(
-                    Q(primary_category=child_category) | Q(categories=child_category),
-                    is_active=True,
-                    stock__gt=0
-                ).distinct()
-                products.update(child_products)
+            ).distinct())
         
         return list(products)
     
@@ -115,6 +108,7 @@ class Sale(models.Model):
             product.sale_start_date = self.start_date
             product.sale_end_date = self.end_date
             product.save(update_fields=['is_sale', 'sale_price', 'sale_name', 'sale_start_date', 'sale_end_date'])
+        _refresh_prices(products)
     
     def remove_from_products(self):
         """Знімає акцію з товарів, перевіряючи чи не належать іншій активній акції"""
@@ -130,6 +124,7 @@ class Sale(models.Model):
                 product.sale_start_date = None
                 product.sale_end_date = None
                 product.save(update_fields=['is_sale', 'sale_price', 'sale_name', 'sale_start_date', 'sale_end_date'])
+        _refresh_prices(products)
     
     def _apply_to_single_product(self, product):
         """Застосовує акцію до одного товару"""
@@ -200,6 +195,7 @@ def _clean_removed_products(sender, instance, action, pk_set):
             is_active=True,
         ).distinct()
     
+    removed_products = list(removed_products)
     for product in removed_products:
         if product.sale_name == instance.name:
             other_sale = instance._find_other_active_sale(product)
@@ -212,4 +208,10 @@ def _clean_removed_products(sender, instance, action, pk_set):
                 product.sale_start_date = None
                 product.sale_end_date = None
                 product.save(update_fields=['is_sale', 'sale_price', 'sale_name', 'sale_start_date', 'sale_end_date'])
+    _refresh_prices(removed_products)
 
+
+def _refresh_prices(products):
+    """Поточна ціна - ключ сортування в таблиці товарів у категоріях"""
+    from .services.category_membership import refresh_memberships
+    refresh_memberships(product.id for product in products)
@@ -0,0 +1,3 @@
+"""
+Сервіси для роботи з каталогом товарів
+"""
@@ -0,0 +1,71 @@
+"""
+Виділення унікальних slug та артикулів (SKU) в пам'яті
+
+Замість циклу `while Model.objects.filter(slug=slug).exists()` та
+тимчасового SKU з другим UPDATE на кожен запис усі зайняті значення
+завантажуються одним запитом, а далі перевірка йде по множині в пам'яті.
+Це дозволяє створювати нові товари через bulk_create.
+"""
+from apps.products.models import Product
+
+
+class SlugAllocator:
+    """Видає унікальні slug для моделі (суфікси -1, -2, ... як раніше)"""
+
+    def __init__(self, model, field='slug', taken=None):
+        self.max_length = model._meta.get_field(field).max_length
+        if taken is None:
+            taken = model.objects.values_list(field, flat=True)
+        self.taken = set(taken)
+        # Наступний суфікс для кожної основи - повторні назви не перебирають все заново
+        self._counters = {}
+
+    def allocate(self, base_slug):
+        """Повертає вільний slug на основі base_slug і позначає його зайнятим"""
+        base_slug = base_slug[:self.max_length]
+        slug = base_slug
+        counter = self._counters.get(base_slug, 1)
+        while slug in self.taken:
+            suffix = f'-{counter}'
+            slug = f'{base_slug[:self.max_length - len(suffix)]}{suffix}'
+            counter += 1
+        self._counters[base_slug] = counter
+        self.taken.add(slug)
+        return slug
+
+
+class SkuAllocator:
+    """
+    Видає артикули BS{n:05d} для нових товарів
+
+    Нумерація йде після найбільшого id, тому не перетинається з артикулами,
+    які Product.save() генерує з id для товарів, створених в адмінці.
+    """
+
+    def __init__(self, taken, last_id, prefix='BS'):
+        self.taken = set(taken)
+        self.prefix = prefix
+        self._next = (last_id or 0) + 1
+
+    def allocate(self):
+        sku = f'{self.prefix}{self._next:05d}'
+        while sku in self.taken:
+            self._next += 1
+            sku = f'{self.prefix}{self._next:05d}'
+        self._next += 1
+        self.taken.add(sku)
+        return sku
+
+
+def product_allocators():
+    """
+    Аллокатори slug та SKU для нових товарів за один запит до бази
+
+    Returns:
+        tuple: (SlugAllocator, SkuAllocator)
+    """
+    rows = list(Product.objects.values_list('id', 'slug', 'sku'))
+    last_id = max((row[0] for row in rows), default=0)
+    slugs = SlugAllocator(Product, taken=[row[1] for row in rows])
+    skus = SkuAllocator([row[2] for row in rows], last_id)
+    return slugs, skus
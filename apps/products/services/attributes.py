@@ -0,0 +1,99 @@
+"""
+Запис характеристик товарів з фіду
+
+Назви й значення зберігаються у словниках AttributeName / AttributeValue,
+а ProductAttribute - лише пара id. Рядки перетворюються на id через
+AttributeDictionary: словник завантажується один раз за запуск імпорту,
+далі до бази йдуть тільки нові назви та значення.
+"""
+from django.db import transaction
+
+from apps.products.models import AttributeName, AttributeValue, ProductAttribute
+from apps.products.utils.fingerprints import params_fingerprint
+
+
+class AttributeDictionary:
+    """
+    Рядок -> id для назв і значень характеристик (в пам'яті на весь запуск)
+
+    Нові рядки потрапляють у кеш лише після коміту транзакції: якщо пакет
+    відкотився, його id у словнику не залишаться.
+    """
+
+    def __init__(self):
+        self.names = dict(AttributeName.objects.values_list('name', 'id'))
+        self.values = dict(AttributeValue.objects.values_list('value', 'id'))
+
+    def resolve(self, params):
+        """
+        Args:
+            params: [(назва, значення), ...]
+
+        Returns:
+            list: [(name_id, value_id), ...] у тому ж порядку
+        """
+        params = [(normalize_name(name), normalize_value(value)) for name, value in params]
+        names = self._intern(self.names, AttributeName, 'name', {name for name, _ in params})
+        values = self._intern(self.values, AttributeValue, 'value', {value for _, value in params})
+        return [(names[name], values[value]) for name, value in params]
+
+    def _intern(self, known, model, field, texts):
+        """id для texts; відсутні у словнику рядки створюються одним bulk_create"""
+        missing = [text for text in texts if text not in known]
+        if not missing:
+            return known
+        model.objects.bulk_create([model(**{field: text}) for text in missing], ignore_conflicts=True)
+        created = dict(model.objects.filter(**{f'{field}__in': missing}).values_list(field, 'id'))
+        transaction.on_commit(lambda: known.update(created))
+        return {**known, **created}
+
+
+def normalize_name(name):
+    return name[:100].strip()
+
+
+def normalize_value(value):
+    return value[:200].strip()
+
+
+def write_product_attributes(items, dictionary=None):
+    """
+    Перезаписує характеристики тільки тих товарів, у яких змінився список <param>
+
+    Змінені товари переписуються одним delete та одним bulk_create.
+    Новий хеш записується в product.attributes_hash (в пам'яті) -
+    зберегти його в базі має викликач.
+
+    Args:
+        items: список пар (product, params)
+        dictionary: AttributeDictionary запуску (None - завантажити для цього виклику)
+
+    Returns:
+        list: товари, характеристики яких були перезаписані
+    """
+    changed = []
+    for product, params in items:
+        new_hash = params_fingerprint(params)
+        if product.attributes_hash != new_hash:
+            product.attributes_hash = new_hash
+            changed.append((product, params))
+
+    if not changed:
+        return []
+
+    if dictionary is None:
+        dictionary = AttributeDictionary()
+    # Весь пакет - одним зверненням до словника
+    ids = iter(dictionary.resolve([param for _, params in changed for param in params]))
+    ProductAttribute.objects.filter(product_id__in=[product.id for product, _ in changed]).delete()
+    ProductAttribute.objects.bulk_create([
+        ProductAttribute(
+            product_id=product.id,
+            name_id=name_id,
+            value_id=value_id,
+            sort_order=param_idx,
+        )
+        for product, params in changed
+        for param_idx, (name_id, value_id) in zip(range(len(params)), ids)
+    ])
+    return [product for product, _ in changed]
@@ -0,0 +1,64 @@
+"""
+Інвалідація кешу після зміни товарів та категорій
+
+Сторінка категорії показує товари самої категорії та її підкатегорій,
+тому разом з категоріями товару скидаються і всі їхні батьківські.
+При великій кількості змін (повний імпорт) скидається тег "catalog",
+під яким зареєстровані всі сторінки з товарами.
+"""
+from apps.core.cache_tags import invalidate
+from apps.products.models import Product
+from apps.products.services.category_tree import get_tree
+
+
+# Понад стільки змінених товарів - скидаємо весь каталог одним тегом
+BULK_THRESHOLD = 500
+
+# Сторінки, де товари показуються не за категорією
+PRODUCT_LIST_TAGS = ('home', 'sale', 'search')
+
+
+def category_tags(category_ids):
+    """Теги категорій разом з усіма батьківськими (з дерева категорій)"""
+    tree = get_tree()
+    tags = set()
+    for category_id in category_ids:
+        tags.add(f'category:{category_id}')
+        tags.update(f'category:{parent.id}' for parent in tree.ancestors(category_id))
+    return tags
+
+
+def product_tags(product_ids):
+    """
+    Теги сторінок, на яких показуються товари
+
+    Сторінка товару не кешується: наявність на ній змінюється з кожним
+    замовленням, а оформлення замовлення кеш не скидає.
+    """
+    product_ids = set(product_ids)
+    if not product_ids:
+        return []
+    if len(product_ids) > BULK_THRESHOLD:
+        return ['catalog', *PRODUCT_LIST_TAGS]
+
+    category_ids = set(
+        Product.objects.filter(id__in=product_ids, primary_category__isnull=False)
+        .values_list('primary_category_id', flat=True)
+    )
+    category_ids.update(
+        Product.categories.through.objects.filter(product_id__in=product_ids)
+        .values_list('category_id', flat=True)
+    )
+    return [*category_tags(category_ids), *PRODUCT_LIST_TAGS]
+
+
+def invalidate_products(product_ids):
+    """Скидає кеш сторінок змінених товарів"""
+    tags = product_tags(product_ids)
+    if tags:
+        invalidate(*tags)
+
+
+def invalidate_catalog():
+    """Скидає кеш усіх сторінок з товарами та меню (імпорт, акції)"""
+    invalidate('catalog', 'menu', *PRODUCT_LIST_TAGS)
@@ -0,0 +1,102 @@
+"""
+Прогрів кешу сторінок після синхронізації
+
+Сторінки рендеряться через тестовий клієнт Django всередині процесу -
+результат потрапляє в той самий кеш (Redis), що й у веб-сервера. Ключ
+cache_page залежить від хоста та схеми, тому запити йдуть з хостом сайту.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.db import connections
+from django.test import Client
+from django.urls import reverse
+
+from apps.products.models import Category
+
+
+def site_target(site_url=None):
+    """
+    Хост і схема запитів прогріву
+
+    З SITE_URL, інакше - перший конкретний хост з ALLOWED_HOSTS
+    (https, у DEBUG - http).
+
+    Returns:
+        tuple: (host, secure)
+    """
+    site_url = site_url or settings.SITE_URL
+    if site_url:
+        parts = urlsplit(site_url)
+        return parts.netloc, parts.scheme == 'https'
+    for host in settings.ALLOWED_HOSTS:
+        if host and host != '*' and not host.startswith('.'):
+            return host, not settings.DEBUG
+    return 'localhost', not settings.DEBUG
+
+
+def warm_urls(categories=10, pages=2):
+    """
+    Сторінки для прогріву: головна, акції та перші сторінки головних категорій
+
+    Returns:
+        list: групи шляхів; сторінки групи рендеряться по черзі, доки існують
+    """
+    groups = [[reverse('core:home')], [reverse('products:sale')]]
+    top_categories = (
+        Category.objects.filter(parent=None, is_active=True)
+        .exclude(slug='')
+        .order_by('sort_order', 'name')
+        .values_list('slug', flat=True)[:categories]
+    )
+    for slug in top_categories:
+        url = reverse('products:category', kwargs={'slug': slug})
+        groups.append([url, *(f'{url}?page={page}' for page in range(2, pages + 1))])
+    return groups
+
+
+def warm_cache(groups, host, secure=True, workers=4):
+    """
+    Рендерить групи сторінок паралельно у workers потоках
+
+    Наступна сторінка категорії не запитується, якщо попередньої немає
+    (404 на сторінці пагінації - кінець списку, а не помилка).
+
+    Returns:
+        list: словники {url, status, seconds, error}
+    """
+    def fetch(url):
+        # Новий клієнт на кожен запит - без cookies, як у нового відвідувача
+        client = Client(HTTP_HOST=host, raise_request_exception=False)
+        started = time.monotonic()
+        try:
+            response = client.get(url, secure=secure)
+            return {'url': url, 'status': response.status_code,
+                    'seconds': time.monotonic() - started, 'error': ''}
+        except Exception as e:
+            return {'url': url, 'status': None, 'seconds': time.monotonic() - started, 'error': str(e)}
+
+    def fetch_group(urls):
+        results = []
+        for index, url in enumerate(urls):
+            result = fetch(url)
+            if index and result['status'] == 404:
+                break
+            results.append(result)
+            if result['status'] != 200:
+                break
+        return results
+
+    def fetch_in_thread(urls):
+        try:
+            return fetch_group(urls)
+        finally:
+            # У кожного потоку своє з'єднання з базою
+            connections.close_all()
+
+    if workers <= 1:
+        return [result for urls in groups for result in fetch_group(urls)]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return [result for results in executor.map(fetch_in_thread, groups) for result in results]
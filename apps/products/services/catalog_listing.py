@@ -0,0 +1,277 @@
+"""
+Фільтри, сортування та пагінація товарів категорії на сервері
+
+Все рахується по таблиці товарів у категоріях (ProductCategoryMembership):
+фільтр за підкатегорією, ціною та бейджами і сортування працюють для всієї
+категорії, а не для 15 карток поточної сторінки.
+
+Параметри запиту (однакові для сторінки категорії та JSON API):
+    sub=<slug>       підкатегорія (можна кілька)
+    price_min, price_max
+    badge=sale|new|top  (можна кілька, достатньо будь-якого)
+    attr=<назва>=<значення>  характеристика (див. services/facets.py)
+    sort=default|price_asc|price_desc|name|popular|new
+
+JSON API гортає сторінки курсором (keyset): курсор - ключі сортування
+останнього товару, наступна сторінка - товари "після" нього. На відміну від
+OFFSET, глибина сторінки не впливає на швидкість запиту.
+"""
+import base64
+import json
+import math
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import F, Max, Min, Q
+from django.utils.dateparse import parse_datetime
+
+from apps.core.cache_tags import get_cached, set_cached
+from apps.products.models import Product, ProductCategoryMembership
+from apps.products.services.facets import facet_index
+from apps.products.services.product_cards import CARD_FIELDS
+
+
+# Ключі сортування: (поле ProductCategoryMembership, за спаданням);
+# останній ключ - product_id, щоб порядок був повним для курсора
+SORTS = {
+    'default': (('created_at', True), ('product_id', True)),
+    'price_asc': (('price', False), ('product_id', False)),
+    'price_desc': (('price', True), ('product_id', True)),
+    'name': (('name', False), ('product_id', False)),
+    'popular': (('product__is_top', True), ('created_at', True), ('product_id', True)),
+    'new': (('product__is_new', True), ('created_at', True), ('product_id', True)),
+}
+
+SORT_LABELS = {
+    'default': 'За замовчуванням',
+    'price_asc': 'За ціною: дешевші спочатку',
+    'price_desc': 'За ціною: дорожчі спочатку',
+    'name': 'За назвою',
+    'popular': 'За популярністю',
+    'new': 'За новизною',
+}
+
+BADGE_CHOICES = (
+    ('sale', 'Акційні'),
+    ('new', 'Новинки'),
+    ('top', 'Хіти продажу'),
+)
+
+BADGES = {
+    # Акція діє, якщо поточна ціна нижча за звичайну (з урахуванням термінів)
+    'sale': Q(price__lt=F('product__retail_price')),
+    'new': Q(product__is_new=True),
+    'top': Q(product__is_top=True),
+}
+
+# Перетворення значень курсора з JSON назад у типи полів
+CURSOR_TYPES = {
+    'created_at': parse_datetime,
+    'price': Decimal,
+    'name': str,
+    'product_id': int,
+    'product__is_top': bool,
+    'product__is_new': bool,
+}
+
+PRICE_RANGE_TIMEOUT = 60 * 60
+
+# Більше значень характеристик у запиті не розбираємо
+MAX_ATTRIBUTE_VALUES = 30
+
+
+def parse_filters(params, category, tree):
+    """
+    Фільтри з GET-параметрів; невідомі та некоректні значення ігноруються
+
+    Returns:
+        dict: subcategories (id), price_min, price_max, badges, attributes, sort
+    """
+    descendants = tree.descendant_ids(category.id, include_self=False)
+    subcategories = []
+    for slug in params.getlist('sub'):
+        subcategory = tree.by_slug(slug)
+        if subcategory is not None and subcategory.id in descendants and subcategory.id not in subcategories:
+            subcategories.append(subcategory.id)
+
+    sort = params.get('sort', 'default')
+    return {
+        'subcategories': subcategories,
+        'price_min': _decimal(params.get('price_min')),
+        'price_max': _decimal(params.get('price_max')),
+        'badges': [badge for badge in dict.fromkeys(params.getlist('badge')) if badge in BADGES],
+        'attributes': _attributes(params.getlist('attr')[:MAX_ATTRIBUTE_VALUES]),
+        'sort': sort if sort in SORTS else 'default',
+    }
+
+
+def _attributes(values):
+    """{назва: [значення, ...]} з параметрів attr=<назва>=<значення>"""
+    attributes = {}
+    for item in values:
+        name, sep, value = item.partition('=')
+        if sep and name and value and value not in attributes.get(name, []):
+            attributes.setdefault(name, []).append(value)
+    return attributes
+
+
+def _decimal(value):
+    try:
+        value = Decimal(value)
+    except (TypeError, ValueError, InvalidOperation):
+        return None
+    return value if value.is_finite() and value >= 0 else None
+
+
+def is_filtered(filters):
+    return bool(
+        filters['subcategories'] or filters['badges'] or filters['attributes']
+        or filters['price_min'] is not None or filters['price_max'] is not None
+    )
+
+
+def listing(category, filters):
+    """Рядки ProductCategoryMembership категорії з фільтрами, впорядковані за filters['sort']"""
+    memberships = ProductCategoryMembership.objects.filter(is_visible=True)
+    subcategories = filters['subcategories']
+    if len(subcategories) == 1:
+        memberships = memberships.filter(category_id=subcategories[0])
+    else:
+        memberships = memberships.filter(category_id=category.id)
+        if subcategories:
+            # Підзапит замість category_id IN: товар з двох підкатегорій - один рядок
+            memberships = memberships.filter(product_id__in=ProductCategoryMembership.objects.filter(
+                category_id__in=subcategories, is_visible=True,
+            ).values('product_id'))
+
+    if filters['price_min'] is not None:
+        memberships = memberships.filter(price__gte=filters['price_min'])
+    if filters['price_max'] is not None:
+        memberships = memberships.filter(price__lte=filters['price_max'])
+    if filters['badges']:
+        badges = Q()
+        for badge in filters['badges']:
+            badges |= BADGES[badge]
+        memberships = memberships.filter(badges)
+    if filters['attributes']:
+        product_ids = facet_index(category).select(filters['attributes'])
+        if not product_ids:
+            return memberships.none()
+        memberships = memberships.filter(product_id__in=product_ids)
+
+    keys = SORTS[filters['sort']]
+    return memberships.order_by(*(f'-{field}' if desc else field for field, desc in keys))
+
+
+def facet_groups(category, filters):
+    """
+    Фасети категорії для шаблону з кількістю товарів
+
+    Кількість враховує підкатегорії, ціну й бейджі; лише тоді потрібен
+    запит за id товарів, без них усе рахується з індексу.
+    """
+    scope = None
+    if filters['subcategories'] or filters['badges'] or filters['price_min'] is not None or filters['price_max'] is not None:
+        base = listing(category, dict(filters, attributes={}))
+        scope = set(base.values_list('product_id', flat=True))
+    return facet_index(category).groups(filters['attributes'], scope)
+
+
+def sort_fields(filters):
+    return [field for field, _ in SORTS[filters['sort']]]
+
+
+def encode_cursor(values):
+    """Курсор з ключів сортування останнього товару сторінки"""
+    data = json.dumps([_cursor_value(value) for value in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def _cursor_value(value):
+    # Дата - з мікросекундами (DjangoJSONEncoder обрізає до мілісекунд, і рівність ключа не спрацює)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def decode_cursor(cursor, filters):
+    """
+    Raises:
+        ValueError: курсор пошкоджений або від іншого сортування
+    """
+    fields = sort_fields(filters)
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw.decode('utf-8'))
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError('некоректний курсор') from e
+    if not isinstance(values, list) or len(values) != len(fields):
+        raise ValueError('курсор від іншого сортування')
+    try:
+        values = [CURSOR_TYPES[field](value) for field, value in zip(fields, values)]
+    except (TypeError, ValueError, ArithmeticError) as e:
+        raise ValueError('некоректний курсор') from e
+    if None in values:
+        raise ValueError('некоректний курсор')
+    return values
+
+
+def after_cursor(memberships, filters, values):
+    """Рядки, що йдуть після товару з ключами values (у порядку сортування)"""
+    keys = SORTS[filters['sort']]
+    condition = Q()
+    for index, (field, desc) in enumerate(keys):
+        step = Q(**{f'{field}__{"lt" if desc else "gt"}': values[index]})
+        for (equal_field, _), value in zip(keys[:index], values[:index]):
+            step &= Q(**{equal_field: value})
+        condition |= step
+    return memberships.filter(condition)
+
+
+def card_products(product_ids):
+    """Товари для карток у порядку product_ids (один запит, дані картки - в полях Product)"""
+    products = Product.objects.only(*CARD_FIELDS).in_bulk(product_ids)
+    return [products[product_id] for product_id in product_ids if product_id in products]
+
+
+def card_payload(product):
+    """Компактні дані картки (ті ж ключі, що в API пошуку)"""
+    is_sale = product.is_sale_active()
+    return {
+        'id': product.id,
+        'name': product.name,
+        'url': product.get_absolute_url(),
+        'retail_price': str(int(product.retail_price)) if product.retail_price else '0',
+        'sale_price': str(int(product.sale_price)) if product.sale_price else None,
+        'image': product.main_image_url or None,
+        'is_sale': is_sale,
+        'is_top': product.is_top,
+        'is_new': product.is_new,
+        'is_in_stock': product.is_in_stock(),
+        'sale_end_timestamp': int(product.sale_end_date.timestamp() * 1000) if is_sale and product.sale_end_date else None,
+    }
+
+
+def price_range(category):
+    """
+    Мінімальна та максимальна ціна по всій категорії (один aggregate, кеш)
+
+    Returns:
+        tuple: (min, max) у цілих гривнях
+    """
+    tags = ['catalog', f'category:{category.id}']
+    key = f'price_range:{category.id}'
+    cached = get_cached(key, tags)
+    if cached is not None:
+        return cached
+    prices = ProductCategoryMembership.objects.filter(category_id=category.id, is_visible=True).aggregate(
+        low=Min('price'), high=Max('price'),
+    )
+    result = (
+        int(prices['low'] or 0),
+        int(math.ceil(prices['high'])) if prices['high'] is not None else 0,
+    )
+    set_cached(key, result, PRICE_RANGE_TIMEOUT, tags)
+    return result
@@ -0,0 +1,151 @@
+"""
+Імпорт дерева категорій з фіду постачальника
+
+Усі існуючі категорії та зайняті slug завантажуються одним запитом,
+дерево фіду сортується топологічно в пам'яті (батько завжди перед дітьми),
+а зміни записуються через bulk_create та bulk_update. Кількість запитів
+не залежить від глибини дерева.
+"""
+from collections import defaultdict, deque
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import slugify
+
+from apps.products.models import Category
+from apps.products.services.allocator import SlugAllocator
+from apps.products.utils.stage_timer import StageTimer
+
+
+# bulk_update не заповнює auto_now - updated_at (версія дерева категорій) пишеться явно
+IMPORT_FIELDS = ('name', 'parent', 'is_active', 'updated_at')
+
+
+def sort_categories(categories_data):
+    """
+    Сортує категорії фіду так, щоб батько йшов перед дітьми
+
+    Категорії, батька яких немає у фіді (або які утворюють цикл),
+    стають головними.
+
+    Returns:
+        tuple: (список пар (cat_data, parent_external_id), список сиріт)
+    """
+    by_id = {cat_data['external_id']: cat_data for cat_data in categories_data}
+    children = defaultdict(list)
+    roots = []
+    orphans = []
+    for cat_data in by_id.values():
+        parent_id = cat_data['parent_id']
+        if not parent_id:
+            roots.append(cat_data)
+        elif parent_id in by_id and parent_id != cat_data['external_id']:
+            children[parent_id].append(cat_data)
+        else:
+            roots.append(cat_data)
+            orphans.append(cat_data)
+
+    ordered = []
+    visited = set()
+
+    def walk(root):
+        queue = deque([(root, None)])
+        while queue:
+            cat_data, parent_id = queue.popleft()
+            if cat_data['external_id'] in visited:
+                continue
+            visited.add(cat_data['external_id'])
+            ordered.append((cat_data, parent_id))
+            for child in children[cat_data['external_id']]:
+                queue.append((child, cat_data['external_id']))
+
+    for cat_data in roots:
+        walk(cat_data)
+
+    # Недосяжні від головних категорії утворюють цикл - розриваємо його
+    for cat_data in by_id.values():
+        if cat_data['external_id'] not in visited:
+            orphans.append(cat_data)
+            walk(cat_data)
+
+    return ordered, orphans
+
+
+def import_categories(categories_data, log=None, timer=None, stats=None):
+    """
+    Створює або оновлює категорії фіду (пошук тільки за external_id)
+
+    Slug існуючих категорій не змінюється; нові отримують slug з назви
+    (підкатегорії - з slug батька та назви).
+
+    Args:
+        categories_data: список словників {external_id, parent_id, name}
+        log: функція для виводу повідомлень (необов'язково)
+        timer: StageTimer для замірів етапів lookup / write (необов'язково)
+        stats: словник, куди записуються лічильники created / updated / unchanged
+
+    Returns:
+        dict: external_id -> Category для всіх імпортованих категорій
+    """
+    log = log or (lambda message: None)
+    timer = timer or StageTimer()
+
+    ordered, orphans = sort_categories(categories_data)
+    for cat_data in orphans:
+        log(f'  ⚠ {cat_data["name"]} (parent_id: {cat_data["parent_id"]} не знайдено) - створюємо як головну')
+
+    with transaction.atomic():
+        with timer.stage('lookup'):
+            existing = Category.objects.in_bulk(
+                [cat_data['external_id'] for cat_data, _ in ordered], field_name='external_id'
+            )
+            slugs = SlugAllocator(Category)
+
+        categories = {}
+        parents = {}
+        new_categories = []
+        changed = []
+        for cat_data, parent_id in ordered:
+            external_id = cat_data['external_id']
+            parent = categories.get(parent_id)
+            parents[external_id] = parent
+            category = existing.get(external_id)
+
+            if category is None:
+                if parent is not None:
+                    base_slug = slugify(f"{parent.slug}-{cat_data['name']}")
+                else:
+                    base_slug = slugify(cat_data['name'])
+                category = Category(
+                    external_id=external_id,
+                    name=cat_data['name'],
+                    slug=slugs.allocate(base_slug),
+                    is_active=True,
+                )
+                new_categories.append(category)
+            elif (category.name != cat_data['name'] or not category.is_active
+                    or category.parent_id != (parent.id if parent else None)):
+                # Оновлюємо існуючу (зберігаємо slug!)
+                category.name = cat_data['name']
+                category.is_active = True
+                changed.append(category)
+            categories[external_id] = category
+
+        updated_count = len(changed)
+        with timer.stage('write'):
+            Category.objects.bulk_create(new_categories, batch_size=500)
+
+            # Батьки прив'язуються після bulk_create, коли в нових категорій вже є id
+            changed.extend(category for category in new_categories if parents[category.external_id] is not None)
+            now = timezone.now()
+            for category in changed:
+                category.parent = parents[category.external_id]
+                category.updated_at = now
+            Category.objects.bulk_update(changed, IMPORT_FIELDS, batch_size=500)
+
+    unchanged_count = len(categories) - len(new_categories) - updated_count
+    if stats is not None:
+        stats.update(created=len(new_categories), updated=updated_count, unchanged=unchanged_count)
+    log(f'  ✓ Створено: {len(new_categories)}, ↻ оновлено: {updated_count}, без змін: {unchanged_count}')
+
+    return categories
@@ -0,0 +1,146 @@
+"""
+Таблиця "товар на сторінці категорії" (ProductCategoryMembership)
+
+Сторінка категорії показує товари самої категорії та її активних
+підкатегорій на всіх рівнях. Замість JOIN по M2M з DISTINCT на кожен запит
+(і ще раз для COUNT пагінатора) зв'язок розгортається заздалегідь: рядок на
+кожну категорію, де показується товар - основна, додаткові та їхні
+батьківські (неактивна категорія приховує товар від батьківських, як у
+дереві категорій).
+
+Таблиця оновлюється явно там, де змінюються категорії, наявність чи ціна
+товару: синхронізація та імпорт, адмінка, акції, замовлення. Повна
+перебудова - команда rebuild_category_memberships.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from apps.products.models import Product, ProductCategoryMembership
+from apps.products.services.category_tree import build_tree
+
+
+BATCH_SIZE = 1000
+
+# Поля товару, потрібні для рядків (get_current_price читає поля акції)
+PRODUCT_FIELDS = (
+    'id', 'name', 'created_at', 'is_active', 'stock', 'primary_category_id',
+    'retail_price', 'sale_price', 'is_sale', 'sale_start_date', 'sale_end_date',
+)
+
+
+def listed_category_ids(tree, category_ids):
+    """Категорії, на сторінках яких показується товар з цих категорій"""
+    listed = set()
+    for category_id in category_ids:
+        category = tree.get(category_id)
+        # Вгору до кореня: неактивна категорія не показується в батьківській
+        while category is not None and category.id not in listed:
+            listed.add(category.id)
+            if not category.is_active:
+                break
+            category = tree.get(category.parent_id)
+    return listed
+
+
+def membership_rows(products, links, tree):
+    """Рядки таблиці для товарів; links - {product_id: {category_id, ...}}"""
+    rows = []
+    for product in products:
+        category_ids = set(links.get(product.id, ()))
+        if product.primary_category_id:
+            category_ids.add(product.primary_category_id)
+        is_visible = product.is_active and product.stock > 0
+        price = product.get_current_price()
+        for category_id in listed_category_ids(tree, category_ids):
+            rows.append(ProductCategoryMembership(
+                category_id=category_id,
+                product_id=product.id,
+                is_visible=is_visible,
+                created_at=product.created_at,
+                price=price,
+                name=product.name,
+            ))
+    return rows
+
+
+def refresh_memberships(product_ids, tree=None):
+    """
+    Перезаписує рядки товарів пакетами по BATCH_SIZE
+
+    Returns:
+        int: кількість записаних рядків
+    """
+    product_ids = sorted(set(product_ids))
+    if not product_ids:
+        return 0
+    # Свіже дерево: категорії могли змінитись у цьому ж процесі без сигналів
+    tree = tree or build_tree()
+    through = Product.categories.through
+
+    written = 0
+    for start in range(0, len(product_ids), BATCH_SIZE):
+        batch = product_ids[start:start + BATCH_SIZE]
+        products = Product.objects.filter(id__in=batch).only(*PRODUCT_FIELDS)
+        links = defaultdict(set)
+        for product_id, category_id in through.objects.filter(product_id__in=batch).values_list('product_id', 'category_id'):
+            links[product_id].add(category_id)
+        rows = membership_rows(products, links, tree)
+        with transaction.atomic():
+            ProductCategoryMembership.objects.filter(product_id__in=batch).delete()
+            ProductCategoryMembership.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+        written += len(rows)
+    return written
+
+
+def started_sale_product_ids(now=None):
+    """
+    Товари, акція яких уже почалась, а в рядках ще звичайна ціна
+
+    Ціна рядка рахується при оновленні, тому акція з майбутнім
+    sale_start_date сама по собі не змінить ні сортування за ціною, ні
+    фільтр "Акційні" - ці товари оновлює expire_sales.
+    """
+    now = now or timezone.now()
+    return set(
+        ProductCategoryMembership.objects.filter(
+            product__is_sale=True,
+            product__sale_price__isnull=False,
+            product__sale_start_date__lte=now,
+        ).filter(
+            Q(product__sale_end_date__isnull=True) | Q(product__sale_end_date__gt=now)
+        ).exclude(price=F('product__sale_price')).values_list('product_id', flat=True)
+    )
+
+
+def rebuild_memberships():
+    """Повна перебудова (після імпорту категорій або каталогу)"""
+    return refresh_memberships(Product.objects.values_list('id', flat=True))
+
+
+def category_product_ids(category_ids):
+    """id товарів категорій та всіх їхніх нащадків (разом з неактивними)"""
+    tree = build_tree()
+    category_ids = set(category_ids)
+    subtree = {
+        category_id for category_id in tree.by_id
+        if category_id in category_ids
+        or any(parent.id in category_ids for parent in tree.ancestors(category_id))
+    }
+    if not subtree:
+        return set()
+    product_ids = set(
+        Product.objects.filter(primary_category_id__in=subtree).values_list('id', flat=True)
+    )
+    product_ids.update(
+        Product.categories.through.objects.filter(category_id__in=subtree)
+        .values_list('product_id', flat=True)
+    )
+    return product_ids
+
+
+def refresh_category_memberships(category_ids):
+    """Перебудовує рядки товарів категорій (зміна батьківської чи активності)"""
+    return refresh_memberships(category_product_ids(category_ids))
@@ -0,0 +1,162 @@
+"""
+Дерево категорій у пам'яті процесу
+
+Всі категорії завантажуються одним запитом, а індекси (slug -> категорія,
+нащадки кожної категорії, предки) будуються в Python. Замість рекурсії з
+запитом на кожен вузол (Category.get_all_children) - готові множини id.
+
+Версія дерева читається з бази - кількість категорій і найпізніший
+updated_at: так зміни з інших процесів (пакетний імпорт без сигналів,
+cron без спільного кешу) теж помітні. Версія перевіряється не частіше,
+ніж раз на CHECK_INTERVAL секунд; процес, що змінив категорію, скидає
+дерево одразу.
+
+Категорії дерева - спільні для всіх запитів об'єкти: тільки для читання.
+"""
+import threading
+import time
+
+from django.db.models import Count, Max
+
+from apps.products.models import Category
+
+
+CHECK_INTERVAL = 5  # секунд між перевірками версії в базі
+
+
+class CategoryTree:
+    """
+    Знімок дерева категорій
+
+    Використання:
+        tree = get_tree()
+        category = tree.by_slug('vibratory')
+        ids = tree.descendant_ids(category.id)  # категорія і всі активні нащадки
+    """
+
+    def __init__(self, categories, version=None):
+        self.version = version
+        self.by_id = {category.id: category for category in categories}
+        self._by_slug = {category.slug: category for category in categories if category.slug}
+
+        children = {category_id: [] for category_id in self.by_id}
+        roots = []
+        for category in categories:
+            parent = self.by_id.get(category.parent_id)
+            # FK parent без запиту: category.parent - вузол дерева
+            Category.parent.field.set_cached_value(category, parent)
+            if parent is None:
+                roots.append(category)
+            else:
+                children[parent.id].append(category)
+        for category in categories:
+            # Активні дочірні категорії в порядку меню (Meta.ordering)
+            category.active_children = [child for child in children[category.id] if child.is_active]
+        self.roots = [category for category in roots if category.is_active]
+
+        # Індекс нащадків: обхід у зворотному порядку (діти перед батьками);
+        # неактивна категорія приховує свою гілку
+        order = self._walk(roots, children)
+        self._position = {category.id: index for index, category in enumerate(order)}
+        self._descendants = {}
+        for category in reversed(order):
+            ids = {category.id}
+            for child in category.active_children:
+                ids |= self._descendants[child.id]
+            self._descendants[category.id] = frozenset(ids)
+
+    @staticmethod
+    def _walk(roots, children):
+        """Вузли в порядку обходу в глибину (батьки перед дітьми, як у меню)"""
+        order = []
+        stack = list(reversed(roots))
+        while stack:
+            category = stack.pop()
+            order.append(category)
+            stack.extend(reversed(children[category.id]))
+        return order
+
+    def get(self, category_id):
+        return self.by_id.get(category_id)
+
+    def by_slug(self, slug):
+        return self._by_slug.get(slug)
+
+    def descendant_ids(self, category_id, include_self=True):
+        """id активних нащадків на всіх рівнях (frozenset)"""
+        ids = self._descendants.get(category_id)
+        if ids is None:
+            # Категорія в циклі parent або невідомий id
+            ids = frozenset({category_id}) if category_id in self.by_id else frozenset()
+        return ids if include_self else ids - {category_id}
+
+    def descendants(self, category_id):
+        """Активні нащадки (без самої категорії) у порядку дерева"""
+        ids = self.descendant_ids(category_id, include_self=False)
+        return [self.by_id[i] for i in sorted(ids, key=self._position.__getitem__)]
+
+    def subtree_ids(self, category_ids):
+        """Об'єднання категорій та всіх їхніх нащадків"""
+        ids = set()
+        for category_id in category_ids:
+            ids |= self.descendant_ids(category_id)
+        return ids
+
+    def ancestors(self, category_id):
+        """Батьківські категорії від кореня до прямого батька"""
+        chain = []
+        category = self.by_id.get(category_id)
+        seen = set()
+        while category is not None and category.parent_id is not None and category.id not in seen:
+            seen.add(category.id)
+            category = self.by_id.get(category.parent_id)
+            if category is not None:
+                chain.append(category)
+        chain.reverse()
+        return chain
+
+    def breadcrumbs(self, category_id):
+        """Хлібні крихти: предки та сама категорія"""
+        category = self.by_id.get(category_id)
+        return self.ancestors(category_id) + [category] if category else []
+
+    def menu(self):
+        """Активні кореневі категорії (дочірні - у category.active_children)"""
+        return self.roots
+
+
+_tree = None
+_checked_at = 0.0
+_lock = threading.Lock()
+
+
+def build_tree(version=None):
+    """Завантажує всі категорії одним запитом"""
+    return CategoryTree(list(Category.objects.order_by('sort_order', 'name')), version)
+
+
+def tree_version():
+    """Версія дерева: (кількість категорій, останній updated_at)"""
+    version = Category.objects.aggregate(count=Count('id'), updated_at=Max('updated_at'))
+    return version['count'], version['updated_at']
+
+
+def get_tree():
+    """Поточне дерево процесу (перебудовується, якщо змінилась версія)"""
+    global _tree, _checked_at
+    now = time.monotonic()
+    tree = _tree
+    if tree is not None and now - _checked_at < CHECK_INTERVAL:
+        return tree
+    version = tree_version()
+    with _lock:
+        if _tree is None or _tree.version != version:
+            _tree = build_tree(version)
+        _checked_at = now
+        return _tree
+
+
+def reset_tree():
+    """Скидає дерево процесу (після зміни категорій)"""
+    global _tree
+    _tree = None
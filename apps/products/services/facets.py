@@ -0,0 +1,170 @@
+"""
+Фасети за характеристиками товарів (<param> з фіду) для сторінок категорій
+
+Після синхронізації для кожної категорії (разом з підкатегоріями, за
+таблицею товарів у категоріях) будується індекс: назва характеристики ->
+значення -> id показаних товарів. Індекс зберігається одним рядком
+CategoryFacetIndex на категорію і кешується під тегом "facets", тому
+сторінка категорії не сканує ProductAttribute: фільтр і кількість товарів
+біля кожного значення - перетини множин id у Python.
+
+Значення однієї характеристики об'єднуються (АБО), різні характеристики -
+перетинаються (І). Кількість біля значення враховує всі інші обрані
+фільтри, але не значення тієї ж характеристики.
+
+Між синхронізаціями лічильники можуть відставати (товар розпродано, категорію
+перенесено), але список товарів однаково фільтрується по таблиці товарів у
+категоріях, тож зайвих карток на сторінці не буде.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+
+from apps.core.cache_tags import get_cached, invalidate, set_cached
+from apps.products.models import (
+    AttributeName, AttributeValue, CategoryFacetIndex, ProductAttribute, ProductCategoryMembership,
+)
+
+
+FACETS_TAG = 'facets'
+CACHE_TIMEOUT = 60 * 60 * 24
+
+# Характеристика з більшою кількістю значень у категорії (довжина в мм,
+# артикули) - не фільтр, а шум у списку
+MAX_VALUES = 40
+
+
+class FacetIndex:
+    """
+    Фасети однієї категорії
+
+    Використання:
+        index = facet_index(category)
+        ids = index.select({'Колір': ['Червоний', 'Чорний']})  # множина id або None
+        groups = index.groups(selected)  # для шаблону, з кількістю товарів
+    """
+
+    def __init__(self, data):
+        self.names = [
+            (name, [(value, frozenset(ids)) for value, ids in values])
+            for name, values in data
+        ]
+        self._values = {name: dict(values) for name, values in self.names}
+
+    def select(self, selected):
+        """id товарів з обраними значеннями; None - характеристики не обрані"""
+        result = None
+        for name, values in selected.items():
+            known = self._values.get(name, {})
+            ids = set()
+            for value in values:
+                ids |= known.get(value, frozenset())
+            result = ids if result is None else result & ids
+        return result
+
+    def groups(self, selected, scope_ids=None):
+        """
+        Групи фасетів для шаблону
+
+        Args:
+            selected: {назва: [значення, ...]} - обрані значення
+            scope_ids: id товарів з урахуванням інших фільтрів (ціна, бейджі)
+                або None - всі товари категорії
+        """
+        groups = []
+        for name, values in self.names:
+            scope = self.select({other: chosen for other, chosen in selected.items() if other != name})
+            if scope_ids is not None:
+                scope = set(scope_ids) if scope is None else scope & scope_ids
+            chosen = selected.get(name, ())
+            items = []
+            for value, ids in values:
+                count = len(ids) if scope is None else len(ids & scope)
+                if count or value in chosen:
+                    items.append({
+                        'value': value,
+                        'count': count,
+                        'selected': value in chosen,
+                        'param': f'{name}={value}',
+                    })
+            if items:
+                groups.append({'name': name, 'values': items})
+        return groups
+
+
+def facet_index(category):
+    """Індекс категорії з кешу (або з CategoryFacetIndex)"""
+    key = f'facets:{category.id}'
+    data = get_cached(key, [FACETS_TAG])
+    if data is None:
+        data = CategoryFacetIndex.objects.filter(category_id=category.id).values_list('data', flat=True).first() or []
+        set_cached(key, data, CACHE_TIMEOUT, [FACETS_TAG])
+    return FacetIndex(data)
+
+
+def build_category_facets(product_ids, product_attributes, names, values):
+    """
+    Дані індексу однієї категорії
+
+    Групування йде за id зі словників, рядки підставляються лише в результат.
+
+    Args:
+        product_ids: id показаних товарів категорії
+        product_attributes: {product_id: [(name_id, value_id), ...]}
+        names, values: id -> рядок (AttributeName, AttributeValue)
+    """
+    grouped = defaultdict(lambda: defaultdict(set))
+    for product_id in product_ids:
+        for name_id, value_id in product_attributes.get(product_id, ()):
+            grouped[name_id][value_id].add(product_id)
+
+    entries = []
+    for name_id, by_value in grouped.items():
+        if len(by_value) > MAX_VALUES:
+            continue
+        covered = set().union(*by_value.values())
+        # Одне значення у всіх товарів нічого не фільтрує
+        if len(by_value) == 1 and len(covered) == len(product_ids):
+            continue
+        ordered = sorted(
+            ((values[value_id], ids) for value_id, ids in by_value.items()),
+            key=lambda item: (-len(item[1]), item[0]),
+        )
+        entries.append((-len(covered), names[name_id], [[value, sorted(ids)] for value, ids in ordered]))
+    entries.sort(key=lambda entry: entry[:2])
+    return [[name, facet_values] for _, name, facet_values in entries]
+
+
+def rebuild_facets():
+    """
+    Перебудовує індекси всіх категорій (після синхронізації)
+
+    Returns:
+        int: кількість категорій з фасетами
+    """
+    category_products = defaultdict(list)
+    memberships = ProductCategoryMembership.objects.filter(is_visible=True).values_list('category_id', 'product_id')
+    for category_id, product_id in memberships.iterator(chunk_size=5000):
+        category_products[category_id].append(product_id)
+
+    names = dict(AttributeName.objects.values_list('id', 'name'))
+    values = dict(AttributeValue.objects.values_list('id', 'value'))
+    product_attributes = defaultdict(set)
+    attributes = ProductAttribute.objects.filter(
+        product__is_active=True, product__stock__gt=0,
+    ).values_list('product_id', 'name_id', 'value_id')
+    for product_id, name_id, value_id in attributes.iterator(chunk_size=5000):
+        if names[name_id] and values[value_id]:
+            product_attributes[product_id].add((name_id, value_id))
+
+    rows = []
+    for category_id, product_ids in category_products.items():
+        data = build_category_facets(product_ids, product_attributes, names, values)
+        if data:
+            rows.append(CategoryFacetIndex(category_id=category_id, data=data, product_count=len(product_ids)))
+
+    with transaction.atomic():
+        CategoryFacetIndex.objects.all().delete()
+        CategoryFacetIndex.objects.bulk_create(rows, batch_size=200)
+        transaction.on_commit(lambda: invalidate(FACETS_TAG))
+    return len(rows)
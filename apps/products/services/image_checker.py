@@ -0,0 +1,156 @@
+"""
+Перевірка зовнішніх URL картинок товарів
+
+Однакові URL перевіряються один раз, запити йдуть через один
+requests.Session з пулом з'єднань і повторними спробами, а кількість
+одночасних запитів до одного хоста обмежена (сервер постачальника не
+повинен вважати перевірку атакою). Биті картинки позначаються is_broken,
+а головною стає перша робоча картинка товару.
+"""
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from django.db import transaction
+from django.utils import timezone
+
+from apps.products.models import ProductImage
+from apps.products.services.product_cards import refresh_cards
+
+
+# Сервери, які не підтримують HEAD, відповідають одним з цих статусів
+HEAD_UNSUPPORTED = {403, 405, 501}
+
+CHECK_FIELDS = ('check_status', 'content_length', 'checked_at', 'is_broken')
+
+
+def is_broken_status(status):
+    """0 - сервер недоступний; 4xx/5xx - битий URL"""
+    return status == 0 or status >= 400
+
+
+class ImageChecker:
+    """
+    Паралельна перевірка URL з обмеженням на хост
+
+    Використання:
+        checker = ImageChecker(workers=16, per_host=4)
+        results = checker.check(urls)  # {url: (status, content_length)}
+    """
+
+    def __init__(self, workers=16, per_host=4, timeout=10, retries=2):
+        self.workers = workers
+        self.per_host = per_host
+        self.timeout = timeout
+        self.session = requests.Session()
+        retry = Retry(
+            total=retries,
+            backoff_factor=0.5,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=('HEAD', 'GET'),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers, max_retries=retry)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._host_limits = defaultdict(lambda: threading.BoundedSemaphore(per_host))
+        self._lock = threading.Lock()
+
+    def _host_limit(self, url):
+        with self._lock:
+            return self._host_limits[urlsplit(url).netloc]
+
+    def check_url(self, url):
+        """Returns: (HTTP статус або 0, розмір з Content-Length або None)"""
+        with self._host_limit(url):
+            try:
+                response = self.session.head(url, timeout=self.timeout, allow_redirects=True)
+                if response.status_code in HEAD_UNSUPPORTED:
+                    # Тіло не читаємо - достатньо заголовків
+                    response = self.session.get(url, timeout=self.timeout, allow_redirects=True, stream=True)
+                    response.close()
+            except requests.RequestException:
+                return 0, None
+        length = response.headers.get('Content-Length')
+        return response.status_code, int(length) if length and length.isdigit() else None
+
+    def check(self, urls):
+        """Перевіряє унікальні URL; Returns: {url: (статус, розмір)}"""
+        urls = list(dict.fromkeys(url for url in urls if url))
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            return dict(zip(urls, executor.map(self.check_url, urls)))
+
+    def close(self):
+        self.session.close()
+
+
+def check_images(images, checker):
+    """
+    Перевіряє картинки і записує результат
+
+    Args:
+        images: queryset або список ProductImage з image_url
+        checker: ImageChecker
+
+    Returns:
+        tuple: (лічильники checked / urls / broken / main_changed,
+            id товарів зі зміненою головною картинкою)
+    """
+    images = [image for image in images if image.image_url]
+    results = checker.check(image.image_url for image in images)
+
+    now = timezone.now()
+    for image in images:
+        image.check_status, image.content_length = results[image.image_url]
+        image.checked_at = now
+        image.is_broken = is_broken_status(image.check_status)
+
+    with transaction.atomic():
+        ProductImage.objects.bulk_update(images, CHECK_FIELDS, batch_size=500)
+        # Всі перевірені товари: картинка, що знову працює, може стати головною
+        changed_products = repair_main_images({image.product_id for image in images})
+        refresh_cards(changed_products)
+
+    stats = {
+        'checked': len(images),
+        'urls': len(results),
+        'broken': sum(1 for image in images if image.is_broken),
+        'main_changed': len(changed_products),
+    }
+    return stats, changed_products
+
+
+def repair_main_images(product_ids):
+    """
+    Головною картинкою стає перша робоча (за sort_order)
+
+    Якщо робочих немає, бита картинка перестає бути головною - на сайті
+    показується заглушка замість 404.
+
+    Returns:
+        set: id товарів, у яких змінилась головна картинка
+    """
+    if not product_ids:
+        return set()
+    by_product = defaultdict(list)
+    for image in ProductImage.objects.filter(product_id__in=product_ids).only(
+        'id', 'product_id', 'is_main', 'is_broken', 'sort_order'
+    ).order_by('sort_order', 'id'):
+        by_product[image.product_id].append(image)
+
+    changed = []
+    for images in by_product.values():
+        demoted = [image for image in images if image.is_broken and image.is_main]
+        working = [image for image in images if not image.is_broken]
+        for image in demoted:
+            image.is_main = False
+        changed.extend(demoted)
+        if working and not any(image.is_main for image in working):
+            working[0].is_main = True
+            changed.append(working[0])
+    ProductImage.objects.bulk_update(changed, ['is_main'], batch_size=500)
+    return {image.product_id for image in changed}
@@ -0,0 +1,85 @@
+"""
+Проксі для картинок, що лежать на сервері постачальника
+
+Проксі обробляє тільки промахи: при першому запиті картинка завантажується
+і зберігається у сховищі (STORAGES['default'], у продакшені - Cloudinary)
+як ProductImage.image. Далі get_image_url і картки товарів посилаються
+прямо на сховище, а сам проксі лише перенаправляє туди старі посилання.
+В URL проксі є версія - хеш URL оригіналу: новий URL картинки дає нову
+адресу проксі, і браузер не показує стару картинку.
+"""
+import requests
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import Q
+
+from apps.products.models import ProductImage
+from apps.products.services.product_cards import refresh_cards
+
+
+FETCH_TIMEOUT = 15
+MAX_IMAGE_BYTES = 15 * 1024 * 1024
+# Тільки растрові формати: SVG з нашого домену міг би виконати скрипт
+ALLOWED_CONTENT_TYPES = {
+    'image/jpeg': 'jpg',
+    'image/png': 'png',
+    'image/gif': 'gif',
+    'image/webp': 'webp',
+    'image/avif': 'avif',
+}
+
+
+class ImageProxyError(Exception):
+    """Картинку не вдалося завантажити з сервера постачальника"""
+
+
+def fetch_image(url):
+    """
+    Завантажує картинку постачальника
+
+    Returns:
+        tuple: (байти, content_type)
+
+    Raises:
+        ImageProxyError: помилка мережі, непідтримуваний тип або завеликий файл
+    """
+    try:
+        with requests.get(url, timeout=FETCH_TIMEOUT, stream=True) as response:
+            response.raise_for_status()
+            content_type = response.headers.get('Content-Type', '').split(';')[0].strip()
+            if content_type not in ALLOWED_CONTENT_TYPES:
+                raise ImageProxyError(f'непідтримуваний тип: {content_type or "без Content-Type"}')
+            data = response.raw.read(MAX_IMAGE_BYTES + 1, decode_content=True)
+    except requests.RequestException as e:
+        raise ImageProxyError(str(e)) from e
+    if len(data) > MAX_IMAGE_BYTES:
+        raise ImageProxyError('завеликий файл')
+    return data, content_type
+
+
+def store_image(image):
+    """
+    Копіює картинку постачальника у сховище і записує її в image.image
+
+    Returns:
+        str: URL збереженої копії
+
+    Raises:
+        ImageProxyError
+    """
+    data, content_type = fetch_image(image.image_url)
+    name = default_storage.save(
+        ProductImage.proxy_copy_name(image.id, image.image_url, ALLOWED_CONTENT_TYPES[content_type]),
+        ContentFile(data),
+    )
+    # Паралельний запит міг зберегти копію раніше - тоді лишається його файл
+    stored = ProductImage.objects.filter(pk=image.pk).filter(Q(image='') | Q(image=None)).update(image=name)
+    if not stored:
+        default_storage.delete(name)
+        image.refresh_from_db(fields=['image'])
+        if not image.image:
+            raise ImageProxyError('картинку видалено')
+        return image.image.url
+    image.image.name = name
+    refresh_cards([image.product_id])
+    return image.image.url
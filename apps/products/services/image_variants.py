@@ -0,0 +1,152 @@
+"""
+Створення зменшених копій картинок товарів
+
+Оригінали завантажуються і стискаються у процесах пулу
+(utils.image_variants), а запис файлів у сховище STORAGES['default'] та
+оновлення ProductImage відбуваються в основному процесі - з базою
+працює тільки він.
+"""
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.products.models import ProductImage
+from apps.products.services.cache_invalidation import invalidate_products
+from apps.products.services.product_cards import refresh_cards
+from apps.products.utils.image_variants import VARIANT_FORMATS, build_variants
+from apps.products.utils.stage_timer import StageTimer
+
+
+VARIANT_FIELDS = ('variants', 'variants_at')
+
+
+def add_variant_arguments(parser):
+    """Опції створення копій для команд імпорту"""
+    parser.add_argument(
+        '--skip-variants',
+        action='store_true',
+        help='Не створювати зменшені копії картинок'
+    )
+    parser.add_argument(
+        '--variant-workers',
+        type=int,
+        default=4,
+        help='Кількість процесів для створення копій (за замовчуванням: 4)'
+    )
+
+
+def pending_images(regenerate=False):
+    """Робочі картинки активних товарів, для яких ще немає копій"""
+    images = ProductImage.objects.filter(
+        product__is_active=True, is_broken=False,
+    ).exclude(Q(image='') | Q(image=None), image_url='')
+    if not regenerate:
+        images = images.filter(variants_at=None)
+    return images.only('id', 'product_id', 'image', 'image_url', 'variants').order_by('id')
+
+
+def variant_name(image_id, size, ext):
+    """Ім'я файлу копії у сховищі"""
+    return f'products/variants/{image_id}/{size}.{ext}'
+
+
+def _task(image):
+    """Завдання для процесу пулу: завантажені файли читаються тут, URL - у пулі"""
+    data = None
+    if image.image:
+        with image.image.open('rb') as source:
+            data = source.read()
+    return image.id, image.image_url, data, ProductImage.VARIANT_SIZES
+
+
+def _save(image, rendered):
+    """Записує копії у сховище; повертає опис для ProductImage.variants"""
+    variants = {}
+    for size, variant in rendered.items():
+        variants[size] = {'width': variant['width'], 'height': variant['height']}
+        for ext, _ in VARIANT_FORMATS:
+            name = variant_name(image.id, size, ext)
+            # Інакше сховище збереже файл під новим ім'ям з суфіксом
+            if default_storage.exists(name):
+                default_storage.delete(name)
+            variants[size][ext] = default_storage.save(name, ContentFile(variant[ext]))
+    return variants
+
+
+def generate_variants(images, workers=4, batch_size=100, log=None):
+    """
+    Створює копії для картинок і записує їх у ProductImage
+
+    Args:
+        images: queryset або список ProductImage (див. pending_images)
+        workers: кількість процесів (1 - без пулу, в поточному процесі)
+        batch_size: скільки картинок обробляти і записувати за раз
+        log: функція для виводу помилок (опціонально)
+
+    Returns:
+        tuple: (лічильники generated / failed, id товарів з новими копіями)
+    """
+    stats = {'generated': 0, 'failed': 0}
+    product_ids = set()
+    images = list(images)
+
+    if workers <= 1:
+        executor = None
+    else:
+        # Дочірні процеси не мають успадковувати відкриті з'єднання з базою
+        connections.close_all()
+        executor = ProcessPoolExecutor(max_workers=workers)
+
+    try:
+        # Пакетами: у пулі не більше batch_size оригіналів одночасно
+        for start in range(0, len(images), batch_size):
+            batch = {image.id: image for image in images[start:start + batch_size]}
+            tasks = [_task(image) for image in batch.values()]
+            results = executor.map(build_variants, tasks) if executor else map(build_variants, tasks)
+            now = timezone.now()
+            for image_id, rendered, error in results:
+                image = batch[image_id]
+                # Невдала спроба теж фіксується - картинка не обробляється щоразу
+                image.variants_at = now
+                if rendered:
+                    image.variants = _save(image, rendered)
+                    stats['generated'] += 1
+                    product_ids.add(image.product_id)
+                else:
+                    image.variants = {}
+                    stats['failed'] += 1
+                    if log:
+                        log(f'  ⚠️  Картинка {image_id}: {error}')
+            ProductImage.objects.bulk_update(batch.values(), VARIANT_FIELDS)
+    finally:
+        if executor:
+            executor.shutdown(cancel_futures=True)
+    return stats, product_ids
+
+
+def generate_pending_variants(workers=4, limit=None, regenerate=False, timer=None, log=None):
+    """
+    Створює копії для картинок без них і скидає кеш сторінок цих товарів
+
+    Returns:
+        dict: лічильники pending / generated / failed
+    """
+    timer = timer or StageTimer()
+    log = log or (lambda message: None)
+    with timer.stage('lookup'):
+        images = pending_images(regenerate=regenerate)
+        images = list(images[:limit] if limit else images)
+    log(f'🖼️  Зменшені копії: {len(images)} картинок, процесів: {workers}')
+    if not images:
+        return {'pending': 0, 'generated': 0, 'failed': 0}
+
+    with timer.stage('variants'):
+        stats, product_ids = generate_variants(images, workers=workers, log=log)
+    refresh_cards(product_ids)
+    invalidate_products(product_ids)
+    log(f'   ✅ Створено: {stats["generated"]}, помилок: {stats["failed"]}')
+    return {'pending': len(images), **stats}
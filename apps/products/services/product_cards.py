@@ -0,0 +1,149 @@
+"""
+Дані картки товару у списках (денормалізовані в Product)
+
+Картка показує головну картинку і slug категорій товару. Замість
+product.main_image (до двох запитів на картку) та product.categories.all
+ці дані зберігаються в полях Product і оновлюються при зміні картинок
+(імпорт, копії, перевірка URL, адмінка) та категорій. Сторінка з 15
+картками рендериться зі сталою кількістю запитів - достатньо вибрати
+CARD_FIELDS.
+
+Готовий HTML карток кешується (render_cards): ключ - id товару та версія,
+відбиток усього, що показує картка (ціна, акція, наявність, бейджі,
+картинка). Зміна будь-чого з цього дає новий ключ, тому скидати кеш при
+зміні товару не треба; сторінка списку бере всі картки одним get_many.
+"""
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.template.loader import render_to_string
+
+from apps.core.cache_tags import generations
+from apps.products.models import Product, ProductImage
+
+
+# Поля Product, потрібні для includes/product_card.html та card_payload
+CARD_FIELDS = (
+    'id', 'name', 'slug', 'retail_price', 'sale_price', 'is_sale', 'is_top', 'is_new',
+    'sale_start_date', 'sale_end_date', 'stock', 'created_at',
+    'main_image_url', 'thumbnail_url', 'main_image_srcset', 'card_category_slugs',
+)
+
+PROJECTION_FIELDS = ('main_image_url', 'thumbnail_url', 'main_image_srcset', 'card_category_slugs')
+
+BATCH_SIZE = 1000
+
+# Тег усіх закешованих карток: скидається після деплою (зміна шаблону)
+CARDS_TAG = 'cards'
+CARD_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def image_fields(image):
+    """Поля картки з головної картинки (None - заглушка)"""
+    if image is None:
+        return {'main_image_url': '', 'thumbnail_url': '', 'main_image_srcset': {}}
+    srcset = {}
+    if image.variants:
+        # Як у product_picture для 'card': копії до наступного розміру включно
+        srcset = {fmt: image.get_srcset(fmt, 'detail') for fmt in ('webp', 'jpeg')}
+    return {
+        'main_image_url': image.get_image_url('card') or '',
+        'thumbnail_url': image.get_image_url('thumb') or '',
+        'main_image_srcset': srcset,
+    }
+
+
+def refresh_cards(product_ids):
+    """
+    Перераховує дані карток товарів (пакетами, по три запити на пакет)
+
+    Returns:
+        int: кількість товарів, у яких дані змінились
+    """
+    product_ids = sorted(set(product_ids))
+    updated = 0
+    for start in range(0, len(product_ids), BATCH_SIZE):
+        updated += _refresh_batch(product_ids[start:start + BATCH_SIZE])
+    return updated
+
+
+def _refresh_batch(product_ids):
+    # Головна - робоча картинка з is_main, інакше перша робоча (repair_main_images)
+    main_images = {}
+    images = ProductImage.objects.filter(product_id__in=product_ids, is_broken=False).only(
+        'id', 'product_id', 'image', 'image_url', 'variants', 'is_main',
+    ).order_by('product_id', '-is_main', 'sort_order', 'id')
+    for image in images:
+        main_images.setdefault(image.product_id, image)
+
+    slugs = defaultdict(list)
+    links = Product.categories.through.objects.filter(product_id__in=product_ids).values_list(
+        'product_id', 'category__slug',
+    ).order_by('category__sort_order', 'category__name')
+    for product_id, slug in links:
+        slugs[product_id].append(slug)
+
+    changed = []
+    for product in Product.objects.filter(id__in=product_ids).only('id', *PROJECTION_FIELDS):
+        fields = image_fields(main_images.get(product.id))
+        fields['card_category_slugs'] = ','.join(slugs[product.id])
+        if any(getattr(product, name) != value for name, value in fields.items()):
+            for name, value in fields.items():
+                setattr(product, name, value)
+            changed.append(product)
+    Product.objects.bulk_update(changed, PROJECTION_FIELDS, batch_size=500)
+    return len(changed)
+
+
+def rebuild_cards():
+    """Перераховує дані карток усіх товарів (після імпорту або деплою)"""
+    return refresh_cards(Product.objects.values_list('id', flat=True))
+
+
+def category_card_product_ids(category_ids):
+    """Товари, у картках яких є slug цих категорій (перейменування, видалення)"""
+    return set(
+        Product.categories.through.objects.filter(category_id__in=category_ids)
+        .values_list('product_id', flat=True)
+    )
+
+
+def card_version(product):
+    """Відбиток даних картки; is_sale_active - бо акція починається й закінчується за часом"""
+    # Локальний імпорт: apps.products.utils імпортує цей модуль
+    from apps.products.utils.fingerprints import fingerprint
+
+    return fingerprint([
+        product.name, product.slug, str(product.retail_price), str(product.sale_price),
+        product.is_sale_active(), product.sale_end_date.isoformat() if product.sale_end_date else None,
+        product.is_in_stock(), product.is_top, product.is_new,
+        product.main_image_url, product.main_image_srcset, product.card_category_slugs,
+    ])[:16]
+
+
+def render_cards(products, template_name='includes/product_card.html'):
+    """
+    HTML карток товарів з кешу (одним get_many), відсутні рендеряться і кешуються
+
+    Args:
+        products: товари з CARD_FIELDS
+        template_name: шаблон картки з контекстом {'product': ...}
+
+    Returns:
+        list: HTML карток у порядку products
+    """
+    products = list(products)
+    generation = generations([CARDS_TAG])[0]
+    keys = [f'card:{template_name}:{product.id}:{card_version(product)}:{generation}' for product in products]
+    cached = cache.get_many(keys)
+
+    fragments = []
+    rendered = {}
+    for product, key in zip(products, keys):
+        fragment = cached.get(key)
+        if fragment is None:
+            fragment = rendered[key] = render_to_string(template_name, {'product': product})
+        fragments.append(fragment)
+    if rendered:
+        cache.set_many(rendered, CARD_CACHE_TIMEOUT)
+    return fragments
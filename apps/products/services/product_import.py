@@ -0,0 +1,143 @@
+"""
+Створення товарів з фіду постачальника
+
+Нові товари пакету створюються одним bulk_create: slug та артикул (SKU)
+видаються аллокатором в пам'яті, тому Product.save() з його циклом
+перевірки slug і другим UPDATE для SKU не викликається. Якщо пакет не
+записався, товари створюються по одному - помилка коштує один товар.
+"""
+import html
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils.text import slugify
+
+from apps.products.models import Product
+from apps.products.services.attributes import write_product_attributes
+from apps.products.utils.image_downloader import add_product_images
+
+
+def build_product(offer, categories_index, slugs, skus):
+    """
+    Створює об'єкт Product (без збереження) з даних фіду
+
+    Returns:
+        Product або None, якщо товар не можна імпортувати (немає назви,
+        ціни або категорії)
+    """
+    name = offer['name']
+    price = offer['price']
+    if not offer['vendor_code'] or not name or not price:
+        return None
+
+    # Категорія
+    category_id = offer['category_id']
+    category = categories_index.get(category_id) if category_id else None
+    if not category:
+        return None
+
+    # Ціна
+    try:
+        retail_price = Decimal(price)
+    except (ValueError, TypeError, ArithmeticError):
+        return None
+
+    description = offer['description']
+    vendor = offer['vendor']
+    return Product(
+        external_id=offer['vendor_code'],
+        name=name[:200],
+        slug=slugs.allocate(slugify(name)),
+        sku=skus.allocate(),
+        retail_price=retail_price,
+        stock=5 if offer['available'] else 0,
+        description=html.unescape(description) if description else '',
+        vendor_name=vendor[:200] if vendor else '',
+        primary_category=category,
+        is_active=True,
+    )
+
+
+def create_products(offers, categories_index, slugs, skus, attributes=None):
+    """
+    Створює нові товари пакету разом з категоріями, характеристиками та
+    URL картинок
+
+    Args:
+        offers: товари фіду, яких ще немає в базі
+        categories_index: external_id -> Category
+        slugs, skus: аллокатори з product_allocators()
+        attributes: AttributeDictionary запуску
+
+    Returns:
+        tuple: (створено, пропущено)
+    """
+    pending = {}
+    skipped = 0
+    for offer in offers:
+        if offer['vendor_code'] in pending:
+            continue
+        product = build_product(offer, categories_index, slugs, skus)
+        if product is None:
+            skipped += 1
+            continue
+        pending[offer['vendor_code']] = (product, offer)
+
+    if not pending:
+        return 0, skipped
+
+    items = list(pending.values())
+    Product.objects.bulk_create([product for product, _ in items])
+
+    # Категорія в M2M
+    through = Product.categories.through
+    through.objects.bulk_create(
+        [through(product_id=product.id, category_id=product.primary_category_id) for product, _ in items],
+        ignore_conflicts=True,
+    )
+
+    # Характеристики
+    with_params = write_product_attributes(
+        [(product, offer['params']) for product, offer in items if offer['params']], attributes,
+    )
+    if with_params:
+        Product.objects.bulk_update(with_params, ['attributes_hash'])
+
+    add_product_images({product.id: offer['pictures'] for product, offer in items})
+    return len(items), skipped
+
+
+def create_products_isolated(offers, categories_index, slugs, skus, attributes=None):
+    """
+    create_products з ізоляцією помилок
+
+    Пакет записується в одній транзакції; якщо вона впала (задовге значення,
+    порушення цілісності), товари створюються по одному, кожен у своїй
+    точці збереження, а помилкові пропускаються.
+
+    Returns:
+        tuple: (створено, пропущено, помилок)
+    """
+    try:
+        with transaction.atomic():
+            created, skipped = create_products(offers, categories_index, slugs, skus, attributes)
+        return created, skipped, 0
+    except Exception:
+        pass
+
+    created = skipped = errors = 0
+    seen = set()
+    for offer in offers:
+        # Повтор артикулу в пакеті create_products теж пропускає без лічильника
+        if offer['vendor_code'] in seen:
+            continue
+        seen.add(offer['vendor_code'])
+        try:
+            with transaction.atomic():
+                offer_created, offer_skipped = create_products([offer], categories_index, slugs, skus, attributes)
+        except Exception:
+            errors += 1
+            continue
+        created += offer_created
+        skipped += offer_skipped
+    return created, skipped, errors
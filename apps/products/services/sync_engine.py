@@ -0,0 +1,278 @@
+"""
+Пакетна синхронізація товарів з фідом постачальника
+
+Замість Product.objects.get + save на кожен товар пакет обробляється так:
+товари завантажуються одним запитом у словник за external_id, різниця
+полів рахується в Python, а зміни записуються через bulk_update (тільки
+змінені поля) та bulk_create для M2M і характеристик. Характеристики
+переписуються лише тоді, коли змінився відбиток списку <param>.
+
+Товари, відбиток яких (Product.feed_hash) збігається з фідом, пропускаються
+ще до завантаження моделей - щоденний запуск масштабується з кількістю
+змін, а не з розміром каталогу.
+"""
+import html
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+
+from apps.products.models import Product
+from apps.products.services.attributes import AttributeDictionary, write_product_attributes
+from apps.products.utils import add_product_images
+from apps.products.utils.fingerprints import offer_fingerprint
+from apps.products.utils.query_counter import QueryCounter
+from apps.products.utils.stage_timer import StageTimer
+
+
+# Поля, які синхронізуються з фіду
+SYNC_FIELDS = (
+    'id', 'external_id', 'name', 'retail_price', 'stock',
+    'description', 'vendor_name', 'primary_category_id', 'attributes_hash',
+    'feed_hash',
+)
+
+# Поля, які виправляє фід: ручна зміна будь-якого з них скидає Product.feed_hash,
+# щоб наступна синхронізація не пропустила товар
+FEED_FIELDS = frozenset((
+    'name', 'retail_price', 'stock', 'description', 'vendor_name', 'primary_category', 'categories',
+))
+
+
+class ProductSyncEngine:
+    """Синхронізація існуючих товарів з фідом пакетами"""
+
+    def __init__(self, categories_index=None, skip_images=False, images_only=False, force=False, timer=None,
+                 attributes=None):
+        self.categories_index = categories_index or {}
+        # Словник назв і значень характеристик (завантажується один раз, з першим пакетом)
+        self.attributes = attributes
+        self.skip_images = skip_images
+        self.images_only = images_only
+        self.force = force
+        self.totals = defaultdict(int)
+        # id товарів, у яких змінились показані на сайті дані (для інвалідації кешу)
+        self.changed_ids = set()
+        self.timer = timer or StageTimer()
+
+    def attribute_dictionary(self):
+        if self.attributes is None:
+            self.attributes = AttributeDictionary()
+        return self.attributes
+
+    def process_batch(self, offers):
+        """
+        Синхронізує пакет товарів з фіду
+
+        Returns:
+            dict: лічильники пакету (unchanged, changed, missing, updated,
+                attributes, images, skipped, errors, queries)
+        """
+        stats = defaultdict(int)
+        with QueryCounter() as counter:
+            try:
+                self._process_atomic(offers, stats)
+            except Exception:
+                # Один поганий рядок (задовге значення, порушення цілісності) відкочує
+                # пакет - тоді товари записуються по одному, помилкові пропускаються
+                stats = defaultdict(int)
+                for offer in offers:
+                    offer_stats = defaultdict(int)
+                    try:
+                        self._process_atomic([offer], offer_stats)
+                    except Exception:
+                        stats['errors'] += 1
+                        continue
+                    for key, value in offer_stats.items():
+                        stats[key] += value
+        stats['queries'] = counter.count
+
+        for key, value in stats.items():
+            self.totals[key] += value
+        return dict(stats)
+
+    def _process_atomic(self, offers, stats):
+        """Пакет в одній транзакції; changed_ids поповнюються тільки якщо вона вдалась"""
+        changed_ids, self.changed_ids = self.changed_ids, set()
+        try:
+            with transaction.atomic():
+                self._process(offers, stats)
+            changed_ids |= self.changed_ids
+        finally:
+            self.changed_ids = changed_ids
+
+    def _process(self, offers, stats):
+        stats['skipped'] += sum(1 for offer in offers if not offer['vendor_code'])
+        offers = [offer for offer in offers if offer['vendor_code']]
+
+        # Легкий запит: тільки id та відбиток для всього пакету
+        with self.timer.stage('lookup'):
+            known = {
+                external_id: (product_id, feed_hash)
+                for external_id, product_id, feed_hash in Product.objects.filter(
+                    external_id__in=[offer['vendor_code'] for offer in offers]
+                ).values_list('external_id', 'id', 'feed_hash')
+            }
+
+        matched = []
+        changed_offers = {}
+        for offer in offers:
+            if offer['vendor_code'] not in known:
+                stats['missing'] += 1
+                continue
+            product_id, feed_hash = known[offer['vendor_code']]
+            matched.append((product_id, offer))
+            if self.images_only:
+                continue
+
+            offer['feed_hash'] = offer_fingerprint(offer)
+            if self.force or offer['feed_hash'] != feed_hash:
+                changed_offers[offer['vendor_code']] = offer
+            else:
+                stats['unchanged'] += 1
+
+        if changed_offers:
+            stats['changed'] += len(changed_offers)
+            # Повні моделі - тільки для змінених товарів
+            with self.timer.stage('lookup'):
+                products = Product.objects.only(*SYNC_FIELDS).in_bulk(changed_offers.keys(), field_name='external_id')
+            self._sync_fields(
+                [(products[code], offer) for code, offer in changed_offers.items() if code in products],
+                stats,
+            )
+        if not self.skip_images:
+            with self.timer.stage('images'):
+                self._sync_images(matched, stats)
+
+    def _sync_fields(self, matched, stats):
+        """Рахує різницю полів і записує зміни пакетно"""
+        now = timezone.now()
+        diffs = []
+        category_links = set()
+
+        with self.timer.stage('products'):
+            for product, offer in matched:
+                try:
+                    changed = self.diff_product(product, offer)
+                except Exception:
+                    stats['errors'] += 1
+                    continue
+
+                category = self.categories_index.get(offer['category_id'])
+                if category is not None:
+                    category_links.add((product.id, category.id))
+                # Відбиток записується, лише коли всі посилання знайдені: інакше
+                # товар без категорії вважався б незмінним до наступної правки у фіді
+                feed_hash = offer['feed_hash'] if category is not None or not offer['category_id'] else ''
+                diffs.append((product, offer, changed, feed_hash))
+
+        # Характеристики переписуються тільки при зміні хешу <param>
+        with self.timer.stage('attributes'):
+            attributes_changed = {
+                product.id for product in write_product_attributes(
+                    [(product, offer['params']) for product, offer, _, _ in diffs if offer['params']],
+                    self.attribute_dictionary(),
+                )
+            }
+        stats['attributes'] += len(attributes_changed)
+
+        changed_by_fields = defaultdict(list)
+        for product, offer, changed, feed_hash in diffs:
+            if product.id in attributes_changed:
+                changed.append('attributes_hash')
+            if changed:
+                product.updated_at = now
+                changed.append('updated_at')
+                stats['updated'] += 1
+                self.changed_ids.add(product.id)
+            # Відбиток записується навіть якщо поля не змінились (перший запуск)
+            if product.feed_hash != feed_hash:
+                product.feed_hash = feed_hash
+                changed.append('feed_hash')
+            if changed:
+                changed_by_fields[tuple(sorted(changed))].append(product)
+
+        # bulk_update групами за набором змінених полів
+        with self.timer.stage('products'):
+            for fields, products in changed_by_fields.items():
+                Product.objects.bulk_update(products, fields)
+
+            self.changed_ids.update(self._link_categories(category_links))
+
+    def diff_product(self, product, offer):
+        """Застосовує дані фіду до товару в пам'яті; повертає список змінених полів"""
+        changed = []
+
+        if offer['price']:
+            try:
+                new_price = Decimal(offer['price'])
+            except (ValueError, TypeError, ArithmeticError):
+                new_price = None
+            if new_price is not None and product.retail_price != new_price:
+                product.retail_price = new_price
+                changed.append('retail_price')
+
+        # is_active контролюється вручну адміном, не чіпаємо
+        # available впливає тільки на stock (наявність)
+        new_stock = 5 if offer['available'] else 0
+        if product.stock != new_stock:
+            product.stock = new_stock
+            changed.append('stock')
+
+        name = offer['name'][:200]
+        if name and product.name != name:
+            product.name = name
+            changed.append('name')
+
+        if offer['description']:
+            clean_desc = html.unescape(offer['description'])
+            if product.description != clean_desc:
+                product.description = clean_desc
+                changed.append('description')
+
+        vendor = offer['vendor'][:200]
+        if vendor and product.vendor_name != vendor:
+            product.vendor_name = vendor
+            changed.append('vendor_name')
+
+        category = self.categories_index.get(offer['category_id'])
+        if category is not None and product.primary_category_id != category.id:
+            product.primary_category_id = category.id
+            changed.append('primary_category')
+
+        return changed
+
+    @staticmethod
+    def _link_categories(links):
+        """Додає відсутні зв'язки товар-категорія одним bulk_create; повертає id товарів"""
+        if not links:
+            return set()
+        through = Product.categories.through
+        product_ids = {product_id for product_id, _ in links}
+        existing = set(
+            through.objects.filter(product_id__in=product_ids)
+            .values_list('product_id', 'category_id')
+        )
+        missing = links - existing
+        if missing:
+            through.objects.bulk_create(
+                [through(product_id=product_id, category_id=category_id) for product_id, category_id in missing],
+                ignore_conflicts=True,
+            )
+        return {product_id for product_id, _ in missing}
+
+    def _sync_images(self, matched, stats):
+        """Додає картинки товарам, у яких їх ще немає (незалежно від відбитку)"""
+        pictures = {product_id: offer['pictures'] for product_id, offer in matched if offer['pictures']}
+        if not pictures:
+            return
+        try:
+            # Savepoint: помилка картинок не відкочує поля пакету
+            with transaction.atomic():
+                added = add_product_images(pictures)
+        except Exception:
+            stats['errors'] += len(pictures)
+            return
+        stats['images'] += len(added)
+        self.changed_ids.update(added)
@@ -0,0 +1,179 @@
+"""
+Черга фонових задач синхронізації
+
+Одночасно виконується не більше однієї задачі: воркер бере задачу тільки
+якщо немає іншої зі статусом running (задача без heartbeat довше
+STALE_AFTER вважається завислою і позначається як невдала).
+
+Heartbeat пише окремий потік кожні HEARTBEAT_INTERVAL секунд - довгий
+етап без виводу (великий bulk_update, перебудова фасетів) не робить
+задачу "завислою", поки процес воркера живий.
+"""
+import io
+import logging
+import threading
+from datetime import timedelta
+
+from django.core.management import call_command, get_commands, load_command_class
+from django.db import connection, transaction
+from django.utils import timezone
+
+from apps.core import cache_tags
+from apps.products.models_jobs import SyncJob
+
+logger = logging.getLogger(__name__)
+
+
+# Команди, які виконуються для кожного типу задачі (по черзі)
+JOB_COMMANDS = {
+    'sync': [
+        ('sync_products', {'skip_images': True}),
+        ('update_prices_xls', {}),
+        # Прогрів сторінок, скинутих синхронізацією (вже теплі беруться з кешу)
+        ('warm_cache', {}),
+    ],
+}
+# Команди, які працюють тільки зі спільним кешем (Redis)
+SHARED_CACHE_COMMANDS = {'warm_cache'}
+
+STALE_AFTER = timedelta(minutes=15)
+HEARTBEAT_INTERVAL = 5  # секунд між записами heartbeat і прогресу в базу
+OUTPUT_LIMIT = 20000  # символів виводу, які зберігаються в задачі
+
+
+def enqueue(kind='sync'):
+    """
+    Ставить задачу в чергу; якщо така ж задача вже чекає - повертає її
+
+    Returns:
+        tuple: (SyncJob, created)
+    """
+    with transaction.atomic():
+        job = SyncJob.objects.select_for_update().filter(kind=kind, status=SyncJob.STATUS_QUEUED).first()
+        if job:
+            return job, False
+        return SyncJob.objects.create(kind=kind), True
+
+
+def claim_next():
+    """
+    Бере наступну задачу з черги (блокування: тільки одна running)
+
+    Returns:
+        SyncJob або None
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        running = list(SyncJob.objects.select_for_update().filter(status=SyncJob.STATUS_RUNNING))
+        for job in running:
+            if job.heartbeat_at and job.heartbeat_at > now - STALE_AFTER:
+                return None
+            job.status = SyncJob.STATUS_FAILED
+            job.error = 'Задача зависла (немає активності воркера)'
+            job.finished_at = now
+            job.save(update_fields=['status', 'error', 'finished_at'])
+
+        job = (
+            SyncJob.objects.select_for_update(skip_locked=True)
+            .filter(status=SyncJob.STATUS_QUEUED)
+            .order_by('created_at')
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = SyncJob.STATUS_RUNNING
+        job.started_at = now
+        job.heartbeat_at = now
+        job.save(update_fields=['status', 'started_at', 'heartbeat_at'])
+        return job
+
+
+class JobOutput(io.TextIOBase):
+    """stdout команди: накопичує вивід і запам'ятовує останній рядок як прогрес"""
+
+    def __init__(self, job):
+        self.job = job
+        self.buffer = []
+
+    def write(self, text):
+        self.buffer.append(text)
+        lines = [line.strip() for line in text.splitlines() if line.strip()]
+        if lines:
+            self.job.progress = lines[-1][:255]
+        return len(text)
+
+    def getvalue(self):
+        return ''.join(self.buffer)[-OUTPUT_LIMIT:]
+
+
+class Heartbeat(threading.Thread):
+    """Потік, що пише heartbeat_at і прогрес задачі незалежно від виводу команди"""
+
+    def __init__(self, job, interval=HEARTBEAT_INTERVAL):
+        super().__init__(name=f'sync-job-{job.pk}-heartbeat', daemon=True)
+        self.job = job
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def run(self):
+        try:
+            while not self.stopped.wait(self.interval):
+                try:
+                    self.beat()
+                except Exception as e:
+                    logger.warning(f'Sync job {self.job.pk} heartbeat failed: {e}')
+        finally:
+            # У потоку власне з'єднання з базою
+            connection.close()
+
+    def beat(self):
+        SyncJob.objects.filter(pk=self.job.pk, status=SyncJob.STATUS_RUNNING).update(
+            progress=self.job.progress, heartbeat_at=timezone.now()
+        )
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+def job_commands(kind, output):
+    """Команди задачі; без спільного кешу прогрів пропускається"""
+    commands = JOB_COMMANDS[kind]
+    if cache_tags.is_shared():
+        return commands
+    # Воркер - окремий процес: його локальний кеш сайт не читає
+    output.write('⚠️  Кеш не спільний (немає REDIS_URL): сайт побачить зміни після закінчення TTL сторінок, '
+                 'прогрів кешу пропущено\n')
+    return [(name, options) for name, options in commands if name not in SHARED_CACHE_COMMANDS]
+
+
+def run_job(job):
+    """Виконує команди задачі та записує результат, тривалість і лічильники"""
+    output = JobOutput(job)
+    heartbeat = Heartbeat(job)
+    heartbeat.start()
+    stats = {}
+    error = ''
+    try:
+        for name, options in job_commands(job.kind, output):
+            command = load_command_class(get_commands()[name], name)
+            call_command(command, stdout=output, **options)
+            command_stats = getattr(command, 'stats', {})
+            stats[name] = command_stats
+            if command_stats.get('error'):
+                error = f"{name}: {command_stats['error']}"
+                break
+    except Exception as e:
+        logger.error(f'Sync job {job.id} failed: {e}', exc_info=True)
+        error = str(e)
+    finally:
+        heartbeat.stop()
+
+    job.status = SyncJob.STATUS_FAILED if error else SyncJob.STATUS_SUCCESS
+    job.stats = stats
+    job.error = error
+    job.output = output.getvalue()
+    job.finished_at = timezone.now()
+    job.heartbeat_at = job.finished_at
+    job.save()
+    return job
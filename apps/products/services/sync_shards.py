@@ -0,0 +1,91 @@
+"""
+Паралельна синхронізація частинами (shards) у пулі процесів
+
+Товари фіду діляться на частини за хешем артикулу. Кожна частина
+обробляється окремим процесом зі своїм з'єднанням з базою і своєю
+транзакцією на пакет: процес сам читає фід з диску, пропускає чужі товари
+і проганяє свої через ProductSyncEngine. Батьківський процес тільки
+збирає лічильники та заміри етапів.
+"""
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.db import connections
+
+
+def _init_worker():
+    # При spawn Django ще не налаштований; при fork - закриваємо успадковані з'єднання
+    django.setup()
+    connections.close_all()
+
+
+def sync_shard(path, shard, shards, batch_size, engine_options):
+    """
+    Синхронізує одну частину фіду (виконується в процесі пулу)
+
+    Returns:
+        tuple: (shard, лічильники, кількість товарів, час етапів, запити етапів, id змінених товарів)
+    """
+    # Імпорт тут: при spawn модуль завантажується до django.setup()
+    from apps.products.models import Category
+    from apps.products.services.sync_engine import ProductSyncEngine
+    from apps.products.utils.feed_reader import SupplierFeed, iter_batches
+    from apps.products.utils.stage_timer import StageTimer
+
+    try:
+        categories_index = {}
+        if not engine_options.get('images_only'):
+            categories_index = {
+                cat.external_id: cat
+                for cat in Category.objects.exclude(external_id__isnull=True).only('id', 'external_id')
+            }
+        timer = StageTimer()
+        engine = ProductSyncEngine(categories_index=categories_index, timer=timer, **engine_options)
+
+        processed = 0
+        offers = timer.iterate('parse', SupplierFeed(path).iter_offers(shard=shard, shards=shards))
+        for batch in iter_batches(offers, batch_size):
+            engine.process_batch(batch)
+            processed += len(batch)
+        return (
+            shard, dict(engine.totals), processed,
+            dict(timer.timings), dict(timer.queries), list(engine.changed_ids),
+        )
+    finally:
+        connections.close_all()
+
+
+def run_sharded(path, workers, batch_size, engine_options, on_shard_done=None, timer=None):
+    """
+    Синхронізує фід у workers процесах
+
+    Args:
+        on_shard_done: функція (shard, лічильники, кількість) для виводу прогресу
+        timer: StageTimer, до якого додаються заміри етапів усіх процесів
+
+    Returns:
+        tuple: (сумарні лічильники, кількість товарів, id змінених товарів)
+    """
+    # Дочірні процеси не повинні ділити з'єднання батьківського
+    connections.close_all()
+
+    totals = defaultdict(int)
+    processed = 0
+    changed_ids = set()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+        futures = [
+            executor.submit(sync_shard, path, shard, workers, batch_size, engine_options)
+            for shard in range(workers)
+        ]
+        for future in as_completed(futures):
+            shard, shard_totals, shard_processed, timings, queries, shard_changed = future.result()
+            changed_ids.update(shard_changed)
+            if timer is not None:
+                timer.merge(timings, queries)
+            for key, value in shard_totals.items():
+                totals[key] += value
+            processed += shard_processed
+            if on_shard_done:
+                on_shard_done(shard, shard_totals, shard_processed)
+    return totals, processed, changed_ids
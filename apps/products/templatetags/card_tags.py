@@ -0,0 +1,22 @@
+"""
+Template tags для карток товарів (HTML з кешу, див. services/product_cards.py)
+"""
+from django import template
+from django.utils.safestring import mark_safe
+
+from apps.products.services.product_cards import render_cards
+
+register = template.Library()
+
+
+@register.simple_tag
+def product_cards(products, template_name='includes/product_card.html'):
+    """
+    Всі картки списку одним зверненням до кешу
+
+    Використання:
+        {% load card_tags %}
+        {% product_cards products %}
+        {% product_cards sale_products 'includes/promo_card.html' %}
+    """
+    return mark_safe(''.join(render_cards(products, template_name)))
@@ -0,0 +1,80 @@
+"""
+Template tags для картинок товарів (зменшені копії, srcset)
+"""
+from django import template
+
+from apps.products.models import ProductImage
+
+register = template.Library()
+
+
+# Ширина картинки у верстці для атрибута sizes
+SIZES_HINTS = {
+    'thumb': '80px',
+    'card': '(max-width: 576px) 50vw, 300px',
+    'detail': '(max-width: 768px) 100vw, 800px',
+}
+
+
+@register.inclusion_tag('includes/product_picture.html')
+def product_picture(image, size='card', alt='', css_class='', width=None, height=None, lazy=True, img_id=''):
+    """
+    <picture> з WebP-копіями та JPEG для старих браузерів
+
+    Використання:
+        {% load image_tags %}
+        {% product_picture product.main_image 'card' alt=product.name css_class='product-card__image' width=300 height=300 %}
+
+    Якщо копій ще немає - звичайний <img> з оригіналом.
+    """
+    has_variants = bool(image and image.variants)
+    # У srcset також наступний розмір - для екранів з високою щільністю пікселів
+    names = [name for name, _ in ProductImage.VARIANT_SIZES]
+    max_size = names[min(names.index(size) + 1, len(names) - 1)] if size in names else size
+    return {
+        'src': image.get_image_url(size) if image else '',
+        'webp_srcset': image.get_srcset('webp', max_size) if has_variants else '',
+        'jpeg_srcset': image.get_srcset('jpeg', max_size) if has_variants else '',
+        'sizes': SIZES_HINTS.get(size, ''),
+        'alt': alt,
+        'css_class': css_class,
+        'width': width,
+        'height': height,
+        'lazy': lazy,
+        'img_id': img_id,
+    }
+
+
+@register.inclusion_tag('includes/product_picture.html')
+def card_picture(product, alt='', css_class='', width=None, height=None, lazy=True):
+    """
+    <picture> картки товару з денормалізованих полів (без запиту до картинок)
+
+    Використання:
+        {% card_picture product alt=product.name css_class='product-card__image' width=300 height=300 %}
+    """
+    srcset = product.main_image_srcset or {}
+    return {
+        'src': product.main_image_url,
+        'webp_srcset': srcset.get('webp', ''),
+        'jpeg_srcset': srcset.get('jpeg', ''),
+        'sizes': SIZES_HINTS['card'],
+        'alt': alt,
+        'css_class': css_class,
+        'width': width,
+        'height': height,
+        'lazy': lazy,
+        'img_id': '',
+    }
+
+
+@register.filter
+def variant_url(image, size):
+    """URL копії розміру size (або оригіналу): {{ image|variant_url:'thumb' }}"""
+    return image.get_image_url(size) if image else ''
+
+
+@register.simple_tag
+def image_srcset(image, fmt='webp', max_size='detail'):
+    """srcset з копій картинки: {% image_srcset image 'webp' 'detail' %}"""
+    return image.get_srcset(fmt, max_size) if image else ''
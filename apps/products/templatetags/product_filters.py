@@ -17,6 +17,6 @@ def get_item(dictionary, key):
 @register.filter
 def get_attribute(product, attr_name):
     """Отримує значення атрибута товару"""
-    attr = product.attributes.filter(name=attr_name).first()
-    return attr.value if attr else ''
+    attr = product.attributes.filter(name__name=attr_name).select_related('value').first()
+    return attr.value.value if attr else ''
 
@@ -0,0 +1,52 @@
+"""
+Тести запису характеристик товарів
+"""
+from django.test import TestCase
+from apps.products.models import Product, ProductAttribute
+from apps.products.services.attributes import write_product_attributes
+from apps.products.utils.fingerprints import params_fingerprint
+
+
+class WriteProductAttributesTest(TestCase):
+    """Характеристики переписуються тільки при зміні списку <param>"""
+
+    def setUp(self):
+        self.products = [
+            Product.objects.create(name=f'Товар {idx}', slug=f'tovar-{idx}', retail_price=100)
+            for idx in range(3)
+        ]
+        self.params = [('Колір', 'Червоний'), ('Країна', 'Україна')]
+        write_product_attributes([(product, self.params) for product in self.products])
+
+    def attributes(self, product):
+        return [
+            (attr.name.name, attr.value.value)
+            for attr in ProductAttribute.objects.filter(product=product).select_related('name', 'value')
+        ]
+
+    def test_first_write_sets_hash(self):
+        for product in self.products:
+            self.assertEqual(product.attributes_hash, params_fingerprint(self.params))
+            self.assertEqual(self.attributes(product), self.params)
+
+    def test_unchanged_params_are_skipped(self):
+        ids = list(ProductAttribute.objects.values_list('id', flat=True))
+        with self.assertNumQueries(0):
+            changed = write_product_attributes([(product, list(self.params)) for product in self.products])
+        self.assertEqual(changed, [])
+        self.assertEqual(list(ProductAttribute.objects.values_list('id', flat=True)), ids)
+
+    def test_changed_params_are_rewritten(self):
+        first, second, third = self.products
+        new_params = [('Колір', 'Чорний'), ('Країна', 'Україна')]
+        # Порядок теж важливий - від нього залежить sort_order
+        reordered = list(reversed(self.params))
+
+        changed = write_product_attributes([(first, new_params), (second, self.params), (third, reordered)])
+
+        self.assertEqual(changed, [first, third])
+        self.assertEqual(first.attributes_hash, params_fingerprint(new_params))
+        self.assertEqual(third.attributes_hash, params_fingerprint(reordered))
+        self.assertEqual(self.attributes(first), new_params)
+        self.assertEqual(self.attributes(second), self.params)
+        self.assertEqual(self.attributes(third), reordered)
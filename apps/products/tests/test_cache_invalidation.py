@@ -0,0 +1,80 @@
+"""
+Тести інвалідації кешу за тегами
+"""
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from apps.core import cache_tags
+from apps.products.models import Category, Product
+from apps.products.services.cache_invalidation import invalidate_products
+
+
+LOCMEM = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=LOCMEM)
+class CacheTagsTest(TestCase):
+    """Скидаються тільки записи змінених тегів, решта кешу (сесії) лишається"""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_invalidate_only_tagged_entries(self):
+        cache.set('session:abc', 'кошик')
+        cache_tags.set_cached('menu_data', 'меню', 60, ['menu'])
+        cache_tags.set_cached('home_data', 'головна', 60, ['home', 'pixels'])
+
+        cache_tags.invalidate('pixels')
+
+        self.assertEqual(cache_tags.get_cached('menu_data', ['menu']), 'меню')
+        self.assertIsNone(cache_tags.get_cached('home_data', ['home', 'pixels']))
+        self.assertEqual(cache.get('session:abc'), 'кошик')
+
+    def test_product_change_invalidates_its_categories(self):
+        parent = Category.objects.create(name='Батьківська', slug='parent')
+        child = Category.objects.create(name='Дочірня', slug='child', parent=parent)
+        other = Category.objects.create(name='Інша', slug='other')
+        product = Product.objects.create(
+            name='Товар', slug='product', retail_price=100, primary_category=child,
+        )
+        for tag in (f'category:{parent.id}', f'category:{other.id}', 'menu'):
+            cache_tags.set_cached('page', tag, 60, [tag])
+
+        invalidate_products([product.id])
+
+        self.assertIsNone(cache_tags.get_cached('page', [f'category:{parent.id}']))
+        self.assertEqual(cache_tags.get_cached('page', [f'category:{other.id}']), f'category:{other.id}')
+        self.assertEqual(cache_tags.get_cached('page', ['menu']), 'menu')
+
+    def test_product_page_shows_current_stock(self):
+        """Сторінка товару не кешується: розпроданий товар зникає одразу"""
+        product = Product.objects.create(name='Товар', slug='product', retail_price=100, stock=1)
+        url = product.get_absolute_url()
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+        # Як після оформлення замовлення: save() без інвалідації кешу
+        product.stock = 0
+        product.save()
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+
+@override_settings(CACHES=LOCMEM, SITE_URL='http://testserver')
+class WarmCacheTest(TestCase):
+    """warm_cache заповнює кеш сторінок для нових відвідувачів"""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_warmed_home_page_is_served_from_cache(self):
+        Category.objects.create(name='Категорія', slug='category')
+        out = StringIO()
+        call_command('warm_cache', workers=1, stdout=out)
+        self.assertIn('Прогріто 3/3', out.getvalue())
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/').status_code, 200)
@@ -0,0 +1,67 @@
+"""
+Тести серверних фільтрів, сортування та JSON API категорії
+"""
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from apps.products.models import Category, Product
+from apps.products.services.catalog_listing import price_range
+from apps.products.services.category_membership import rebuild_memberships
+from apps.products.services.category_tree import reset_tree
+
+
+class CatalogListingTest(TestCase):
+    """Фільтри й сортування діють на всю категорію, а не на поточну сторінку"""
+
+    def setUp(self):
+        self.root = Category.objects.create(name='Корінь', slug='root')
+        self.left = Category.objects.create(name='Ліва', slug='left', parent=self.root)
+        self.right = Category.objects.create(name='Права', slug='right', parent=self.root)
+        for index in range(20):
+            Product.objects.create(
+                name=f'Товар {index:02d}', slug=f'product-{index}', retail_price=100 + index * 10, stock=5,
+                primary_category=self.left if index % 2 else self.right, is_new=index < 3,
+            )
+        reset_tree()
+        self.addCleanup(reset_tree)
+        rebuild_memberships()
+        self.api_url = reverse('products:category_products_api', kwargs={'slug': 'root'})
+
+    def test_sort_and_filters_span_all_pages(self):
+        response = self.client.get(self.root.get_absolute_url(), {'sort': 'price_asc'})
+        self.assertEqual(response.context['paginator'].count, 20)
+        self.assertEqual(response.context['products'][0].slug, 'product-0')
+
+        response = self.client.get(self.root.get_absolute_url(), {'sub': 'left', 'price_min': 250, 'sort': 'price_desc'})
+        self.assertEqual([p.slug for p in response.context['products']], ['product-19', 'product-17', 'product-15'])
+
+        response = self.client.get(self.root.get_absolute_url(), {'badge': 'new', 'sub': ['left', 'right']})
+        self.assertEqual({p.slug for p in response.context['products']}, {'product-0', 'product-1', 'product-2'})
+        self.assertEqual((response.context['min_price'], response.context['max_price']), (100, 290))
+
+    def test_api_walks_category_with_cursor(self):
+        for sort in ('default', 'name', 'price_desc', 'new'):
+            first = self.client.get(self.api_url, {'sort': sort, 'limit': 7}).json()
+            self.assertEqual(first['count'], 20)
+            products = first['products']
+            cursor = first['next_cursor']
+            while cursor:
+                data = self.client.get(self.api_url, {'sort': sort, 'limit': 7, 'cursor': cursor}).json()
+                self.assertNotIn('count', data)
+                products += data['products']
+                cursor = data['next_cursor']
+            self.assertEqual(len({p['id'] for p in products}), 20, sort)
+
+            page = self.client.get(self.root.get_absolute_url(), {'sort': sort})
+            self.assertEqual([p['id'] for p in products[:15]], [p.id for p in page.context['products']], sort)
+
+        self.assertEqual(self.client.get(self.api_url, {'cursor': 'broken'}).status_code, 400)
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_price_range_is_cached(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.assertEqual(price_range(self.left), (110, 290))
+        with self.assertNumQueries(0):
+            self.assertEqual(price_range(self.left), (110, 290))
@@ -0,0 +1,59 @@
+"""
+Тести імпорту дерева категорій
+"""
+from django.test import TestCase
+
+from apps.products.models import Category
+from apps.products.services.category_import import import_categories
+from apps.products.utils.query_counter import QueryCounter
+
+
+def make_tree(depth, width):
+    """Дерево фіду: width гілок глибиною depth (діти йдуть перед батьками)"""
+    categories = []
+    for branch in range(width):
+        for level in range(depth):
+            categories.append({
+                'external_id': f'{branch}-{level}',
+                'parent_id': f'{branch}-{level - 1}' if level else None,
+                'name': f'cat {branch} {level}',
+            })
+    return list(reversed(categories))
+
+
+class CategoryImportTest(TestCase):
+    """Тести import_categories"""
+
+    def test_deep_tree_constant_queries(self):
+        """Кількість запитів не залежить від глибини дерева"""
+        with QueryCounter() as shallow:
+            import_categories(make_tree(depth=2, width=3))
+        Category.objects.all().delete()
+        with QueryCounter() as deep:
+            categories = import_categories(make_tree(depth=12, width=3))
+
+        self.assertEqual(shallow.count, deep.count)
+        self.assertEqual(Category.objects.count(), 36)
+        self.assertEqual(categories['0-11'].parent.external_id, '0-10')
+        self.assertEqual(Category.objects.get(external_id='2-5').parent.external_id, '2-4')
+
+    def test_reimport_keeps_slugs(self):
+        """Повторний імпорт оновлює назву і батька, але не slug"""
+        Category.objects.create(name='Зайнятий', slug='root', external_id='other')
+        import_categories([
+            {'external_id': '1', 'parent_id': None, 'name': 'Root'},
+            {'external_id': '2', 'parent_id': '1', 'name': 'Child'},
+            {'external_id': '3', 'parent_id': '404', 'name': 'Orphan'},
+        ])
+        self.assertEqual(Category.objects.get(external_id='1').slug, 'root-1')
+        self.assertEqual(Category.objects.get(external_id='2').slug, 'root-1-child')
+        self.assertIsNone(Category.objects.get(external_id='3').parent)
+
+        import_categories([
+            {'external_id': '1', 'parent_id': None, 'name': 'Root renamed'},
+            {'external_id': '2', 'parent_id': None, 'name': 'Child'},
+        ])
+        child = Category.objects.get(external_id='2')
+        self.assertEqual(child.slug, 'root-1-child')
+        self.assertIsNone(child.parent)
+        self.assertEqual(Category.objects.get(external_id='1').name, 'Root renamed')
@@ -0,0 +1,106 @@
+"""
+Тести таблиці товарів у категоріях
+"""
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.products.models import Category, Product, ProductCategoryMembership
+from apps.products.services.category_membership import (
+    rebuild_memberships, refresh_category_memberships, refresh_memberships,
+)
+from apps.products.services.category_tree import reset_tree
+
+
+class CategoryMembershipTest(TestCase):
+    """Рядки для основної, додаткових і батьківських категорій; сторінка категорії без DISTINCT"""
+
+    def setUp(self):
+        self.root = Category.objects.create(name='Корінь', slug='root')
+        self.child = Category.objects.create(name='Дочірня', slug='child', parent=self.root)
+        self.other = Category.objects.create(name='Інша', slug='other')
+        self.hidden = Category.objects.create(name='Прихована', slug='hidden', parent=self.other, is_active=False)
+        self.product = Product.objects.create(
+            name='Товар', slug='product', retail_price=100, stock=5, primary_category=self.child,
+        )
+        self.product.categories.add(self.hidden)
+        reset_tree()
+        self.addCleanup(reset_tree)
+
+    def memberships(self, product):
+        return set(
+            ProductCategoryMembership.objects.filter(product=product).values_list('category__slug', 'is_visible')
+        )
+
+    def test_rows_cover_ancestors_and_visibility(self):
+        rebuild_memberships()
+        # Неактивна категорія приховує товар від батьківської "other"
+        self.assertEqual(
+            self.memberships(self.product),
+            {('child', True), ('root', True), ('hidden', True)},
+        )
+
+        Product.objects.filter(pk=self.product.pk).update(stock=0)
+        refresh_memberships([self.product.id])
+        self.assertEqual(
+            self.memberships(self.product),
+            {('child', False), ('root', False), ('hidden', False)},
+        )
+
+    def test_scheduled_sale_start_updates_price(self):
+        """expire_sales переносить акційну ціну в рядки, коли настав sale_start_date"""
+        Product.objects.filter(pk=self.product.pk).update(
+            is_sale=True, sale_price=80, sale_start_date=timezone.now() + timedelta(hours=1),
+        )
+        rebuild_memberships()
+        sale_products = self.child.memberships.filter(price__lt=100)
+        self.assertFalse(sale_products.exists())
+
+        # Акція ще не почалась - рядки не чіпаються
+        call_command('expire_sales', stdout=StringIO())
+        self.assertFalse(sale_products.exists())
+
+        Product.objects.filter(pk=self.product.pk).update(sale_start_date=timezone.now() - timedelta(minutes=1))
+        out = StringIO()
+        call_command('expire_sales', stdout=out)
+        self.assertIn('Почалось акцій: 1', out.getvalue())
+        self.assertEqual(set(ProductCategoryMembership.objects.values_list('price', flat=True)), {80})
+        self.assertTrue(sale_products.exists())
+
+        # Повторний запуск нічого не перезаписує
+        out = StringIO()
+        call_command('expire_sales', stdout=out)
+        self.assertNotIn('Почалось', out.getvalue())
+
+    def test_category_move_refreshes_branch(self):
+        rebuild_memberships()
+        self.child.parent = self.other
+        self.child.save()
+        refresh_category_memberships([self.child.id])
+        self.assertEqual(
+            self.memberships(self.product),
+            {('child', True), ('other', True), ('hidden', True)},
+        )
+
+    def test_category_page_without_distinct(self):
+        # Товар у двох категоріях однієї гілки показується один раз
+        self.product.categories.add(self.root)
+        for index in range(20):
+            Product.objects.create(
+                name=f'Товар {index}', slug=f'product-{index}', retail_price=100, stock=5, primary_category=self.root,
+            )
+        rebuild_memberships()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.root.get_absolute_url())
+        self.assertFalse([query['sql'] for query in queries if 'DISTINCT' in query['sql'].upper()])
+        self.assertEqual(response.context['paginator'].count, 21)
+        self.assertEqual(response.context['products'][0].slug, 'product-19')
+
+        last_page = self.client.get(self.root.get_absolute_url(), {'page': 2})
+        self.assertEqual([p.slug for p in last_page.context['products']][-1], 'product')
@@ -0,0 +1,79 @@
+"""
+Тести дерева категорій
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.products.models import Category, Product
+from apps.products.models_sales import Sale
+from apps.products.services import category_tree
+from apps.products.services.category_import import import_categories
+from apps.products.services.category_membership import rebuild_memberships
+from apps.products.services.category_tree import get_tree, reset_tree
+
+
+class CategoryTreeTest(TestCase):
+    """Нащадки на всіх рівнях, предки та використання в CategoryView і Sale"""
+
+    def setUp(self):
+        self.root = Category.objects.create(name='Корінь', slug='root')
+        self.child = Category.objects.create(name='Дочірня', slug='child', parent=self.root)
+        self.grandchild = Category.objects.create(name='Онука', slug='grandchild', parent=self.child)
+        self.hidden = Category.objects.create(name='Прихована', slug='hidden', parent=self.root, is_active=False)
+        self.deep = Product.objects.create(
+            name='Глибокий товар', slug='deep', retail_price=100, stock=5, primary_category=self.grandchild,
+        )
+        Product.objects.create(
+            name='Прихований товар', slug='hidden-product', retail_price=100, stock=5, primary_category=self.hidden,
+        )
+        reset_tree()
+        self.addCleanup(reset_tree)
+        rebuild_memberships()
+
+    def test_tree_indexes(self):
+        # Версія дерева і всі категорії
+        with self.assertNumQueries(2):
+            tree = get_tree()
+            self.assertEqual(tree.descendant_ids(self.root.id), {self.root.id, self.child.id, self.grandchild.id})
+            self.assertEqual([c.slug for c in tree.breadcrumbs(self.grandchild.id)], ['root', 'child', 'grandchild'])
+            self.assertEqual(tree.by_slug('grandchild').parent.parent, tree.get(self.root.id))
+            self.assertEqual([c.slug for c in tree.menu()[0].active_children], ['child'])
+        self.assertEqual(self.root.get_all_children(), [tree.get(self.child.id), tree.get(self.grandchild.id)])
+
+    def test_category_page_and_sale_include_grandchildren(self):
+        response = self.client.get(self.root.get_absolute_url())
+        self.assertEqual([p.slug for p in response.context['products']], ['deep'])
+
+        now = timezone.now()
+        sale = Sale.objects.create(
+            name='Акція', discount_value=Decimal('10'), start_date=now - timedelta(days=1), end_date=now + timedelta(days=1),
+        )
+        sale.categories.add(self.root)
+        self.assertEqual(sale.get_affected_products(), [self.deep])
+
+    def test_rebuilds_after_bulk_import(self):
+        """Пакетний імпорт не шле сигналів і може йти в іншому процесі - версія береться з бази"""
+        Category.objects.filter(pk=self.child.pk).update(external_id='2')
+        tree = get_tree()
+        self.assertIs(get_tree(), tree)
+
+        # Нова категорія
+        import_categories([
+            {'external_id': '2', 'parent_id': None, 'name': 'Дочірня'},
+            {'external_id': '3', 'parent_id': '2', 'name': 'Нова'},
+        ])
+        category_tree._checked_at = 0
+        new = Category.objects.get(external_id='3')
+        self.assertEqual(get_tree().by_slug(new.slug).parent.id, self.child.id)
+        self.assertEqual(self.client.get(new.get_absolute_url()).status_code, 200)
+
+        # Тільки перейменування - кількість категорій та сама
+        import_categories([
+            {'external_id': '2', 'parent_id': None, 'name': 'Перейменована'},
+            {'external_id': '3', 'parent_id': '2', 'name': 'Нова'},
+        ])
+        category_tree._checked_at = 0
+        self.assertEqual(get_tree().get(self.child.id).name, 'Перейменована')
@@ -0,0 +1,63 @@
+"""
+Тести фасетів характеристик на сторінці категорії
+"""
+from django.test import TestCase
+
+from apps.products.models import Category, Product
+from apps.products.services.attributes import write_product_attributes
+from apps.products.services.category_membership import rebuild_memberships
+from apps.products.services.category_tree import reset_tree
+from apps.products.services.facets import facet_index, rebuild_facets
+
+
+class FacetsTest(TestCase):
+    """Значення однієї характеристики - АБО, різних - І; лічильники без сканування ProductAttribute"""
+
+    def setUp(self):
+        self.root = Category.objects.create(name='Корінь', slug='root')
+        self.child = Category.objects.create(name='Дочірня', slug='child', parent=self.root)
+        colors = ['Червоний', 'Чорний', 'Білий']
+        items = []
+        for index in range(6):
+            product = Product.objects.create(
+                name=f'Товар {index}', slug=f'product-{index}', retail_price=100 + index, stock=3,
+                primary_category=self.child if index < 4 else self.root,
+            )
+            items.append((product, [
+                ('Колір', colors[index % 3]),
+                ('Потужність', '1 кВт' if index % 2 else '2 кВт'),
+                ('Країна', 'Україна'),
+            ]))
+        write_product_attributes(items)
+        reset_tree()
+        self.addCleanup(reset_tree)
+        rebuild_memberships()
+        rebuild_facets()
+
+    def test_index_covers_descendants(self):
+        index = facet_index(self.root)
+        # "Країна" однакова для всіх товарів - не фільтр
+        self.assertEqual([name for name, _ in index.names], ['Колір', 'Потужність'])
+        self.assertEqual(len(index.select({'Колір': ['Червоний', 'Чорний']})), 4)
+        self.assertEqual(len(index.select({'Колір': ['Червоний'], 'Потужність': ['2 кВт']})), 1)
+        self.assertEqual(index.select({'Невідома': ['x']}), set())
+
+        groups = {group['name']: group for group in index.groups({'Колір': ['Червоний']})}
+        # Лічильники кольорів не звужуються власним вибором, потужності - звужуються
+        self.assertEqual([item['count'] for item in groups['Колір']['values']], [2, 2, 2])
+        self.assertEqual({item['value']: item['count'] for item in groups['Потужність']['values']}, {'1 кВт': 1, '2 кВт': 1})
+
+    def test_category_page_filters_by_attributes(self):
+        url = self.root.get_absolute_url()
+        response = self.client.get(url, {'attr': ['Колір=Червоний', 'Колір=Білий', 'Потужність=2 кВт']})
+        self.assertEqual({p.slug for p in response.context['products']}, {'product-0', 'product-2'})
+        self.assertTrue(response.context['is_filtered'])
+
+        response = self.client.get(url, {'attr': 'Колір=Червоний', 'sub': 'child'})
+        self.assertEqual({p.slug for p in response.context['products']}, {'product-0', 'product-3'})
+        groups = {group['name']: group for group in response.context['facet_groups']}
+        self.assertEqual({item['value']: item['count'] for item in groups['Колір']['values']},
+                         {'Червоний': 2, 'Чорний': 1, 'Білий': 1})
+
+        response = self.client.get(url, {'attr': 'Колір=Зелений'})
+        self.assertEqual(response.context['paginator'].count, 0)
@@ -0,0 +1,102 @@
+"""
+Тести завантаження фіду з кешем та умовними запитами
+"""
+import os
+import shutil
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from django.test import SimpleTestCase
+
+from apps.products.utils.feed_fetcher import FeedFetcher
+
+
+FEED_BODY = b'<yml_catalog><shop><offers></offers></shop></yml_catalog>'
+
+
+class StubFeedHandler(BaseHTTPRequestHandler):
+    """Віддає фід з ETag і відповідає 304 на умовний запит"""
+
+    requests_log = []
+
+    def do_GET(self):
+        self.requests_log.append(dict(self.headers))
+        if self.headers.get('If-None-Match') == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('ETag', '"v1"')
+        self.send_header('Content-Length', str(len(FEED_BODY)))
+        self.end_headers()
+        self.wfile.write(FEED_BODY)
+
+    def log_message(self, *args):
+        pass
+
+
+class FeedFetcherTest(SimpleTestCase):
+    """Тести FeedFetcher"""
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir, True)
+
+    def test_local_file_processed_once(self):
+        """Локальний файл: повторна обробка тієї ж версії пропускається"""
+        feed_path = os.path.join(self.cache_dir, 'feed.xml')
+        with open(feed_path, 'wb') as feed_file:
+            feed_file.write(FEED_BODY)
+
+        payload = FeedFetcher(feed_path, cache_dir=self.cache_dir).fetch()
+        self.assertEqual(payload.path, feed_path)
+        self.assertFalse(payload.is_processed('sync_products'))
+        payload.mark_processed('sync_products')
+
+        payload = FeedFetcher(feed_path, cache_dir=self.cache_dir).fetch()
+        self.assertTrue(payload.is_processed('sync_products'))
+        self.assertFalse(payload.is_processed('import_products'))
+
+        with open(feed_path, 'ab') as feed_file:
+            feed_file.write(b'\n')
+        payload = FeedFetcher(feed_path, cache_dir=self.cache_dir).fetch()
+        self.assertFalse(payload.is_processed('sync_products'))
+
+    def test_http_conditional_request(self):
+        """HTTP: другий запит умовний, 304 повертає файл з кешу"""
+        StubFeedHandler.requests_log = []
+        server = HTTPServer(('127.0.0.1', 0), StubFeedHandler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        url = f'http://127.0.0.1:{server.server_port}/feed.xml'
+
+        payload = FeedFetcher(url, cache_dir=self.cache_dir).fetch()
+        self.assertFalse(payload.not_modified)
+        with open(payload.path, 'rb') as feed_file:
+            self.assertEqual(feed_file.read(), FEED_BODY)
+        payload.mark_processed('sync_products')
+
+        payload = FeedFetcher(url, cache_dir=self.cache_dir).fetch()
+        self.assertTrue(payload.not_modified)
+        self.assertTrue(payload.is_processed('sync_products'))
+        self.assertEqual(StubFeedHandler.requests_log[-1].get('If-None-Match'), '"v1"')
+
+    def test_concurrent_consumers_keep_their_markers(self):
+        """Дві команди з тим самим фідом не затирають позначки одна одної"""
+        feed_path = os.path.join(self.cache_dir, 'feed.xml')
+        with open(feed_path, 'wb') as feed_file:
+            feed_file.write(FEED_BODY)
+
+        # Обидві завантажили фід до того, як будь-яка з них закінчила
+        sync_payload = FeedFetcher(feed_path, cache_dir=self.cache_dir).fetch()
+        import_payload = FeedFetcher(feed_path, cache_dir=self.cache_dir).fetch()
+        sync_payload.mark_processed('sync_products')
+        import_payload.mark_processed('import_products')
+        # Повторне завантаження перезаписує метадані, але не позначки
+        payload = FeedFetcher(feed_path, cache_dir=self.cache_dir).fetch()
+
+        self.assertTrue(payload.is_processed('sync_products'))
+        self.assertTrue(payload.is_processed('import_products'))
@@ -0,0 +1,94 @@
+"""
+Тести потокового читання XML фіду
+"""
+import os
+import tempfile
+from django.test import SimpleTestCase
+from apps.products.utils.feed_reader import SupplierFeed, iter_batches
+
+
+FEED_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<yml_catalog date="2025-01-01 00:00">
+  <shop>
+    <categories>
+      <category id="1">Іграшки</category>
+      <category id="2" parentId="1">Вібратори</category>
+      <category id="3"></category>
+    </categories>
+    <offers>
+      <offer id="100" available="true">
+        <vendorCode> A-100 </vendorCode>
+        <price>499.00</price>
+        <name>Товар 1</name>
+        <description>&lt;p&gt;Опис&lt;/p&gt;</description>
+        <categoryId>2</categoryId>
+        <vendor>Brand</vendor>
+        <picture>https://example.com/1.jpg</picture>
+        <picture>https://example.com/2.jpg</picture>
+        <param name="Колір">Червоний</param>
+        <param name="Матеріал"></param>
+      </offer>
+      <offer id="101" available="false">
+        <vendorCode>A-101</vendorCode>
+        <price>100</price>
+        <name>Товар 2</name>
+      </offer>
+    </offers>
+  </shop>
+</yml_catalog>
+"""
+
+
+class SupplierFeedTest(SimpleTestCase):
+    """Тести SupplierFeed"""
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix='.xml')
+        with os.fdopen(fd, 'w', encoding='utf-8') as feed_file:
+            feed_file.write(FEED_XML)
+        self.feed = SupplierFeed(self.path)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_iter_categories(self):
+        """Категорії без назви пропускаються"""
+        categories = list(self.feed.iter_categories())
+        self.assertEqual(categories, [
+            {'external_id': '1', 'parent_id': None, 'name': 'Іграшки'},
+            {'external_id': '2', 'parent_id': '1', 'name': 'Вібратори'},
+        ])
+
+    def test_iter_offers(self):
+        """Товари розбираються в словники по одному"""
+        offers = list(self.feed.iter_offers())
+        self.assertEqual(len(offers), 2)
+
+        first = offers[0]
+        self.assertEqual(first['vendor_code'], 'A-100')
+        self.assertTrue(first['available'])
+        self.assertEqual(first['price'], '499.00')
+        self.assertEqual(first['description'], '<p>Опис</p>')
+        self.assertEqual(first['category_id'], '2')
+        self.assertEqual(first['params'], [('Колір', 'Червоний')])
+        self.assertEqual(first['pictures'], ['https://example.com/1.jpg', 'https://example.com/2.jpg'])
+
+        second = offers[1]
+        self.assertFalse(second['available'])
+        self.assertEqual(second['pictures'], [])
+        self.assertEqual(second['params'], [])
+
+    def test_iter_batches(self):
+        """Ітератор розбивається на пакети"""
+        self.assertEqual(list(iter_batches(range(5), 2)), [[0, 1], [2, 3], [4]])
+
+    def test_iter_offers_shards(self):
+        """Частини не перетинаються і разом дають весь фід"""
+        all_codes = [offer['vendor_code'] for offer in self.feed.iter_offers()]
+        for shards in (2, 3):
+            sharded = [
+                offer['vendor_code']
+                for shard in range(shards)
+                for offer in self.feed.iter_offers(shard=shard, shards=shards)
+            ]
+            self.assertEqual(sorted(sharded), sorted(all_codes))
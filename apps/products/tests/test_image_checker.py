@@ -0,0 +1,68 @@
+"""
+Тести перевірки URL картинок
+"""
+from unittest import mock
+
+from django.test import TestCase
+
+from apps.products.models import Product, ProductImage
+from apps.products.services.image_checker import ImageChecker, check_images
+
+
+class FakeChecker:
+    """Статуси URL без мережі; запам'ятовує перевірені URL"""
+
+    def __init__(self, statuses):
+        self.statuses = statuses
+        self.checked = []
+
+    def check(self, urls):
+        urls = list(dict.fromkeys(urls))
+        self.checked.extend(urls)
+        return {url: (self.statuses.get(url, 200), 1024) for url in urls}
+
+
+class ImageCheckerTest(TestCase):
+    """Тести check_images та ImageChecker"""
+
+    def setUp(self):
+        self.product = Product.objects.create(name='Товар', slug='product', retail_price=100)
+        self.other = Product.objects.create(name='Інший', slug='other', retail_price=100)
+
+    def add_image(self, product, url, sort_order=0, is_main=False):
+        return ProductImage.objects.create(
+            product=product, image_url=url, sort_order=sort_order, is_main=is_main,
+        )
+
+    def test_broken_main_falls_back_to_working_image(self):
+        """Бита головна картинка поступається першій робочій; однакові URL перевіряються раз"""
+        main = self.add_image(self.product, 'https://img.test/dead.jpg', 0, is_main=True)
+        second = self.add_image(self.product, 'https://img.test/ok.jpg', 1)
+        shared = self.add_image(self.other, 'https://img.test/ok.jpg', 0, is_main=True)
+        checker = FakeChecker({'https://img.test/dead.jpg': 404})
+
+        stats, changed = check_images(ProductImage.objects.all(), checker)
+
+        self.assertEqual(checker.checked, ['https://img.test/dead.jpg', 'https://img.test/ok.jpg'])
+        self.assertEqual(stats['broken'], 1)
+        self.assertEqual(changed, {self.product.id})
+        main.refresh_from_db()
+        second.refresh_from_db()
+        shared.refresh_from_db()
+        self.assertTrue(main.is_broken)
+        self.assertFalse(main.is_main)
+        self.assertEqual(main.check_status, 404)
+        self.assertTrue(second.is_main)
+        self.assertEqual(second.content_length, 1024)
+        self.assertTrue(shared.is_main)
+
+    def test_head_not_allowed_falls_back_to_get(self):
+        """Сервер без HEAD перевіряється GET без читання тіла"""
+        checker = ImageChecker(workers=2, per_host=1)
+        head = mock.Mock(status_code=405, headers={})
+        get = mock.Mock(status_code=200, headers={'Content-Length': '2048'})
+        with mock.patch.object(checker.session, 'head', return_value=head), \
+                mock.patch.object(checker.session, 'get', return_value=get) as get_mock:
+            self.assertEqual(checker.check(['https://img.test/a.jpg']), {'https://img.test/a.jpg': (200, 2048)})
+        self.assertTrue(get_mock.call_args.kwargs['stream'])
+        get.close.assert_called_once()
@@ -0,0 +1,78 @@
+"""
+Тести проксі картинок постачальника (копія у сховищі при першому запиті)
+"""
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+
+from apps.products.models import Product, ProductImage
+
+
+def fake_response(data, content_type='image/jpeg'):
+    response = mock.MagicMock(headers={'Content-Type': content_type}, raw=BytesIO(data))
+    response.__enter__.return_value = response
+    response.raw.read = lambda amount, decode_content: data[:amount]
+    return response
+
+
+class ImageProxyTest(TestCase):
+    """Тести image_proxy_view"""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(IMAGE_PROXY_ENABLED=True, MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.product = Product.objects.create(name='Товар', slug='product', retail_price=100)
+        self.image = ProductImage.objects.create(product=self.product, image_url='https://img.test/a.jpg', is_main=True)
+
+    def test_disabled_by_default(self):
+        with override_settings(IMAGE_PROXY_ENABLED=False):
+            self.assertEqual(self.image.get_image_url(), 'https://img.test/a.jpg')
+
+    def test_first_request_copies_to_storage(self):
+        """Перший запит копіює картинку у сховище; далі сторінки посилаються на копію"""
+        url = self.image.get_image_url()
+        self.assertTrue(url.startswith('/products/img/'))
+        with mock.patch('requests.get', return_value=fake_response(b'jpeg-bytes')) as get:
+            first = self.client.get(url)
+            second = self.client.get(url)
+        self.assertEqual(get.call_count, 1)
+
+        self.image.refresh_from_db()
+        stored_url = self.image.get_image_url()
+        self.assertTrue(stored_url.startswith('/media/products/proxy/'))
+        self.assertRedirects(first, stored_url, fetch_redirect_response=False)
+        self.assertRedirects(second, stored_url, fetch_redirect_response=False)
+        with self.image.image.open('rb') as stored:
+            self.assertEqual(stored.read(), b'jpeg-bytes')
+        # Картка товару теж посилається прямо на сховище
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.main_image_url, stored_url)
+
+        # Новий URL постачальника - стара копія більше не показується і видаляється
+        stored_name = self.image.image.name
+        self.assertTrue(default_storage.exists(stored_name))
+        self.image.image_url = 'https://img.test/new.jpg'
+        self.image.save()
+        self.assertFalse(self.image.image)
+        self.assertFalse(default_storage.exists(stored_name))
+        self.assertTrue(self.image.get_image_url().startswith('/products/img/'))
+
+    def test_changed_url_and_unsupported_type(self):
+        """Стара версія веде на нову адресу; SVG не проксується"""
+        old_url = self.image.get_proxy_url()
+        self.image.image_url = 'https://img.test/b.svg'
+        self.image.save()
+        self.assertRedirects(self.client.get(old_url), self.image.get_proxy_url(), fetch_redirect_response=False)
+
+        with mock.patch('requests.get', return_value=fake_response(b'<svg/>', 'image/svg+xml')):
+            response = self.client.get(self.image.get_proxy_url())
+        self.assertRedirects(response, 'https://img.test/b.svg', fetch_redirect_response=False)
+        self.image.refresh_from_db()
+        self.assertFalse(self.image.image)
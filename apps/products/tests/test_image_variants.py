@@ -0,0 +1,74 @@
+"""
+Тести зменшених копій картинок
+"""
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from apps.products.models import Product, ProductImage
+from apps.products.services.image_variants import generate_pending_variants
+
+
+def make_png(width, height):
+    buffer = BytesIO()
+    Image.new('RGBA', (width, height), (200, 30, 30, 128)).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+class ImageVariantsTest(TestCase):
+    """Тести generate_pending_variants та URL копій"""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root, MEDIA_URL='/media/')
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.product = Product.objects.create(name='Товар', slug='product', retail_price=100)
+
+    def add_image(self, width, height):
+        return ProductImage.objects.create(
+            product=self.product, is_main=True,
+            image=SimpleUploadedFile('photo.png', make_png(width, height), content_type='image/png'),
+        )
+
+    def test_variants_are_generated_once(self):
+        """Копії не більші за оригінал, записуються в сховище і не перестворюються"""
+        image = self.add_image(500, 250)
+
+        stats = generate_pending_variants(workers=1)
+        self.assertEqual((stats['generated'], stats['failed']), (1, 0))
+
+        image.refresh_from_db()
+        self.assertEqual(sorted(image.variants), ['card', 'detail', 'thumb'])
+        self.assertEqual((image.variants['card']['width'], image.variants['card']['height']), (300, 150))
+        # Оригінал менший за 800 - найбільша копія має його розмір
+        self.assertEqual(image.variants['detail']['width'], 500)
+        self.assertTrue(image.get_image_url('card').endswith('/card.jpeg'))
+        self.assertEqual(
+            image.get_srcset('webp', 'card'),
+            f"/media/products/variants/{image.id}/thumb.webp 80w, /media/products/variants/{image.id}/card.webp 300w",
+        )
+        self.assertEqual(generate_pending_variants(workers=1)['pending'], 0)
+
+    def test_small_original_and_template_fallback(self):
+        """Маленька картинка: великі розміри беруть найбільшу копію; без копій - оригінал"""
+        image = self.add_image(120, 120)
+        template = Template("{% load image_tags %}{% product_picture image 'card' alt='Фото' %}")
+
+        html = template.render(Context({'image': image}))
+        self.assertNotIn('<source', html)
+        self.assertIn(f'src="{image.image.url}"', html)
+
+        generate_pending_variants(workers=1)
+        image.refresh_from_db()
+        self.assertEqual(sorted(image.variants), ['card', 'thumb'])
+        self.assertEqual(image.get_image_url('detail'), image.get_image_url('card'))
+        html = template.render(Context({'image': image}))
+        self.assertIn('<source type="image/webp"', html)
+        self.assertIn('card.jpeg 120w', html)
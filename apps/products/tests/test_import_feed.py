@@ -0,0 +1,156 @@
+"""
+Тести повного імпорту з фіду (import_feed)
+"""
+import os
+import shutil
+import tempfile
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+
+from apps.products.management.commands import import_feed
+from apps.products.models import Category, Product
+from apps.products.utils.feed_reader import SupplierFeed
+
+
+FEED_XML = '''<?xml version="1.0" encoding="UTF-8"?>
+<yml_catalog date="2025-01-01 00:00">
+  <shop>
+    <categories>
+      <category id="1">Інструменти</category>
+      <category id="2" parentId="1">Дрилі</category>
+    </categories>
+    <offers>
+      <offer id="100" available="true">
+        <vendorCode>OLD-1</vendorCode>
+        <name>Дриль нова назва</name>
+        <price>1500</price>
+        <categoryId>2</categoryId>
+        <param name="Потужність">800 Вт</param>
+      </offer>
+      <offer id="101" available="false">
+        <vendorCode>NEW-1</vendorCode>
+        <name>Шуруповерт</name>
+        <price>999.90</price>
+        <categoryId>2</categoryId>
+        <param name="Потужність">500 Вт</param>
+      </offer>
+    </offers>
+  </shop>
+</yml_catalog>
+'''
+
+
+class ImportFeedTest(TestCase):
+    """Категорії, нові та існуючі товари - за одне завантаження і один розбір"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir, True)
+        settings_override = override_settings(FEED_CACHE_DIR=os.path.join(self.tmp_dir, 'cache'))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.feed_path = os.path.join(self.tmp_dir, 'feed.xml')
+        with open(self.feed_path, 'w', encoding='utf-8') as feed_file:
+            feed_file.write(FEED_XML)
+        self.url = f'file://{self.feed_path}'
+        self.existing = Product.objects.create(
+            name='Дриль', slug='dryl', external_id='OLD-1', retail_price=1000, stock=0,
+        )
+
+    def run_command(self, **options):
+        out = StringIO()
+        call_command('import_feed', url=self.url, skip_images=True, stdout=out, **options)
+        return out.getvalue()
+
+    def test_full_import_in_one_pass(self):
+        with mock.patch.object(import_feed, 'fetch_feed', wraps=import_feed.fetch_feed) as fetch, \
+                mock.patch.object(SupplierFeed, 'iter_offers', autospec=True,
+                                  side_effect=SupplierFeed.iter_offers) as iter_offers:
+            output = self.run_command()
+
+        self.assertEqual(fetch.call_count, 1)
+        self.assertEqual(iter_offers.call_count, 1)
+
+        drills = Category.objects.get(external_id='2')
+        self.assertEqual(drills.parent, Category.objects.get(external_id='1'))
+
+        # Новий товар створено, існуючий оновлено тим самим проходом
+        created = Product.objects.get(external_id='NEW-1')
+        self.assertEqual(created.retail_price, Decimal('999.90'))
+        self.assertEqual(created.primary_category, drills)
+        self.existing.refresh_from_db()
+        self.assertEqual(self.existing.name, 'Дриль нова назва')
+        self.assertEqual(self.existing.retail_price, Decimal('1500'))
+        self.assertEqual(self.existing.stock, 5)
+        self.assertTrue(drills.products.filter(pk=self.existing.pk).exists())
+        self.assertEqual(
+            [(attr.name.name, attr.value.value) for attr in self.existing.attributes.select_related('name', 'value')],
+            [('Потужність', '800 Вт')],
+        )
+
+        self.assertIn('Створено нових товарів: 1', output)
+        self.assertIn('Оновлено товарів: 1', output)
+        self.assertIn('⏱️  Час за етапами:', output)
+        for label in ('Завантаження фіду', 'Категорії', 'Розбір товарів', 'Створення нових товарів'):
+            self.assertIn(f'• {label}:', output)
+
+    def test_unchanged_feed_is_skipped_unless_forced(self):
+        self.run_command()
+        Product.objects.filter(pk=self.existing.pk).update(name='Змінено вручну', feed_hash='')
+
+        self.assertIn('Фід не змінився', self.run_command())
+        self.existing.refresh_from_db()
+        self.assertEqual(self.existing.name, 'Змінено вручну')
+
+        output = self.run_command(force=True)
+        self.assertIn('ІМПОРТ ЗАВЕРШЕНО', output)
+        self.existing.refresh_from_db()
+        self.assertEqual(self.existing.name, 'Дриль нова назва')
+
+    def test_failure_raises_and_does_not_mark_processed(self):
+        with open(self.feed_path, 'w', encoding='utf-8') as feed_file:
+            feed_file.write('<yml_catalog><shop><categories><category id="1">Інструменти')
+
+        with self.assertRaises(CommandError):
+            self.run_command()
+
+        with open(self.feed_path, 'w', encoding='utf-8') as feed_file:
+            feed_file.write(FEED_XML)
+        self.assertIn('ІМПОРТ ЗАВЕРШЕНО', self.run_command())
+
+    def test_partial_errors_do_not_mark_processed(self):
+        # Ціна не вміщається в DecimalField(max_digits=10) - товар не записується
+        with open(self.feed_path, 'w', encoding='utf-8') as feed_file:
+            feed_file.write(FEED_XML.replace('<price>1500</price>', '<price>123456789012</price>'))
+
+        output = self.run_command()
+        self.assertIn('Помилок: 1', output)
+        self.assertIn('фід не позначено обробленим', output)
+        self.assertTrue(Product.objects.filter(external_id='NEW-1').exists())
+
+        # Той самий фід обробляється знову, а не пропускається
+        self.assertNotIn('Фід не змінився', self.run_command())
+
+    def test_bad_new_offer_costs_one_product(self):
+        bad_offer = """
+      <offer id="102" available="true">
+        <vendorCode>NEW-BAD</vendorCode>
+        <name>Завелика ціна</name>
+        <price>123456789012</price>
+        <categoryId>2</categoryId>
+      </offer>
+    </offers>"""
+        with open(self.feed_path, 'w', encoding='utf-8') as feed_file:
+            feed_file.write(FEED_XML.replace('</offers>', bad_offer))
+
+        output = self.run_command()
+        self.assertIn('Створено нових товарів: 1', output)
+        self.assertIn('Помилок: 1', output)
+        self.assertTrue(Product.objects.filter(external_id='NEW-1').exists())
+        self.assertFalse(Product.objects.filter(external_id='NEW-BAD').exists())
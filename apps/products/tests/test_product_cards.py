@@ -0,0 +1,96 @@
+"""
+Тести денормалізованих даних картки товару
+"""
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.template.loader import render_to_string
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from apps.products.models import Category, Product, ProductImage
+from apps.products.services.category_membership import rebuild_memberships
+from apps.products.services.category_tree import reset_tree
+from apps.products.services.product_cards import CARD_FIELDS, refresh_cards, render_cards
+
+
+class ProductCardsTest(TestCase):
+    """Картка не робить запитів до картинок і категорій"""
+
+    def setUp(self):
+        self.category = Category.objects.create(name='Категорія', slug='kategoriia')
+        self.extra = Category.objects.create(name='Друга', slug='druha')
+        reset_tree()
+        self.addCleanup(reset_tree)
+
+    def add_products(self, count):
+        products = []
+        for index in range(count):
+            product = Product.objects.create(
+                name=f'Товар {index}', slug=f'tovar-{len(products)}-{Product.objects.count()}',
+                retail_price=100, stock=2, primary_category=self.category,
+            )
+            product.categories.add(self.category, self.extra)
+            ProductImage.objects.create(product=product, image_url=f'http://x/{product.id}-0.jpg', sort_order=0)
+            ProductImage.objects.create(product=product, image_url=f'http://x/{product.id}-1.jpg', is_main=True, sort_order=1)
+            products.append(product)
+        refresh_cards(product.id for product in products)
+        rebuild_memberships()
+        return products
+
+    def page_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.category.get_absolute_url())
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response
+
+    def test_card_fields(self):
+        product = self.add_products(1)[0]
+        product.refresh_from_db()
+        main = product.images.get(is_main=True)
+        self.assertEqual(product.main_image_url, main.get_image_url('card'))
+        self.assertEqual(product.thumbnail_url, main.get_image_url('thumb'))
+        self.assertEqual(product.card_category_slugs, 'druha,kategoriia')
+
+        # Бита головна картинка в картці не показується
+        main.is_broken = True
+        main.save()
+        refresh_cards([product.id])
+        product.refresh_from_db()
+        self.assertEqual(product.main_image_url, product.images.get(is_main=False).get_image_url('card'))
+
+    def test_category_page_queries_do_not_depend_on_cards(self):
+        self.add_products(3)
+        # Перший запит будує дерево категорій і сесію
+        self.client.get(self.category.get_absolute_url())
+        small, response = self.page_queries()
+        self.assertContains(response, 'data-categories="druha,kategoriia"', count=3)
+
+        self.add_products(12)
+        large, response = self.page_queries()
+        self.assertEqual(len(response.context['products']), 15)
+        self.assertEqual(small, large)
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_rendered_cards_are_cached_by_version(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        ids = [product.id for product in self.add_products(2)]
+
+        def render():
+            products = Product.objects.filter(id__in=ids).only(*CARD_FIELDS).order_by('id')
+            with mock.patch('apps.products.services.product_cards.render_to_string', wraps=render_to_string) as rendered:
+                return render_cards(products), rendered.call_count
+
+        first, count = render()
+        self.assertEqual(count, 2)
+        self.assertIn('data-categories="druha,kategoriia"', first[0])
+        self.assertEqual(render(), (first, 0))
+
+        # Зміна ціни - нова версія, перерендерюється тільки ця картка
+        Product.objects.filter(id=ids[0]).update(retail_price=250)
+        updated, count = render()
+        self.assertEqual(count, 1)
+        self.assertIn('250', updated[0])
+        self.assertEqual(updated[1], first[1])
@@ -0,0 +1,108 @@
+"""
+Тести пакетного створення товарів
+"""
+from django.test import TestCase
+
+from apps.products.models import Category, Product, ProductAttribute, ProductImage
+from apps.products.services.allocator import product_allocators
+from apps.products.services.attributes import AttributeDictionary
+from apps.products.services.product_import import create_products, create_products_isolated
+from apps.products.tests.test_sync_engine import make_offer
+from apps.products.utils.image_downloader import add_product_images
+from apps.products.utils.query_counter import QueryCounter
+
+
+class CreateProductsTest(TestCase):
+    """Тести create_products та аллокаторів slug/SKU"""
+
+    def setUp(self):
+        self.category = Category.objects.create(name='Категорія', slug='kategoriia', external_id='1')
+        self.categories_index = {'1': self.category}
+        # Товар з адмінки: slug і SKU вже зайняті
+        self.manual = Product.objects.create(name='Same name', retail_price=10)
+        # Словник характеристик - один на запуск, як у командах імпорту
+        self.attributes = AttributeDictionary()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.attributes.resolve([('Колір', 'Червоний')])
+
+    def create(self, count):
+        slugs, skus = product_allocators()
+        offers = [
+            make_offer(f'N{idx}', name='Same name', params=[('Колір', 'Червоний')], pictures=['http://x/1.jpg'])
+            for idx in range(count)
+        ]
+        with QueryCounter() as counter:
+            created, skipped = create_products(offers, self.categories_index, slugs, skus, self.attributes)
+        self.assertEqual((created, skipped), (count, 0))
+        return counter.count
+
+    def test_bulk_create_unique_slugs_and_skus(self):
+        """Нові товари отримують унікальні slug/SKU без запиту на кожен товар"""
+        small = self.create(2)
+        Product.objects.exclude(pk=self.manual.pk).delete()
+        large = self.create(20)
+
+        self.assertEqual(small, large)
+        products = Product.objects.exclude(pk=self.manual.pk)
+        slugs = set(products.values_list('slug', flat=True))
+        skus = set(products.values_list('sku', flat=True))
+        self.assertEqual(len(slugs), 20)
+        self.assertEqual(len(skus), 20)
+        self.assertNotIn(self.manual.slug, slugs)
+        self.assertNotIn(self.manual.sku, skus)
+        self.assertEqual(self.category.products.count(), 20)
+        self.assertEqual(ProductAttribute.objects.count(), 20)
+        self.assertEqual(ProductImage.objects.filter(is_main=True).count(), 20)
+        self.assertFalse(products.filter(attributes_hash='').exists())
+
+    def test_bad_offer_does_not_abort_batch(self):
+        """Поганий товар пропускається, решта пакету створюється"""
+        slugs, skus = product_allocators()
+        offers = [
+            # Нова характеристика: її id з відкоченого пакету не мають лишитись у словнику
+            make_offer(f'N{idx}', params=[('Розмір', 'XL')], pictures=[f'http://x/{idx}.jpg'])
+            for idx in range(5)
+        ]
+        # Ціна не вміщається в DecimalField(max_digits=10)
+        offers[2]['price'] = '123456789012'
+        offers.append(make_offer('N0'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            result = create_products_isolated(offers, self.categories_index, slugs, skus, self.attributes)
+
+        self.assertEqual(result, (4, 0, 1))
+        created = Product.objects.exclude(pk=self.manual.pk)
+        self.assertEqual(sorted(created.values_list('external_id', flat=True)), ['N0', 'N1', 'N3', 'N4'])
+        self.assertEqual(ProductImage.objects.count(), 4)
+        self.assertEqual(
+            set(ProductAttribute.objects.values_list('name__name', 'value__value')), {('Розмір', 'XL')},
+        )
+        self.assertEqual(ProductAttribute.objects.count(), 4)
+
+    def test_admin_save_still_generates_sku(self):
+        """Product.save() для ручного створення працює як раніше"""
+        self.create(3)
+        product = Product.objects.create(name='Ручний товар', retail_price=5)
+        self.assertEqual(product.sku, f'BS{product.id:05d}')
+
+
+class AddProductImagesTest(TestCase):
+    """Тести пакетного додавання картинок"""
+
+    def test_skips_products_with_images_in_constant_queries(self):
+        """Один запит перевірки на пакет, один bulk_create і оновлення карток (4 запити)"""
+        products = [Product.objects.create(name=f'Товар {idx}', retail_price=10) for idx in range(6)]
+        ProductImage.objects.create(product=products[0], image_url='http://x/old.jpg', is_main=True)
+        pictures = {product.id: ['http://x/1.jpg', 'http://x/1.jpg', '', 'http://x/2.jpg'] for product in products}
+
+        with self.assertNumQueries(6):
+            added = add_product_images(pictures)
+
+        self.assertEqual(added, {product.id: 2 for product in products[1:]})
+        self.assertEqual(list(products[0].images.values_list('image_url', flat=True)), ['http://x/old.jpg'])
+        self.assertEqual(
+            list(products[1].images.order_by('sort_order').values_list('image_url', 'is_main')),
+            [('http://x/1.jpg', True), ('http://x/2.jpg', False)],
+        )
+        products[1].refresh_from_db()
+        self.assertEqual(products[1].main_image_url, products[1].images.get(is_main=True).get_image_url('card'))
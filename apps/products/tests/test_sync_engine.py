@@ -0,0 +1,145 @@
+"""
+Тести пакетної синхронізації товарів
+"""
+from decimal import Decimal
+from django.test import TestCase
+from apps.products.models import AttributeName, AttributeValue, Category, Product, ProductAttribute
+from apps.products.services.attributes import AttributeDictionary
+from apps.products.services.sync_engine import ProductSyncEngine
+
+
+def make_offer(vendor_code, **overrides):
+    offer = {
+        'vendor_code': vendor_code,
+        'available': True,
+        'price': '100',
+        'name': f'Товар {vendor_code}',
+        'description': '',
+        'category_id': '1',
+        'vendor': '',
+        'params': [],
+        'pictures': [],
+    }
+    offer.update(overrides)
+    return offer
+
+
+class ProductSyncEngineTest(TestCase):
+    """Тести ProductSyncEngine"""
+
+    def setUp(self):
+        self.category = Category.objects.create(name='Категорія', slug='kategoriia', external_id='1')
+        self.products = [
+            Product.objects.create(
+                name=f'Товар A{idx}',
+                slug=f'tovar-a{idx}',
+                external_id=f'A{idx}',
+                retail_price=100,
+                stock=5,
+                primary_category=self.category,
+            )
+            for idx in range(10)
+        ]
+        self.engine = ProductSyncEngine(
+            categories_index={'1': self.category},
+            skip_images=True,
+        )
+
+    def test_updates_only_changed_products(self):
+        """Змінюються тільки товари з новими даними"""
+        offers = [make_offer(f'A{idx}') for idx in range(10)]
+        offers[3]['price'] = '150.50'
+        offers[7]['available'] = False
+        offers.append(make_offer('UNKNOWN'))
+
+        stats = self.engine.process_batch(offers)
+
+        self.assertEqual(stats['updated'], 2)
+        self.assertEqual(stats['missing'], 1)
+        self.assertEqual(Product.objects.get(external_id='A3').retail_price, Decimal('150.50'))
+        self.assertEqual(Product.objects.get(external_id='A7').stock, 0)
+        self.assertEqual(self.category.products.count(), 10)
+
+    def test_query_count_does_not_depend_on_batch_size(self):
+        """Кількість запитів на пакет не залежить від кількості товарів"""
+        # Словник характеристик завантажується один раз за запуск, не в кожному пакеті
+        AttributeName.objects.create(name='Колір')
+        AttributeValue.objects.create(value='Червоний')
+        self.engine.attributes = AttributeDictionary()
+        offers = [
+            make_offer(f'A{idx}', price='200', params=[('Колір', 'Червоний')])
+            for idx in range(10)
+        ]
+
+        stats = self.engine.process_batch(offers)
+
+        self.assertEqual(stats['updated'], 10)
+        self.assertLessEqual(stats['queries'], 10)
+        self.assertEqual(ProductAttribute.objects.count(), 10)
+
+    def test_unchanged_offers_are_skipped(self):
+        """Повторна синхронізація того ж фіду пропускає товари за відбитком"""
+        offers = [make_offer(f'A{idx}') for idx in range(10)]
+        self.engine.process_batch(offers)
+
+        stats = self.engine.process_batch([make_offer(f'A{idx}') for idx in range(10)])
+        self.assertEqual(stats['unchanged'], 10)
+        self.assertEqual(stats.get('changed', 0), 0)
+
+        forced = ProductSyncEngine(categories_index={'1': self.category}, skip_images=True, force=True)
+        stats = forced.process_batch([make_offer(f'A{idx}') for idx in range(10)])
+        self.assertEqual(stats['changed'], 10)
+        self.assertEqual(stats.get('updated', 0), 0)
+
+    def test_attribute_strings_are_interned(self):
+        """Назви та значення зберігаються один раз, товари посилаються на них за id"""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.engine.process_batch([
+                make_offer(f'A{idx}', params=[('Колір', 'Червоний' if idx % 2 else 'Чорний'), ('Країна ', 'Україна')])
+                for idx in range(10)
+            ])
+
+        self.assertEqual(AttributeName.objects.count(), 2)
+        self.assertEqual(AttributeValue.objects.count(), 3)
+        self.assertEqual(ProductAttribute.objects.count(), 20)
+        attributes = Product.objects.get(external_id='A1').attributes.select_related('name', 'value')
+        self.assertEqual([(attr.name.name, attr.value.value) for attr in attributes], [('Колір', 'Червоний'), ('Країна', 'Україна')])
+
+        # Відомі рядки більше не запитуються в базі
+        with self.assertNumQueries(0):
+            self.assertEqual(len(self.engine.attributes.resolve([('Колір', 'Чорний')])), 1)
+
+    def test_bad_row_does_not_abort_batch(self):
+        """Рядок, який база не приймає, пропускається, решта пакету записується"""
+        offers = [make_offer(f'A{idx}', price='300') for idx in range(10)]
+        # Не вміщається в DecimalField(max_digits=10)
+        offers[4]['price'] = '123456789012'
+
+        stats = self.engine.process_batch(offers)
+
+        self.assertEqual(stats['errors'], 1)
+        self.assertEqual(stats['updated'], 9)
+        self.assertEqual(Product.objects.filter(retail_price=300).count(), 9)
+        self.assertEqual(Product.objects.get(external_id='A4').retail_price, 100)
+        self.assertNotIn(self.products[4].id, self.engine.changed_ids)
+        self.assertEqual(len(self.engine.changed_ids), 9)
+
+    def test_offer_with_unknown_category_is_retried(self):
+        """Відбиток не записується, поки категорія товару не знайдена"""
+        offers = [make_offer('A0', category_id='2')]
+        self.engine.process_batch(offers)
+        product = Product.objects.get(external_id='A0')
+        self.assertEqual(product.feed_hash, '')
+
+        # Категорія з'явилась - той самий фід прив'язує товар
+        other = Category.objects.create(name='Інша', slug='insha', external_id='2')
+        engine = ProductSyncEngine(categories_index={'1': self.category, '2': other}, skip_images=True)
+        stats = engine.process_batch([make_offer('A0', category_id='2')])
+        self.assertEqual(stats['changed'], 1)
+        product.refresh_from_db()
+        self.assertEqual(product.primary_category, other)
+        self.assertTrue(other.products.filter(pk=product.pk).exists())
+        self.assertNotEqual(product.feed_hash, '')
+
+        stats = engine.process_batch([make_offer('A0', category_id='2')])
+        self.assertEqual(stats['unchanged'], 1)
@@ -0,0 +1,104 @@
+"""
+Тести черги фонових задач синхронізації
+"""
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.products.models_jobs import SyncJob
+from apps.products.services import sync_jobs
+
+
+@override_settings(CRON_SECRET='test-secret')
+class SyncJobTest(TestCase):
+    """Тести enqueue / claim_next / run_job та endpoint-ів"""
+
+    def test_trigger_enqueues_and_returns_job_id(self):
+        """Endpoint не виконує синхронізацію, а ставить задачу в чергу"""
+        url = reverse('products:trigger_sync')
+        self.assertEqual(self.client.post(url, {'secret': 'wrong'}).status_code, 401)
+
+        response = self.client.post(url, {'secret': 'test-secret'})
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json()['job_id']
+        self.assertEqual(SyncJob.objects.get(pk=job_id).status, SyncJob.STATUS_QUEUED)
+
+        # Повторний тригер поки задача в черзі не створює нову
+        self.assertEqual(self.client.post(url, {'secret': 'test-secret'}).json()['job_id'], job_id)
+
+        status_url = reverse('products:sync_status', kwargs={'job_id': job_id})
+        # Секрет у query string не приймається - він потрапляє в логи доступу
+        self.assertEqual(self.client.get(status_url, {'secret': 'test-secret'}).status_code, 401)
+        status = self.client.get(status_url, HTTP_X_CRON_SECRET='test-secret').json()
+        self.assertEqual(status['status'], 'queued')
+        self.assertIsNone(status['duration'])
+        self.assertEqual(self.client.post(status_url, {'secret': 'test-secret'}).json()['job_id'], job_id)
+
+    def test_only_one_job_runs_at_a_time(self):
+        """Поки одна задача виконується, наступна не береться; завислу задачу знімаємо"""
+        first, _ = sync_jobs.enqueue()
+        self.assertEqual(sync_jobs.claim_next(), first)
+        SyncJob.objects.create()
+        self.assertIsNone(sync_jobs.claim_next())
+
+        SyncJob.objects.filter(pk=first.pk).update(heartbeat_at=timezone.now() - timedelta(hours=1))
+        self.assertIsNotNone(sync_jobs.claim_next())
+        self.assertEqual(SyncJob.objects.get(pk=first.pk).status, SyncJob.STATUS_FAILED)
+
+    def test_run_job_records_stats(self):
+        """Воркер записує статус, вивід і тривалість"""
+        job, _ = sync_jobs.enqueue()
+        job = sync_jobs.claim_next()
+        with mock.patch.dict(sync_jobs.JOB_COMMANDS, {'sync': [('clear_cache', {})]}):
+            sync_jobs.run_job(job)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, SyncJob.STATUS_SUCCESS)
+        self.assertTrue(job.output)
+        self.assertEqual(job.stats, {'clear_cache': {}})
+        self.assertIsNotNone(job.duration)
+
+    def test_warm_cache_needs_shared_cache(self):
+        """Прогрів локального кешу воркера сайту не допомагає - пропускаємо"""
+        output = sync_jobs.JobOutput(SyncJob())
+        names = [name for name, _ in sync_jobs.job_commands('sync', output)]
+        self.assertNotIn('warm_cache', names)
+        self.assertIn('sync_products', names)
+        self.assertIn('REDIS_URL', output.getvalue())
+
+        redis = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://cache'}}
+        with override_settings(CACHES=redis):
+            output = sync_jobs.JobOutput(SyncJob())
+            self.assertEqual(sync_jobs.job_commands('sync', output), sync_jobs.JOB_COMMANDS['sync'])
+            self.assertEqual(output.getvalue(), '')
+
+
+class HeartbeatTest(TransactionTestCase):
+    """Heartbeat пишеться з окремого потоку, навіть коли команда нічого не виводить"""
+
+    def test_quiet_stage_keeps_job_alive(self):
+        old = timezone.now() - timedelta(hours=1)
+        job = SyncJob.objects.create(status=SyncJob.STATUS_RUNNING, heartbeat_at=old)
+        job.progress = 'Перебудова фасетів'
+
+        heartbeat = sync_jobs.Heartbeat(job, interval=0.01)
+        heartbeat.start()
+        try:
+            for _ in range(200):
+                job.refresh_from_db(fields=['heartbeat_at'])
+                if job.heartbeat_at > old:
+                    break
+                heartbeat.stopped.wait(0.01)
+        finally:
+            heartbeat.stop()
+
+        job.refresh_from_db()
+        self.assertGreater(job.heartbeat_at, old)
+        self.assertEqual(job.progress, 'Перебудова фасетів')
+        # Живу задачу claim_next не знімає
+        SyncJob.objects.create()
+        self.assertIsNone(sync_jobs.claim_next())
+        self.assertEqual(SyncJob.objects.get(pk=job.pk).status, SyncJob.STATUS_RUNNING)
@@ -0,0 +1,146 @@
+"""
+Тести паралельної синхронізації частинами (sync_shards)
+"""
+import os
+import shutil
+import tempfile
+from concurrent.futures import Future
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from apps.products.management.commands import sync_products
+from apps.products.models import Category, Product, ProductAttribute
+from apps.products.services import sync_shards
+from apps.products.services.sync_engine import ProductSyncEngine
+from apps.products.utils.feed_reader import SupplierFeed, iter_batches
+
+
+def offer_xml(idx):
+    return f'''
+      <offer id="{idx}" available="{'true' if idx % 3 else 'false'}">
+        <vendorCode>S{idx}</vendorCode>
+        <name>Товар S{idx}</name>
+        <price>{100 + idx}</price>
+        <categoryId>1</categoryId>
+        <param name="Колір">{'Червоний' if idx % 2 else 'Чорний'}</param>
+      </offer>'''
+
+
+FEED_XML = f'''<?xml version="1.0" encoding="UTF-8"?>
+<yml_catalog>
+  <shop>
+    <categories><category id="1">Категорія</category></categories>
+    <offers>{''.join(offer_xml(idx) for idx in range(12))}
+      <offer id="99"><vendorCode>UNKNOWN</vendorCode><name>Немає в базі</name><price>1</price></offer>
+    </offers>
+  </shop>
+</yml_catalog>
+'''
+
+
+SYNCED_FIELDS = ('retail_price', 'stock', 'primary_category', 'attributes_hash', 'feed_hash')
+
+
+class InlineExecutor:
+    """Виконує частини одразу в цьому процесі - з тим самим з'єднанням тестової бази"""
+
+    def __init__(self, max_workers, initializer=None):
+        self.max_workers = max_workers
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+
+class SyncShardsTest(TestCase):
+    """Злиття лічильників і змінених id з частин дає той самий результат, що й один процес"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir, True)
+        self.path = os.path.join(self.tmp_dir, 'feed.xml')
+        with open(self.path, 'w', encoding='utf-8') as feed_file:
+            feed_file.write(FEED_XML)
+
+        self.category = Category.objects.create(name='Категорія', slug='kategoriia', external_id='1')
+        for idx in range(12):
+            Product.objects.create(
+                name=f'Товар S{idx}', slug=f's{idx}', external_id=f'S{idx}',
+                # Половина товарів уже має актуальну ціну
+                retail_price=100 + idx if idx % 2 else 1, stock=5,
+            )
+        self.initial = list(Product.objects.values('id', *SYNCED_FIELDS))
+
+    def reset(self):
+        """Повертає товари до стану до синхронізації"""
+        for values in self.initial:
+            Product.objects.filter(pk=values['id']).update(**values)
+        Product.categories.through.objects.all().delete()
+        ProductAttribute.objects.all().delete()
+
+    def state(self):
+        return (
+            list(Product.objects.order_by('id').values_list('external_id', *SYNCED_FIELDS)),
+            sorted(Product.categories.through.objects.values_list('product_id', 'category_id')),
+            sorted(ProductAttribute.objects.values_list('product_id', 'name_id', 'value_id')),
+        )
+
+    def run_serial(self):
+        engine = ProductSyncEngine(categories_index={'1': self.category}, skip_images=True)
+        processed = 0
+        for batch in iter_batches(SupplierFeed(self.path).iter_offers(), 5):
+            engine.process_batch(batch)
+            processed += len(batch)
+        return dict(engine.totals), processed, engine.changed_ids
+
+    def run_sharded(self, workers):
+        done = []
+        with mock.patch.object(sync_shards, 'ProcessPoolExecutor', InlineExecutor):
+            totals, processed, changed_ids = sync_shards.run_sharded(
+                self.path, workers, 5, {'skip_images': True},
+                on_shard_done=lambda shard, totals, count: done.append(shard),
+            )
+        self.assertEqual(sorted(done), list(range(workers)))
+        return dict(totals), processed, changed_ids
+
+    def test_merged_result_matches_serial(self):
+        serial_totals, serial_processed, serial_changed = self.run_serial()
+        serial_state = self.state()
+        self.assertEqual(serial_processed, 13)
+        self.assertEqual(serial_totals['missing'], 1)
+        self.assertEqual(Product.objects.get(external_id='S0').retail_price, Decimal('100'))
+
+        for workers in (1, 3):
+            self.reset()
+            totals, processed, changed_ids = self.run_sharded(workers)
+            # Кількість запитів залежить від розбиття на пакети - решта збігається
+            totals.pop('queries')
+            self.assertEqual(totals, {key: value for key, value in serial_totals.items() if key != 'queries'})
+            self.assertEqual(processed, serial_processed)
+            self.assertEqual(changed_ids, serial_changed)
+            self.assertEqual(self.state(), serial_state)
+
+    def test_sqlite_and_dry_run_fall_back_to_one_process(self):
+        with override_settings(FEED_CACHE_DIR=os.path.join(self.tmp_dir, 'cache')), \
+                mock.patch.object(sync_products, 'run_sharded') as sharded:
+            out = StringIO()
+            call_command('sync_products', url=self.path, workers=4, dry_run=True, stdout=out)
+            self.assertIn('Пробний запуск', out.getvalue())
+            self.assertEqual(Product.objects.get(external_id='S0').retail_price, Decimal('1'))
+
+            out = StringIO()
+            call_command('sync_products', url=self.path, workers=4, skip_images=True, stdout=out)
+            self.assertIn('SQLite: паралельна обробка недоступна', out.getvalue())
+            sharded.assert_not_called()
+        self.assertEqual(Product.objects.get(external_id='S0').retail_price, Decimal('100'))
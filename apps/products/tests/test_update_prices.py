@@ -0,0 +1,105 @@
+"""
+Тести оновлення цін та наявності з прайсу
+"""
+import json
+import os
+import shutil
+import tempfile
+from decimal import Decimal
+from io import StringIO
+
+import openpyxl
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from apps.products.models import Product
+
+
+ROWS = [
+    ('Артикул', 'Назва', 'Ціна', 'Наявність'),
+    ('P1', 'Товар 1', 150, 3),
+    ('P2', 'Товар 2', 100, 5),
+    ('MISSING', 'Немає в базі', 10, 1),
+]
+
+
+class UpdatePricesTest(TestCase):
+    """Тести команди update_prices_xls"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir, True)
+        settings_override = override_settings(FEED_CACHE_DIR=os.path.join(self.tmp_dir, 'cache'))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        for code in ('P1', 'P2'):
+            Product.objects.create(
+                name=f'Товар {code}', slug=code.lower(), external_id=code, retail_price=100, stock=5,
+            )
+
+    def run_command(self, path):
+        out = StringIO()
+        call_command('update_prices_xls', url=path, stdout=out)
+        return out.getvalue()
+
+    def assert_updated(self, output):
+        self.assertIn('Оновлено товарів: 1', output)
+        self.assertIn('Не знайдено в базі: 1', output)
+        product = Product.objects.get(external_id='P1')
+        self.assertEqual(product.retail_price, Decimal('150'))
+        self.assertEqual(product.stock, 3)
+
+    def write_csv(self):
+        path = os.path.join(self.tmp_dir, 'prices.csv')
+        with open(path, 'w', encoding='utf-8') as price_file:
+            for row in ROWS:
+                price_file.write(';'.join(str(value) for value in row) + '\n')
+        return path
+
+    def test_csv(self):
+        """CSV з крапкою з комою читається так само, як XLSX"""
+        Product.objects.update(feed_hash='abc')
+        self.assert_updated(self.run_command(self.write_csv()))
+        # Змінений прайсом товар наступна синхронізація з фідом не пропустить
+        self.assertEqual(Product.objects.get(external_id='P1').feed_hash, '')
+        self.assertEqual(Product.objects.get(external_id='P2').feed_hash, 'abc')
+
+    def test_xlsx(self):
+        """XLSX читається потоково; повторний запуск того ж файлу пропускається"""
+        workbook = openpyxl.Workbook()
+        for row in ROWS:
+            workbook.active.append(row)
+        path = os.path.join(self.tmp_dir, 'prices.xls')
+        workbook.save(path)
+
+        self.assert_updated(self.run_command(path))
+        self.assertIn('Файл не змінився', self.run_command(path))
+
+    def test_dry_run_report(self):
+        """--dry-run нічого не записує, а --report містить етапи та лічильники"""
+        path = self.write_csv()
+        report_path = os.path.join(self.tmp_dir, 'report.json')
+        call_command('update_prices_xls', url=path, dry_run=True, report=report_path, stdout=StringIO())
+
+        self.assertEqual(Product.objects.get(external_id='P1').retail_price, Decimal('100'))
+        with open(report_path, encoding='utf-8') as report_file:
+            report = json.load(report_file)
+        self.assertTrue(report['dry_run'])
+        self.assertEqual(report['counters']['updated'], 1)
+        self.assertEqual(report['counters']['not_found'], 1)
+        self.assertIn('parse', report['phases'])
+        self.assertEqual(report['phases']['lookup']['queries'], 1)
+
+        # Пробний запуск не позначає файл обробленим
+        self.assert_updated(self.run_command(path))
+
+    def test_report_to_stdout_is_json(self):
+        """--report - займає stdout, прогрес команди йде в stderr"""
+        out, err = StringIO(), StringIO()
+        call_command('update_prices_xls', url=self.write_csv(), report='-', stdout=out, stderr=err)
+
+        report = json.loads(out.getvalue())
+        self.assertEqual(report['command'], 'update_prices_xls')
+        self.assertEqual(report['counters']['updated'], 1)
+        self.assertIn('ОНОВЛЕННЯ ЗАВЕРШЕНО', err.getvalue())
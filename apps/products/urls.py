@@ -7,5 +7,8 @@ urlpatterns = [
     path('category/<slug:slug>/', views.CategoryView.as_view(), name='category'),
     path('product/<slug:slug>/', views.ProductDetailView.as_view(), name='detail'),
     path('sale/', views.SaleProductsView.as_view(), name='sale'),
+    path('img/<int:image_id>/<str:version>/', views.image_proxy_view, name='image_proxy'),
+    path('api/category/<slug:slug>/products/', views.category_products_api, name='category_products_api'),
     path('api/trigger-sync/', views.trigger_sync, name='trigger_sync'),
+    path('api/sync-status/<int:job_id>/', views.sync_status, name='sync_status'),
 ]
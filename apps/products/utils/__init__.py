@@ -1,4 +1,3 @@
-from .image_downloader import download_product_images
-
-__all__ = ['download_product_images']
+from .image_downloader import add_product_images, download_product_images
 
+__all__ = ['add_product_images', 'download_product_images']
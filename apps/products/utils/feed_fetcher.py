@@ -0,0 +1,170 @@
+"""
+Спільне завантаження фідів постачальника з локальним кешем
+
+Останній завантажений файл зберігається на диску разом з валідаторами
+(ETag, Last-Modified) та SHA256 вмістом. Повторне завантаження - умовний
+запит: якщо сервер відповів 304 або хеш не змінився, команда може
+пропустити обробку повністю.
+
+Позначка "оброблено" - окремий файл на кожну команду: команди, що
+працюють одночасно з тим самим фідом, не перезаписують позначки одна одної.
+"""
+import hashlib
+import json
+import os
+import tempfile
+from urllib.parse import urlparse
+
+import requests
+from django.conf import settings
+from django.utils import timezone
+
+
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+
+class FeedPayload:
+    """Завантажений фід: файл на диску та його метадані"""
+
+    def __init__(self, fetcher, path, sha256, not_modified=False):
+        self.fetcher = fetcher
+        self.path = path
+        self.sha256 = sha256
+        self.not_modified = not_modified
+
+    def is_processed(self, consumer):
+        """Чи обробляв consumer саме цю версію фіду"""
+        try:
+            with open(self.fetcher.marker_path(consumer), encoding='utf-8') as marker_file:
+                return marker_file.read().strip() == self.sha256
+        except OSError:
+            return False
+
+    def mark_processed(self, consumer):
+        """Запам'ятовує, що consumer успішно обробив цю версію фіду"""
+        _write_atomic(self.fetcher.marker_path(consumer), self.sha256)
+
+
+class FeedFetcher:
+    """
+    Завантажувач фіду з умовними запитами та кешем на диску
+
+    url може бути HTTP(S) адресою, file:// URL або шляхом до локального
+    файлу (зручно для тестів та ручного імпорту).
+    """
+
+    def __init__(self, url, cache_dir=None, timeout=60):
+        self.url = url
+        self.timeout = timeout
+        self.cache_dir = cache_dir or settings.FEED_CACHE_DIR
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        key = self.key = hashlib.sha1(url.encode('utf-8')).hexdigest()[:16]
+        self.data_path = os.path.join(self.cache_dir, f'{key}.data')
+        self.meta_path = os.path.join(self.cache_dir, f'{key}.json')
+        self.meta = self._load_meta()
+
+    @property
+    def local_path(self):
+        """Шлях до локального файлу, якщо url вказує на файл"""
+        parsed = urlparse(self.url)
+        if parsed.scheme == 'file':
+            return parsed.path
+        if not parsed.scheme or os.path.exists(self.url):
+            return self.url
+        return None
+
+    def fetch(self):
+        """
+        Повертає актуальну версію фіду
+
+        Returns:
+            FeedPayload
+        """
+        if self.local_path:
+            return self._fetch_local(self.local_path)
+        return self._fetch_remote()
+
+    def _fetch_local(self, path):
+        sha256 = self._hash_file(path)
+        self.meta.update({'url': self.url, 'sha256': sha256, 'fetched_at': timezone.now().isoformat()})
+        self.save_meta()
+        return FeedPayload(self, path, sha256)
+
+    def _fetch_remote(self):
+        headers = {}
+        if os.path.exists(self.data_path):
+            if self.meta.get('etag'):
+                headers['If-None-Match'] = self.meta['etag']
+            if self.meta.get('last_modified'):
+                headers['If-Modified-Since'] = self.meta['last_modified']
+
+        with requests.get(self.url, headers=headers, timeout=self.timeout, stream=True) as response:
+            if response.status_code == 304 and os.path.exists(self.data_path):
+                return FeedPayload(self, self.data_path, self.meta.get('sha256'), not_modified=True)
+            response.raise_for_status()
+
+            # Пишемо у тимчасовий файл поруч і атомарно підміняємо кеш
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.part')
+            digest = hashlib.sha256()
+            try:
+                with os.fdopen(fd, 'wb') as feed_file:
+                    for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                        if chunk:
+                            feed_file.write(chunk)
+                            digest.update(chunk)
+                os.replace(tmp_path, self.data_path)
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+
+            self.meta.update({
+                'url': self.url,
+                'etag': response.headers.get('ETag', ''),
+                'last_modified': response.headers.get('Last-Modified', ''),
+                'sha256': digest.hexdigest(),
+                'fetched_at': timezone.now().isoformat(),
+            })
+        self.save_meta()
+        return FeedPayload(self, self.data_path, self.meta['sha256'])
+
+    def _load_meta(self):
+        try:
+            with open(self.meta_path, encoding='utf-8') as meta_file:
+                return json.load(meta_file)
+        except (OSError, ValueError):
+            return {}
+
+    def save_meta(self):
+        _write_atomic(self.meta_path, json.dumps(self.meta, ensure_ascii=False, indent=2))
+
+    def marker_path(self, consumer):
+        """Файл позначки "оброблено" для команди consumer"""
+        return os.path.join(self.cache_dir, f'{self.key}.{consumer}.processed')
+
+    @staticmethod
+    def _hash_file(path):
+        digest = hashlib.sha256()
+        with open(path, 'rb') as feed_file:
+            for chunk in iter(lambda: feed_file.read(DOWNLOAD_CHUNK_SIZE), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+
+def _write_atomic(path, text):
+    """Записує файл через унікальний тимчасовий файл поруч і os.replace"""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as tmp_file:
+            tmp_file.write(text)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def fetch_feed(url, timeout=60):
+    """Скорочення для FeedFetcher(url).fetch()"""
+    return FeedFetcher(url, timeout=timeout).fetch()
@@ -0,0 +1,115 @@
+"""
+Потокове читання XML фіду постачальника
+
+Фід читається з файлу на диску (див. feed_fetcher), а товари читаються
+через iterparse по одному - в пам'яті ніколи не тримається все дерево.
+"""
+import xml.etree.ElementTree as ET
+import zlib
+from itertools import islice
+from xml.etree.ElementTree import ParseError  # noqa: F401 - для except у командах
+
+
+def _child_text(element, tag):
+    """Безпечно отримує текст з дочірнього XML елемента"""
+    child = element.find(tag)
+    if child is not None and child.text:
+        return child.text.strip()
+    return ''
+
+
+def parse_offer(offer):
+    """
+    Перетворює елемент <offer> на словник
+
+    Опис повертається як є (без html.unescape) - розекранування робить
+    той, кому опис дійсно потрібен.
+    """
+    params = []
+    for param in offer.findall('param'):
+        param_name = param.get('name')
+        param_value = param.text
+        if param_name and param_value:
+            params.append((param_name, param_value))
+
+    return {
+        'vendor_code': _child_text(offer, 'vendorCode'),
+        'available': offer.get('available', 'true') == 'true',
+        'price': _child_text(offer, 'price'),
+        'name': _child_text(offer, 'name'),
+        'description': _child_text(offer, 'description'),
+        'category_id': _child_text(offer, 'categoryId'),
+        'vendor': _child_text(offer, 'vendor'),
+        'params': params,
+        'pictures': [p.text for p in offer.findall('picture') if p.text],
+    }
+
+
+def parse_category(category):
+    """Перетворює елемент <category> на словник (None якщо немає назви)"""
+    name = category.text.strip() if category.text else ''
+    if not name:
+        return None
+    return {
+        'external_id': category.get('id'),
+        'parent_id': category.get('parentId'),
+        'name': name,
+    }
+
+
+def shard_of(vendor_code, shards):
+    """Стабільний номер частини для артикулу (однаковий у всіх процесах)"""
+    return zlib.crc32(vendor_code.encode('utf-8')) % shards
+
+
+class SupplierFeed:
+    """XML фід постачальника, збережений на диску"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def iter_categories(self):
+        """Повертає категорії фіду; розбір зупиняється після блоку <categories>"""
+        for event, elem in ET.iterparse(self.path, events=('end',)):
+            if elem.tag == 'category':
+                category = parse_category(elem)
+                if category:
+                    yield category
+            elif elem.tag == 'categories':
+                return
+
+    def iter_offers(self, shard=0, shards=1):
+        """
+        Повертає товари фіду по одному
+
+        Оброблений <offer> очищується і від'єднується від батьківського
+        елемента, тому пам'ять не росте разом з розміром фіду.
+
+        При shards > 1 повертаються тільки товари частини shard (за хешем
+        артикулу) - решта пропускається без розбору полів.
+        """
+        parent = None
+        for event, elem in ET.iterparse(self.path, events=('start', 'end')):
+            if event == 'start':
+                if elem.tag == 'offers':
+                    parent = elem
+                continue
+
+            if elem.tag == 'offer':
+                if shards == 1 or shard_of(_child_text(elem, 'vendorCode'), shards) == shard:
+                    yield parse_offer(elem)
+                elem.clear()
+                if parent is not None:
+                    parent.remove(elem)
+            elif elem.tag == 'category':
+                elem.clear()
+
+
+def iter_batches(iterable, batch_size):
+    """Розбиває будь-який ітератор на списки розміром batch_size"""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
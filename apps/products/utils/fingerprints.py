@@ -0,0 +1,40 @@
+"""
+Стабільні відбитки (хеші) даних фіду
+"""
+import hashlib
+import json
+
+
+def fingerprint(data):
+    """SHA1 від канонічного JSON представлення даних"""
+    payload = json.dumps(data, ensure_ascii=False, separators=(',', ':'), sort_keys=True)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def params_fingerprint(params):
+    """
+    Відбиток списку характеристик [(назва, значення), ...]
+
+    Враховує обрізання до довжини полів AttributeName / AttributeValue і порядок
+    параметрів (від нього залежить sort_order).
+    """
+    return fingerprint([[name[:100], value[:200]] for name, value in params])
+
+
+def offer_fingerprint(offer):
+    """
+    Відбиток нормалізованого товару з фіду
+
+    Якщо відбиток збігається зі збереженим у Product.feed_hash, товар
+    у фіді не змінився і його можна пропустити без роботи з ORM.
+    """
+    return fingerprint({
+        'price': offer['price'],
+        'available': offer['available'],
+        'name': offer['name'],
+        'description': offer['description'],
+        'vendor': offer['vendor'],
+        'category_id': offer['category_id'],
+        'params': [[name, value] for name, value in offer['params']],
+        'pictures': offer['pictures'],
+    })
@@ -2,44 +2,87 @@
 Утиліта для завантаження зображень товарів
 """
 from apps.products.models import ProductImage
+from apps.products.services.product_cards import refresh_cards
+
+
+def _clean_urls(picture_urls, max_length):
+    """Непорожні URL без повторів, які вміщаються в поле image_url"""
+    return [url for url in dict.fromkeys(picture_urls) if url and len(url) <= max_length]
+
+
+def add_product_images(pictures_by_product):
+    """
+    Додає зображення (як URL) пакету товарів, у яких їх ще немає
+
+    Товари з картинками шукаються одним запитом на весь пакет, а нові
+    картинки записуються одним bulk_create. Дані карток цих товарів
+    (головна картинка) оновлюються одразу.
+
+    Args:
+        pictures_by_product: словник {product_id: список URL зображень}
+
+    Returns:
+        dict: {product_id: кількість доданих зображень}
+    """
+    max_length = ProductImage._meta.get_field('image_url').max_length
+    pictures_by_product = {
+        product_id: urls
+        for product_id, urls in (
+            (product_id, _clean_urls(picture_urls or [], max_length))
+            for product_id, picture_urls in pictures_by_product.items()
+        )
+        if urls
+    }
+    if not pictures_by_product:
+        return {}
+
+    has_images = set(
+        ProductImage.objects.filter(product_id__in=list(pictures_by_product))
+        .values_list('product_id', flat=True)
+        .distinct()
+    )
+    added = {
+        product_id: urls for product_id, urls in pictures_by_product.items()
+        if product_id not in has_images
+    }
+    ProductImage.objects.bulk_create([
+        ProductImage(product_id=product_id, image_url=picture_url, is_main=(idx == 0), sort_order=idx)
+        for product_id, urls in added.items()
+        for idx, picture_url in enumerate(urls)
+    ], batch_size=1000)
+    refresh_cards(added)
+    return {product_id: len(urls) for product_id, urls in added.items()}
 
 
 def download_product_images(product, picture_urls, clear_existing=True, use_urls=True):
     """
     Додає зображення для товару
-    
+
+    Для пакету товарів - add_product_images.
+
     Args:
         product: Product instance
         picture_urls: список URL зображень
         clear_existing: чи видаляти існуючі зображення
         use_urls: зберігати URL замість завантаження файлів
-    
+
     Returns:
         tuple: (успішно_додано, помилок)
     """
     if not picture_urls:
         return 0, 0
-    
+
     if clear_existing:
         product.images.all().delete()
-    
-    success = 0
-    errors = 0
-    
-    for idx, picture_url in enumerate(picture_urls):
-        if not picture_url:
-            continue
-            
-        try:
-            ProductImage.objects.create(
-                product=product,
-                image_url=picture_url,
-                is_main=(idx == 0),
-                sort_order=idx,
-            )
-            success += 1
-        except Exception:
-            errors += 1
-    
-    return success, errors
 
+    max_length = ProductImage._meta.get_field('image_url').max_length
+    urls = _clean_urls(picture_urls, max_length)
+    try:
+        ProductImage.objects.bulk_create([
+            ProductImage(product=product, image_url=picture_url, is_main=(idx == 0), sort_order=idx)
+            for idx, picture_url in enumerate(urls)
+        ])
+    except Exception:
+        return 0, len(urls)
+    refresh_cards([product.id])
+    return len(urls), 0
@@ -0,0 +1,89 @@
+"""
+Зменшені копії картинок товарів (Pillow)
+
+Функції модуля не звертаються до бази і виконуються у процесах пулу
+(ProcessPoolExecutor): ресайз і кодування - робота для CPU, яку потоки
+через GIL не розпаралелюють.
+"""
+from io import BytesIO
+
+import requests
+from PIL import Image, ImageOps
+
+
+# Формати копій: розширення -> (формат Pillow, параметри збереження)
+VARIANT_FORMATS = (
+    ('webp', ('WEBP', {'quality': 80, 'method': 4})),
+    ('jpeg', ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True})),
+)
+
+# Захист від "бомб" - картинок з величезною кількістю пікселів
+Image.MAX_IMAGE_PIXELS = 40_000_000
+
+DOWNLOAD_TIMEOUT = 20
+MAX_SOURCE_BYTES = 20 * 1024 * 1024
+
+
+def render_variants(data, sizes):
+    """
+    Робить копії всіх розмірів у WebP та JPEG
+
+    Копія не буває більшою за оригінал: для маленької картинки більші
+    розміри не створюються, а найбільша копія - це оригінал у новому форматі.
+
+    Args:
+        data: байти оригіналу
+        sizes: пари (назва, сторона рамки) від меншої до більшої
+
+    Returns:
+        dict: {розмір: {'width', 'height', 'webp': байти, 'jpeg': байти}}
+    """
+    with Image.open(BytesIO(data)) as source:
+        source.draft('RGB', (sizes[-1][1], sizes[-1][1]))
+        image = ImageOps.exif_transpose(source)
+        if image.mode not in ('RGB', 'L'):
+            # Прозорість - на білому фоні (JPEG її не підтримує)
+            rgba = image.convert('RGBA')
+            image = Image.new('RGB', rgba.size, 'white')
+            image.paste(rgba, mask=rgba.getchannel('A'))
+
+        variants = {}
+        previous = 0
+        for name, box in sizes:
+            if max(image.size) <= previous:
+                # Оригінал вже вміщається в попередню копію
+                break
+            previous = box
+            copy = image.copy()
+            copy.thumbnail((box, box), Image.LANCZOS)
+            variant = {'width': copy.width, 'height': copy.height}
+            for ext, (fmt, params) in VARIANT_FORMATS:
+                buffer = BytesIO()
+                copy.save(buffer, fmt, **params)
+                variant[ext] = buffer.getvalue()
+            variants[name] = variant
+    return variants
+
+
+def build_variants(task):
+    """
+    Завантажує оригінал (якщо потрібно) і робить копії
+
+    Args:
+        task: (id картинки, URL оригіналу, байти оригіналу або None, розміри)
+
+    Returns:
+        tuple: (id картинки, копії або None, текст помилки)
+    """
+    image_id, url, data, sizes = task
+    try:
+        if data is None:
+            response = requests.get(url, timeout=DOWNLOAD_TIMEOUT, stream=True)
+            response.raise_for_status()
+            data = response.raw.read(MAX_SOURCE_BYTES + 1, decode_content=True)
+            response.close()
+            if len(data) > MAX_SOURCE_BYTES:
+                return image_id, None, 'завеликий файл'
+        return image_id, render_variants(data, sizes), ''
+    except Exception as e:
+        return image_id, None, str(e)[:200]
@@ -0,0 +1,65 @@
+"""
+Потокове читання прайсу постачальника (XLSX або CSV)
+
+Рядки повертаються по одному як кортежі значень - весь файл ніколи не
+завантажується в пам'ять. Формат визначається за вмістом файлу, а не за
+розширенням (кеш фідів зберігає файли без розширення).
+"""
+import csv
+
+import openpyxl
+
+
+XLSX_SIGNATURE = b'PK'
+LEGACY_XLS_SIGNATURE = b'\xd0\xcf\x11\xe0'
+
+
+def detect_format(path):
+    """Повертає 'xlsx' або 'csv' за першими байтами файлу"""
+    with open(path, 'rb') as price_file:
+        head = price_file.read(4)
+    if head.startswith(XLSX_SIGNATURE):
+        return 'xlsx'
+    if head.startswith(LEGACY_XLS_SIGNATURE):
+        raise ValueError('Старий формат .xls не підтримується - потрібен XLSX або CSV')
+    return 'csv'
+
+
+def iter_price_rows(path, skip_header=True):
+    """
+    Повертає рядки прайсу по одному
+
+    Порожні клітинки CSV перетворюються на None, як і в XLSX.
+    """
+    if detect_format(path) == 'xlsx':
+        rows = _iter_xlsx_rows(path)
+    else:
+        rows = _iter_csv_rows(path)
+
+    for idx, row in enumerate(rows):
+        if skip_header and idx == 0:
+            continue
+        yield row
+
+
+def _iter_xlsx_rows(path):
+    # Файловий об'єкт - openpyxl не перевіряє розширення
+    with open(path, 'rb') as price_file:
+        workbook = openpyxl.load_workbook(price_file, read_only=True)
+        try:
+            for row in workbook.active.iter_rows(values_only=True):
+                yield row
+        finally:
+            workbook.close()
+
+
+def _iter_csv_rows(path):
+    with open(path, encoding='utf-8-sig', newline='') as price_file:
+        sample = price_file.read(4096)
+        price_file.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=',;\t')
+        except csv.Error:
+            dialect = csv.excel
+        for row in csv.reader(price_file, dialect):
+            yield tuple(value.strip() or None for value in row)
@@ -0,0 +1,31 @@
+"""
+Підрахунок SQL запитів для звітів синхронізації
+"""
+from django.db import connections
+
+
+class QueryCounter:
+    """
+    Контекстний менеджер, що рахує SQL запити до бази
+
+    Працює і при DEBUG=False (через execute_wrapper), SQL не зберігається.
+    """
+
+    def __init__(self, using='default'):
+        self.using = using
+        self.count = 0
+        self._wrapper = None
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        self._wrapper = connections[self.using].execute_wrapper(self)
+        self._wrapper.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._wrapper.__exit__(exc_type, exc_value, traceback)
+        self._wrapper = None
+        return False
@@ -0,0 +1,57 @@
+"""
+Заміри часу та кількості запитів етапів імпорту
+"""
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from apps.products.utils.query_counter import QueryCounter
+
+
+class StageTimer:
+    """
+    Накопичує час виконання та кількість SQL запитів за назвами етапів
+
+    Використання:
+        timer = StageTimer()
+        with timer.stage('images'):
+            ...
+        timer.timings  # {'images': 1.23}
+        timer.queries  # {'images': 4}
+
+    Етапи не вкладаються один в одного - інакше час і запити
+    врахуються двічі.
+    """
+
+    def __init__(self):
+        self.timings = defaultdict(float)
+        self.queries = defaultdict(int)
+
+    @contextmanager
+    def stage(self, name):
+        started = time.monotonic()
+        counter = QueryCounter()
+        try:
+            with counter:
+                yield
+        finally:
+            self.timings[name] += time.monotonic() - started
+            self.queries[name] += counter.count
+
+    def iterate(self, name, iterable):
+        """Обгортає ітератор: час отримання кожного елемента йде в етап name"""
+        iterator = iter(iterable)
+        while True:
+            with self.stage(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def merge(self, timings, queries):
+        """Додає заміри з іншого процесу (паралельна синхронізація)"""
+        for name, seconds in timings.items():
+            self.timings[name] += seconds
+        for name, count in queries.items():
+            self.queries[name] += count
@@ -0,0 +1,107 @@
+"""
+JSON звіт команд роботи з фідом (--report) та режим --dry-run
+
+Звіт містить час і кількість SQL запитів кожного етапу (завантаження,
+розбір, читання з бази, запис, картинки) та лічильники змінених рядків -
+по ньому можна відстежувати швидкодію нічних синхронізацій.
+"""
+import json
+import sys
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.utils import timezone
+
+from apps.products.utils.stage_timer import StageTimer
+
+
+def add_report_arguments(parser, dry_run=True):
+    """Додає до команди опції --report та --dry-run"""
+    parser.add_argument(
+        '--report',
+        type=str,
+        metavar='PATH',
+        help='Записати JSON звіт (етапи, запити, змінені рядки) у файл; "-" - у stdout'
+    )
+    if dry_run:
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Порахувати зміни без запису в базу (транзакція відкочується)'
+        )
+
+
+class SyncReport(StageTimer):
+    """Звіт виконання команди: етапи (час, запити) та лічильники"""
+
+    def __init__(self, command, dry_run=False):
+        super().__init__()
+        self.command = command
+        self.dry_run = dry_run
+        self.started_at = timezone.now()
+        self.finished_at = None
+        self.counters = {}
+        self.error = ''
+
+    def finish(self, counters=None, error=''):
+        self.finished_at = timezone.now()
+        if counters:
+            self.counters.update(counters)
+        if error:
+            self.error = error
+
+    def to_dict(self):
+        finished_at = self.finished_at or timezone.now()
+        return {
+            'command': self.command,
+            'dry_run': self.dry_run,
+            'started_at': self.started_at.isoformat(),
+            'finished_at': finished_at.isoformat(),
+            'duration': round((finished_at - self.started_at).total_seconds(), 3),
+            'phases': {
+                name: {'seconds': round(seconds, 3), 'queries': self.queries.get(name, 0)}
+                for name, seconds in self.timings.items()
+            },
+            'queries': sum(self.queries.values()),
+            'counters': dict(self.counters),
+            'error': self.error,
+        }
+
+    def write(self, path, stream=None):
+        """Записує звіт у файл або в stream (path == '-', за замовчуванням sys.stdout)"""
+        if not path:
+            return
+        if path == '-':
+            (stream or sys.stdout).write(json.dumps(self.to_dict(), ensure_ascii=False) + '\n')
+            return
+        with open(path, 'w', encoding='utf-8') as report_file:
+            json.dump(self.to_dict(), report_file, ensure_ascii=False, indent=2)
+
+
+def reserve_stdout(command, path):
+    """
+    При --report - звільняє stdout команди під JSON звіт
+
+    Прогрес команди (self.stdout) переводиться в stderr, інакше stdout
+    не розбирається як JSON.
+
+    Returns:
+        потік для SyncReport.write
+    """
+    stream = command.stdout
+    if path == '-':
+        # Без червоного стилю помилок - це звичайний прогрес
+        command.stderr.style_func = None
+        command.stdout = command.stderr
+    return stream
+
+
+@contextmanager
+def dry_run_atomic(dry_run):
+    """При dry_run всі записи виконуються в транзакції, яка відкочується"""
+    if not dry_run:
+        yield
+        return
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
@@ -1,20 +1,32 @@
 from django.views.generic import ListView, DetailView
-from django.shortcuts import get_object_or_404
+from django.shortcuts import get_object_or_404, redirect
 from django.db.models import Count, Q, Prefetch
-from django.views.decorators.cache import cache_page
 from django.utils.decorators import method_decorator
 from django.conf import settings
-from django.http import JsonResponse
-from django.views.decorators.http import require_POST
+from django.http import Http404, JsonResponse
+from django.views.decorators.http import require_GET, require_http_methods, require_POST
 from django.views.decorators.csrf import csrf_exempt
-from django.core.management import call_command
+from django.urls import reverse
 import logging
-from .models import Product, Category
+from apps.core.cache_tags import cache_page
+from .models import Product, Category, ProductImage
+from .models_jobs import SyncJob
+from .services import catalog_listing, image_proxy, sync_jobs
+from .services.category_tree import get_tree
+from .services.product_cards import CARD_FIELDS
 
 logger = logging.getLogger(__name__)
 
+# Максимум карток за один запит до JSON API категорії
+API_MAX_LIMIT = 60
 
-@method_decorator(cache_page(60 * 5), name='dispatch')  # Кеш на 5 хвилин
+
+def _category_page_tags(request, slug):
+    category = get_tree().by_slug(slug)
+    return ['catalog', f'category:{category.id if category else None}']
+
+
+@method_decorator(cache_page(60 * 5, _category_page_tags), name='dispatch')  # Кеш на 5 хвилин
 class CategoryView(ListView):
     model = Product
     template_name = 'products/category.html'
@@ -22,84 +34,60 @@ class CategoryView(ListView):
     paginate_by = 15
     
     def get_queryset(self):
-        from .models import ProductImage
-        
-        # Крок 1: Отримуємо категорію з оптимізованими prefetch
-        self.category = get_object_or_404(
-            Category.objects.select_related('parent').prefetch_related(
-                Prefetch(
-                    'children',
-                    queryset=Category.objects.filter(is_active=True)
-                )
-            ),
-            slug=self.kwargs['slug']
-        )
+        # Крок 1: Категорія з дерева категорій (без запиту до бази)
+        tree = get_tree()
+        self.category = tree.by_slug(self.kwargs['slug'])
+        if self.category is None:
+            raise Http404
         
-        # Крок 2: Отримуємо дочірні категорії (з prefetch, БЕЗ додаткового запиту)
-        child_categories = [
-            child for child in self.category.children.all()
-            if child.is_active
-        ]
+        # Крок 2: Фільтри та сортування з GET-параметрів - для всієї категорії
+        self.filters = catalog_listing.parse_filters(self.request.GET, self.category, tree)
         
-        # Крок 3: Будуємо base queryset з усіма оптимізаціями
-        base_queryset = Product.objects.select_related(
-            'primary_category'
-        ).prefetch_related(
-            'categories',  # ДОДАНО: запобігає N+1 для product.categories.all()
-            Prefetch(
-                'images',
-                queryset=ProductImage.objects.filter(is_main=True).only('image', 'image_url', 'is_main', 'product_id'),
-                to_attr='main_images'
-            )
-        ).only(
-            'id', 'name', 'slug', 'retail_price', 'sale_price', 'is_sale',
-            'sale_start_date', 'sale_end_date', 'primary_category__name', 'created_at',
-            'stock'  # ДОДАНО: потрібно для product.is_in_stock()
+        # Крок 3: id товарів і ключі сортування з таблиці товарів у категоріях - вона
+        # вже містить товари всіх підкатегорій, тому і сторінка, і COUNT пагінатора -
+        # один діапазон індексу без JOIN і DISTINCT
+        return catalog_listing.listing(self.category, self.filters).values_list(
+            'product_id', *catalog_listing.sort_fields(self.filters)
         )
-        
-        # Крок 4: Фільтруємо товари
-        if child_categories:
-            child_ids = [child.id for child in child_categories]
-            
-            return base_queryset.filter(
-                Q(categories__id=self.category.id) | 
-                Q(primary_category__id=self.category.id) |
-                Q(categories__id__in=child_ids) | 
-                Q(primary_category__id__in=child_ids),
-                is_active=True,
-                stock__gt=0
-            ).distinct()
-        
-        return base_queryset.filter(
-            Q(categories__id=self.category.id) | Q(primary_category__id=self.category.id),
-            is_active=True,
-            stock__gt=0
-        ).distinct()
+    
+    def paginate_queryset(self, queryset, page_size):
+        """Пагінація по id, моделі товарів - тільки для поточної сторінки"""
+        paginator, page, rows, is_paginated = super().paginate_queryset(queryset, page_size)
+        rows = list(rows)
+        page.object_list = catalog_listing.card_products([row[0] for row in rows])
+        # Курсор для "Показати ще" (JSON API продовжує з останнього товару сторінки)
+        self.next_cursor = catalog_listing.encode_cursor(rows[-1][1:]) if rows and page.has_next() else ''
+        return paginator, page, page.object_list, is_paginated
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['category'] = self.category
         
-        # Використовуємо вже завантажені дані з prefetch
-        subcategories = [
-            child for child in self.category.children.all()
-            if child.is_active
-        ]
+        # Прямі активні підкатегорії з дерева категорій
+        subcategories = self.category.active_children
         context['subcategories'] = subcategories
+        context['breadcrumbs'] = get_tree().breadcrumbs(self.category.id)
         
         if subcategories:
             context['available_subcategories'] = subcategories
         
-        # Оптимізація: використовуємо object_list (вже завантажені товари) замість повторного get_queryset()
-        products = context.get('object_list', [])
-        if products:
-            # Рахуємо мін/макс ціну в Python (швидше ніж aggregate для сторінки з 15 товарів)
-            prices = [p.get_current_price() for p in products if p.get_current_price()]
-            context['min_price'] = int(min(prices)) if prices else 0
-            context['max_price'] = int(max(prices)) if prices else 10000
-        else:
-            context['min_price'] = 0
-            context['max_price'] = 10000
+        # Діапазон цін усієї категорії (один aggregate, кешується за тегом категорії)
+        context['min_price'], context['max_price'] = catalog_listing.price_range(self.category)
+        
+        # Параметри фільтрів для форми, посилань пагінації та JSON API
+        context['filters'] = self.filters
+        context['is_filtered'] = catalog_listing.is_filtered(self.filters)
+        context['badge_choices'] = catalog_listing.BADGE_CHOICES
+        context['facet_groups'] = catalog_listing.facet_groups(self.category, self.filters)
+        if self.filters['sort'] != 'default':
+            context['sort_label'] = catalog_listing.SORT_LABELS[self.filters['sort']]
+        params = self.request.GET.copy()
+        params.pop('page', None)
+        params.pop('cursor', None)
+        context['querystring'] = params.urlencode()
+        context['page_query'] = f"{context['querystring']}&" if context['querystring'] else ''
+        context['next_cursor'] = getattr(self, 'next_cursor', '')
+        context['products_api_url'] = reverse('products:category_products_api', kwargs={'slug': self.category.slug})
         
         return context
 
@@ -111,15 +99,18 @@ class ProductDetailView(DetailView):
     context_object_name = 'product'
     
     def get_queryset(self):
-        from .models import ProductImage
+        from .models import ProductAttribute, ProductImage
         return Product.objects.filter(is_active=True, stock__gt=0).prefetch_related(
             Prefetch('images',
-                queryset=ProductImage.objects.only('image', 'image_url', 'is_main', 'alt_text', 'product_id').order_by('sort_order', 'id')
-            )
+                # Биті посилання (перевірка bulk_download_images) не показуємо
+                queryset=ProductImage.objects.filter(is_broken=False).only('image', 'image_url', 'variants', 'is_main', 'alt_text', 'product_id').order_by('sort_order', 'id')
+            ),
+            # Назви та значення - зі словників, одним запитом разом з характеристиками
+            Prefetch('attributes', queryset=ProductAttribute.objects.select_related('name', 'value'))
         )
 
 
-@method_decorator(cache_page(60 * 1), name='dispatch')
+@method_decorator(cache_page(60 * 1, ['catalog', 'sale']), name='dispatch')
 class SaleProductsView(ListView):
     """Акції - показує товари з активними акціями"""
     model = Product
@@ -129,7 +120,6 @@ class SaleProductsView(ListView):
     
     def get_queryset(self):
         from django.utils import timezone
-        from .models import ProductImage
         
         now = timezone.now()
         
@@ -142,16 +132,7 @@ class SaleProductsView(ListView):
             Q(sale_start_date__isnull=True) | Q(sale_start_date__lte=now)
         ).filter(
             Q(sale_end_date__isnull=True) | Q(sale_end_date__gt=now)
-        ).select_related('primary_category').prefetch_related(
-            Prefetch(
-                'images',
-                queryset=ProductImage.objects.filter(is_main=True).only('image', 'image_url', 'is_main', 'product_id'),
-                to_attr='main_images'
-            )
-        ).only(
-            'id', 'name', 'slug', 'retail_price', 'sale_price', 'is_sale',
-            'sale_start_date', 'sale_end_date', 'primary_category__name', 'stock'
-        ).order_by('-updated_at')
+        ).only(*CARD_FIELDS).order_by('-updated_at')
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -160,22 +141,112 @@ class SaleProductsView(ListView):
         return context
 
 
+def _cron_authorized(request):
+    # Секрет - у заголовку X-Cron-Secret або в тілі POST, не в URL (потрапляє в логи доступу)
+    secret = request.headers.get('X-Cron-Secret') or request.POST.get('secret', '')
+    return secret == getattr(settings, 'CRON_SECRET', 'change-me')
+
+
 @csrf_exempt
 @require_POST
 def trigger_sync(request):
-    """Endpoint для тригеру синхронізації (для cron-job.org)"""
-    secret = request.POST.get('secret', '')
-    
-    if secret != getattr(settings, 'CRON_SECRET', 'change-me'):
+    """
+    Endpoint для тригеру синхронізації (для cron-job.org)
+
+    Синхронізація не виконується в запиті: задача ставиться в чергу, а
+    виконує її воркер (python manage.py run_sync_jobs). Повертає job_id
+    одразу; стан - через sync_status.
+    """
+    if not _cron_authorized(request):
         logger.warning(f'Unauthorized cron attempt from {request.META.get("REMOTE_ADDR")}')
         return JsonResponse({'error': 'Unauthorized'}, status=401)
     
+    job, created = sync_jobs.enqueue('sync')
+    if created:
+        logger.info(f'Sync job {job.id} queued from cron trigger')
+    data = job.to_dict()
+    data['status_url'] = reverse('products:sync_status', kwargs={'job_id': job.id})
+    return JsonResponse(data, status=202)
+
+
+@csrf_exempt
+@require_http_methods(['GET', 'POST'])
+def sync_status(request, job_id):
+    """
+    Стан задачі синхронізації: статус, прогрес, тривалість, лічильники
+
+    Секрет - заголовок X-Cron-Secret (GET) або поле secret у тілі POST.
+    """
+    if not _cron_authorized(request):
+        return JsonResponse({'error': 'Unauthorized'}, status=401)
+    job = get_object_or_404(SyncJob, pk=job_id)
+    return JsonResponse(job.to_dict())
+
+
+@require_GET
+@cache_page(60 * 5, _category_page_tags)
+def category_products_api(request, slug):
+    """
+    Картки товарів категорії в JSON (для "Показати ще")
+
+    Фільтри ті ж, що на сторінці категорії; cursor - з попередньої відповіді
+    (або next_cursor сторінки). Повертає products, next_cursor (None - це
+    остання сторінка) і count - тільки для першої сторінки.
+    """
+    tree = get_tree()
+    category = tree.by_slug(slug)
+    if category is None:
+        return JsonResponse({'error': 'Категорію не знайдено'}, status=404)
+    
+    filters = catalog_listing.parse_filters(request.GET, category, tree)
+    memberships = catalog_listing.listing(category, filters)
+    data = {}
+    cursor = request.GET.get('cursor')
+    if cursor:
+        try:
+            values = catalog_listing.decode_cursor(cursor, filters)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        memberships = catalog_listing.after_cursor(memberships, filters, values)
+    else:
+        data['count'] = memberships.count()
+    
+    try:
+        limit = min(max(int(request.GET.get('limit', CategoryView.paginate_by)), 1), API_MAX_LIMIT)
+    except ValueError:
+        limit = CategoryView.paginate_by
+    # Один зайвий рядок - чи є наступна сторінка (без COUNT)
+    rows = list(memberships.values_list('product_id', *catalog_listing.sort_fields(filters))[:limit + 1])
+    has_next = len(rows) > limit
+    rows = rows[:limit]
+    
+    products = catalog_listing.card_products([row[0] for row in rows])
+    data['products'] = [catalog_listing.card_payload(product) for product in products]
+    data['next_cursor'] = catalog_listing.encode_cursor(rows[-1][1:]) if has_next else None
+    return JsonResponse(data)
+
+
+@require_GET
+def image_proxy_view(request, image_id, version):
+    """
+    Картинка постачальника через копію у сховищі
+
+    Сюди приходять лише промахи: після першого запиту картинка лежить у
+    сховищі, і сторінки посилаються прямо на неї. Якщо сервер постачальника
+    недоступний - редірект на оригінал.
+    """
+    image = ProductImage.objects.filter(pk=image_id).only('id', 'product_id', 'image', 'image_url').first()
+    if image is None:
+        raise Http404
+    if image.image:
+        return redirect(image.image.url)
+    if not image.image_url:
+        raise Http404
+    if ProductImage.proxy_version(image.image_url) != version:
+        # URL оригіналу змінився - стара адреса веде на нову
+        return redirect(image.get_proxy_url())
     try:
-        logger.info('Starting sync from cron trigger')
-        call_command('sync_products', '--skip-images')
-        call_command('update_prices_xls')
-        logger.info('Sync completed successfully')
-        return JsonResponse({'status': 'success'})
-    except Exception as e:
-        logger.error(f'Sync error: {e}', exc_info=True)
-        return JsonResponse({'error': str(e)}, status=500)
+        return redirect(image_proxy.store_image(image))
+    except image_proxy.ImageProxyError as e:
+        logger.warning(f'Image proxy {image_id}: {e}')
+        return redirect(image.image_url)
@@ -3,6 +3,7 @@
 """
 from django.conf import settings
 from apps.products.models import Product
+from apps.products.services.product_cards import CARD_FIELDS
 
 
 class Wishlist:
@@ -62,5 +63,5 @@ class Wishlist:
     def get_products(self):
         """Повертає всі товари зі списку бажань"""
         product_ids = self.wishlist
-        return Product.objects.filter(id__in=product_ids, is_active=True, stock__gt=0).prefetch_related('images')
+        return Product.objects.filter(id__in=product_ids, is_active=True, stock__gt=0).only(*CARD_FIELDS)
 
@@ -17,6 +17,11 @@ python manage.py migrate --no-input
 echo "📁 Імпорт категорій..."
 python manage.py import_categories || echo "⚠️  Категорії не імпортовано"
 
+echo "🗂️  Товари в категоріях..."
+python manage.py rebuild_category_memberships || echo "⚠️  Таблицю товарів у категоріях не перебудовано"
+python manage.py rebuild_facets || echo "⚠️  Фасети характеристик не перебудовано"
+python manage.py rebuild_product_cards || echo "⚠️  Дані карток товарів не перебудовано"
+
 echo "📝 Оновлення відгуків..."
 python manage.py create_reviews || echo "⚠️  Відгуки не оновлено"
 
@@ -37,7 +37,7 @@ read -p "Ваш вибір: " choice
 case $choice in
     1)
         echo -e "\n${YELLOW}Запускаємо повний імпорт...${NC}\n"
-        python manage.py full_import
+        python manage.py import_feed
         ;;
     2)
         echo -e "\n${YELLOW}Імпортуємо категорії...${NC}\n"
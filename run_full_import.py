@@ -43,39 +43,20 @@ def step1_cleanup():
     subprocess.run([sys.executable, cleanup_script], check=True)
 
 
-def step2_import_categories():
-    """Крок 2: Імпорт категорій"""
-    print('📁 Імпортую категорії з XML фіду...')
+def step2_import_feed():
+    """Крок 2: Імпорт категорій, товарів, характеристик і картинок за один прохід фіду"""
+    print('📦 Імпортую категорії та товари з XML фіду (одне завантаження)...')
     call_command(
-        'import_categories',
-        url='https://smtm.com.ua/_prices/import-retail-ua-2.xml',
-        verbosity=1
-    )
-
-
-def step3_import_products():
-    """Крок 3: Імпорт товарів"""
-    print('📦 Імпортую товари з XML фіду...')
-    call_command(
-        'import_products',
-        url='https://smtm.com.ua/_prices/import-retail-ua-2.xml',
-        verbosity=1
-    )
-
-
-def step4_sync():
-    """Крок 4: Синхронізація для перевірки"""
-    print('🔄 Виконую синхронізацію для перевірки...')
-    call_command(
-        'sync_products',
+        'import_feed',
         url='https://smtm.com.ua/_prices/import-retail-ua-2.xml',
         batch_size=50,
+        force=True,
         verbosity=1
     )
 
 
-def step5_verify():
-    """Крок 5: Перевірка результатів"""
+def step3_verify():
+    """Крок 3: Перевірка результатів"""
     from apps.products.models import Category, Product
     from django.db.models import Count
     
@@ -133,10 +114,8 @@ def main():
     
     print('Цей скрипт виконає повний процес імпорту:')
     print('1. Очищення дублікатів категорій')
-    print('2. Імпорт категорій з XML')
-    print('3. Імпорт товарів з XML')
-    print('4. Синхронізація для перевірки')
-    print('5. Перевірка результатів')
+    print('2. Імпорт категорій і товарів з XML (один прохід фіду)')
+    print('3. Перевірка результатів')
     print()
     
     response = input('Розпочати? (так/ні): ').strip().lower()
@@ -146,10 +125,8 @@ def main():
     
     steps = [
         (1, 'Очищення дублікатів', step1_cleanup),
-        (2, 'Імпорт категорій', step2_import_categories),
-        (3, 'Імпорт товарів', step3_import_products),
-        (4, 'Синхронізація', step4_sync),
-        (5, 'Перевірка результатів', step5_verify),
+        (2, 'Імпорт фіду', step2_import_feed),
+        (3, 'Перевірка результатів', step3_verify),
     ]
     
     for step_num, title, func in steps:
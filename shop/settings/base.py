@@ -2,6 +2,7 @@
 Базові налаштування для RedRabbit проекту.
 """
 import os
+import tempfile
 from pathlib import Path
 from decouple import config
 
@@ -121,6 +122,16 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Кеш фідів постачальника (останній файл + ETag/Last-Modified/хеш)
+FEED_CACHE_DIR = config('FEED_CACHE_DIR', default=os.path.join(tempfile.gettempdir(), 'redrabbit_feeds'))
+
+# Проксі картинок постачальника: при першому запиті копіює картинку у сховище
+# (STORAGES['default']). Вимкнено - картинки йдуть прямо з сервера постачальника
+IMAGE_PROXY_ENABLED = config('IMAGE_PROXY_ENABLED', default=False, cast=bool)
+
+# Адреса сайту (прогрів кешу рендерить сторінки з цим хостом і схемою)
+SITE_URL = config('SITE_URL', default='')
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -2,18 +2,14 @@ class CatalogManager {
     constructor() {
         this.productsGrid = document.getElementById('productsGrid');
         this.skeletonGrid = document.getElementById('skeletonGrid');
-        this.productCards = [];
-        this.originalCards = [];
+        // Фільтри та сортування застосовує сервер (GET-параметри сторінки)
         this.activeFilters = {
             price: { min: 0, max: Infinity },
-            availability: [],
-            brands: [],
-            power: [],
-            waterproof: [],
-            vibration: [],
-            types: []
+            subcategories: [],
+            badges: [],
+            attributes: []
         };
-        this.currentSort = 'default';
+        this.currentSort = document.querySelector('.filters-bar')?.dataset.sort || 'default';
         
         this.init();
     }
@@ -22,6 +18,7 @@ class CatalogManager {
         this.cacheElements();
         this.bindEvents();
         this.loadInitialData();
+        this.initLoadMore();
         this.initMobileFilters();
         this.initFiltersToggle();
     }
@@ -30,12 +27,9 @@ class CatalogManager {
         this.filters = {
             priceMin: document.getElementById('priceMin'),
             priceMax: document.getElementById('priceMax'),
-            availability: document.querySelectorAll('input[name="availability"]'),
-            brands: document.querySelectorAll('input[name="brand"]'),
-            power: document.querySelectorAll('input[name="power"]'),
-            waterproof: document.querySelectorAll('input[name="waterproof"]'),
-            vibration: document.querySelectorAll('input[name="vibration"]'),
-            types: document.querySelectorAll('input[name="type"]')
+            subcategories: document.querySelectorAll('.filters-content input[name="sub"]'),
+            badges: document.querySelectorAll('.filters-content input[name="badge"]'),
+            attributes: document.querySelectorAll('.filters-content input[name="attr"]')
         };
         
         this.clearFiltersBtn = document.getElementById('clearAllFilters');
@@ -47,26 +41,22 @@ class CatalogManager {
         this.sortSelectBtn = document.getElementById('sortSelectBtn');
         this.sortDropdown = document.getElementById('sortDropdown');
         this.mobileFiltersClose = document.getElementById('mobileFiltersClose');
-        
-        this.productCards = Array.from(document.querySelectorAll('.product-card'));
-        this.originalCards = [...this.productCards];
+        this.loadMoreBtn = document.getElementById('loadMoreBtn');
     }
     
     bindEvents() {
+        // Ціна застосовується після завершення введення (change), а не на кожну цифру
         if (this.filters.priceMin) {
-            this.filters.priceMin.addEventListener('input', this.debounce(() => this.applyFilters(), 500));
+            this.filters.priceMin.addEventListener('change', () => this.applyFilters());
         }
         if (this.filters.priceMax) {
-            this.filters.priceMax.addEventListener('input', this.debounce(() => this.applyFilters(), 500));
+            this.filters.priceMax.addEventListener('change', () => this.applyFilters());
         }
         
         const allCheckboxes = [
-            ...this.filters.availability,
-            ...this.filters.brands,
-            ...this.filters.power,
-            ...this.filters.waterproof,
-            ...this.filters.vibration,
-            ...this.filters.types
+            ...this.filters.subcategories,
+            ...this.filters.badges,
+            ...this.filters.attributes
         ];
         
         allCheckboxes.forEach(checkbox => {
@@ -93,83 +83,42 @@ class CatalogManager {
             });
         }
         
-        if (this.sortSelectBtn && this.sortDropdown) {
-            this.sortSelectBtn.addEventListener('click', (e) => {
-                e.stopPropagation();
-                this.sortDropdown.classList.toggle('hidden');
-                this.sortSelectBtn.classList.toggle('active');
-            });
-            
-            this.sortDropdown.querySelectorAll('.sort-option').forEach(option => {
-                option.addEventListener('click', () => {
-                    const value = option.dataset.value;
-                    this.currentSort = value;
-                    this.sortSelectBtn.querySelector('.sort-select-text').textContent = option.textContent;
-                    this.sortDropdown.classList.add('hidden');
-                    this.sortSelectBtn.classList.remove('active');
-                    this.applyFilters();
-                });
-            });
-            
-            document.addEventListener('click', (e) => {
-                if (!this.sortSelectBtn.contains(e.target) && !this.sortDropdown.contains(e.target)) {
-                    this.sortDropdown.classList.add('hidden');
-                    this.sortSelectBtn.classList.remove('active');
-                }
-            });
-        }
+        this.bindSortDropdown(this.sortSelectBtn, this.sortDropdown);
+        this.bindSortDropdown(
+            document.getElementById('desktopSortBtn'),
+            document.getElementById('desktopSortDropdown')
+        );
+    }
+    
+    bindSortDropdown(button, dropdown) {
+        if (!button || !dropdown) return;
         
-        this.desktopSortBtn = document.getElementById('desktopSortBtn');
-        this.desktopSortDropdown = document.getElementById('desktopSortDropdown');
+        button.addEventListener('click', (e) => {
+            e.stopPropagation();
+            dropdown.classList.toggle('hidden');
+            button.classList.toggle('active');
+        });
         
-        if (this.desktopSortBtn && this.desktopSortDropdown) {
-            this.desktopSortBtn.addEventListener('click', (e) => {
-                e.stopPropagation();
-                this.desktopSortDropdown.classList.toggle('hidden');
-                this.desktopSortBtn.classList.toggle('active');
-            });
-            
-            this.desktopSortDropdown.querySelectorAll('.sort-option').forEach(option => {
-                option.addEventListener('click', () => {
-                    const value = option.dataset.value;
-                    this.currentSort = value;
-                    this.desktopSortBtn.querySelector('.sort-text').textContent = option.textContent;
-                    this.desktopSortDropdown.classList.add('hidden');
-                    this.desktopSortBtn.classList.remove('active');
-                    this.applyFilters();
-                });
+        dropdown.querySelectorAll('.sort-option').forEach(option => {
+            option.addEventListener('click', () => {
+                dropdown.classList.add('hidden');
+                button.classList.remove('active');
+                this.currentSort = option.dataset.value;
+                this.applyFilters();
             });
-            
+        });
+        
         document.addEventListener('click', (e) => {
-                if (!this.desktopSortBtn.contains(e.target) && !this.desktopSortDropdown.contains(e.target)) {
-                    this.desktopSortDropdown.classList.add('hidden');
-                    this.desktopSortBtn.classList.remove('active');
-                }
-            });
-        }
+            if (!button.contains(e.target) && !dropdown.contains(e.target)) {
+                dropdown.classList.add('hidden');
+                button.classList.remove('active');
+            }
+        });
     }
     
     loadInitialData() {
-        this.productCards = Array.from(document.querySelectorAll('.product-card'));
-        this.originalCards = [...this.productCards];
-        this.updateResultsCount(this.productCards.length, this.productCards.length);
-    }
-    
-    applyFilters() {
-        this.showSkeleton(true);
-        
         this.collectActiveFilters();
-        
-        const filteredCards = this.filterProducts();
-        
-        const sortedCards = this.sortProducts(filteredCards);
-        
-        setTimeout(() => {
-            this.displayProducts(sortedCards);
-            this.updateActiveFiltersDisplay();
-            this.updateResultsCount(sortedCards.length, this.originalCards.length);
-            this.showSkeleton(false);
-        }, 300);
+        this.updateActiveFiltersDisplay();
     }
     
     collectActiveFilters() {
@@ -177,140 +126,142 @@ class CatalogManager {
         const priceMax = parseFloat(this.filters.priceMax?.value) || Infinity;
         this.activeFilters.price = { min: priceMin, max: priceMax };
         
-        this.activeFilters.availability = Array.from(this.filters.availability)
+        this.activeFilters.subcategories = Array.from(this.filters.subcategories)
             .filter(cb => cb.checked)
             .map(cb => cb.value);
         
-        this.activeFilters.brands = Array.from(this.filters.brands)
+        this.activeFilters.badges = Array.from(this.filters.badges)
             .filter(cb => cb.checked)
             .map(cb => cb.value);
         
-        this.activeFilters.power = Array.from(this.filters.power)
+        this.activeFilters.attributes = Array.from(this.filters.attributes)
             .filter(cb => cb.checked)
             .map(cb => cb.value);
+    }
+    
+    buildQuery() {
+        const params = new URLSearchParams();
+        this.activeFilters.subcategories.forEach(slug => params.append('sub', slug));
+        if (this.activeFilters.price.min > 0) params.set('price_min', this.activeFilters.price.min);
+        if (this.activeFilters.price.max < Infinity) params.set('price_max', this.activeFilters.price.max);
+        this.activeFilters.badges.forEach(badge => params.append('badge', badge));
+        this.activeFilters.attributes.forEach(attr => params.append('attr', attr));
+        if (this.currentSort !== 'default') params.set('sort', this.currentSort);
+        return params.toString();
+    }
+    
+    applyFilters() {
+        this.collectActiveFilters();
         
-        this.activeFilters.waterproof = Array.from(this.filters.waterproof)
-            .filter(cb => cb.checked)
-            .map(cb => cb.value);
+        // Сторінка з фільтрами рендериться сервером (і кешується за повним URL)
+        const query = this.buildQuery();
+        if (query === window.location.search.replace(/^\?/, '')) return;
         
-        this.activeFilters.vibration = Array.from(this.filters.vibration)
-            .filter(cb => cb.checked)
-            .map(cb => cb.value);
+        this.showSkeleton(true);
+        window.location.search = query;
+    }
+    
+    initLoadMore() {
+        if (!this.loadMoreBtn || !this.productsGrid) return;
         
-        this.activeFilters.types = Array.from(this.filters.types)
-            .filter(cb => cb.checked)
-            .map(cb => cb.value);
+        this.loadMoreBtn.addEventListener('click', () => this.loadMore());
     }
     
-    filterProducts() {
-        return this.originalCards.filter(card => {
-                const price = parseFloat(card.dataset.salePrice);
-            if (price < this.activeFilters.price.min || price > this.activeFilters.price.max) {
-                return false;
+    async loadMore() {
+        const button = this.loadMoreBtn;
+        const cursor = button.dataset.cursor;
+        if (!cursor || button.disabled) return;
+        
+        button.disabled = true;
+        try {
+            const query = button.dataset.query;
+            const url = `${button.dataset.apiUrl}?${query ? query + '&' : ''}cursor=${encodeURIComponent(cursor)}`;
+            const response = await fetch(url, { headers: { 'Accept': 'application/json' } });
+            if (!response.ok) {
+                throw new Error(`HTTP error! status: ${response.status}`);
             }
+            const data = await response.json();
             
-            if (this.activeFilters.availability.length > 0) {
-                const inStock = card.dataset.inStock === 'True';
-                const hasInStock = this.activeFilters.availability.includes('in_stock');
-                const hasOutOfStock = this.activeFilters.availability.includes('out_of_stock');
-                
-                if (hasInStock && !inStock) return false;
-                if (hasOutOfStock && inStock) return false;
-            }
-            
-            if (this.activeFilters.brands.length > 0) {
-                const vendor = card.dataset.vendor || '';
-                if (!this.activeFilters.brands.includes(vendor)) {
-                    return false;
-                }
-            }
-            
-            if (this.activeFilters.power.length > 0) {
-                const power = card.dataset.power || '';
-                if (!this.activeFilters.power.includes(power)) {
-                    return false;
-                }
-            }
-            
-            if (this.activeFilters.waterproof.length > 0) {
-                const waterproof = card.dataset.waterproof || '';
-                if (!this.activeFilters.waterproof.includes(waterproof)) {
-                    return false;
-                }
-            }
+            data.products.forEach(product => {
+                this.productsGrid.insertAdjacentHTML('beforeend', this.createProductCard(product));
+            });
+            this.initProductCards();
+            // Після "Показати ще" нумерація сторінок вже не відповідає показаному
+            this.hidePagination(true);
             
-            if (this.activeFilters.vibration.length > 0) {
-                const vibration = card.dataset.vibration || '';
-                if (!this.activeFilters.vibration.includes(vibration)) {
-                    return false;
-                }
+            if (data.next_cursor) {
+                button.dataset.cursor = data.next_cursor;
+                button.disabled = false;
+            } else {
+                button.remove();
             }
-            
-            if (this.activeFilters.types.length > 0) {
-                const hasNew = card.dataset.isNew === 'True';
-                const hasSale = card.dataset.isSale === 'True';
-                const hasTop = card.dataset.isTop === 'True';
-                
-                const matchTypes = this.activeFilters.types.some(type => {
-                    if (type === 'new') return hasNew;
-                    if (type === 'sale') return hasSale;
-                    if (type === 'top') return hasTop;
-                    return false;
-                });
-                
-                if (!matchTypes) return false;
-            }
-            
-            return true;
-        });
+        } catch (error) {
+            console.error('Error loading products:', error);
+            this.showToast('Не вдалося завантажити товари', 'error');
+            button.disabled = false;
+        }
     }
     
-    sortProducts(cards) {
-        const sorted = [...cards];
-        
-        switch (this.currentSort) {
-            case 'price_asc':
-                sorted.sort((a, b) => parseFloat(a.dataset.salePrice) - parseFloat(b.dataset.salePrice));
-                break;
-            case 'price_desc':
-                sorted.sort((a, b) => parseFloat(b.dataset.salePrice) - parseFloat(a.dataset.salePrice));
-                break;
-            case 'name':
-                sorted.sort((a, b) => a.dataset.name.localeCompare(b.dataset.name));
-                break;
-            case 'popular':
-                sorted.sort((a, b) => {
-                    const aTop = a.dataset.isTop === 'True' ? 1 : 0;
-                    const bTop = b.dataset.isTop === 'True' ? 1 : 0;
-                    return bTop - aTop;
-                });
-                break;
-            case 'new':
-                sorted.sort((a, b) => {
-                    const aNew = a.dataset.isNew === 'True' ? 1 : 0;
-                    const bNew = b.dataset.isNew === 'True' ? 1 : 0;
-                    return bNew - aNew;
-                });
-                break;
+    // Екранує і лапки: значення вставляються також в атрибути (src, alt, href)
+    escapeHtml(value) {
+        const entities = { '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;' };
+        return (value == null ? '' : String(value)).replace(/[&<>"']/g, (char) => entities[char]);
+    }
+    
+    createProductCard(product) {
+        const name = this.escapeHtml(product.name);
+        const url = this.escapeHtml(product.url);
+        const imageHtml = product.image
+            ? `<img src="${this.escapeHtml(product.image)}" alt="${name}" loading="lazy" class="product-card__image" width="300" height="300">`
+            : '<div class="product-card__placeholder">📦</div>';
+        
+        let badgesHtml = '';
+        if (product.is_sale && product.sale_end_timestamp) {
+            badgesHtml += `<div class="sale-countdown" data-countdown="${this.escapeHtml(product.sale_end_timestamp)}">Завантаження...</div>`;
+        }
+        if (product.is_new) {
+            badgesHtml += '<span class="product-badge product-badge--new">NEW</span>';
+        }
+        if (product.is_top) {
+            badgesHtml += '<span class="product-badge product-badge--hit">ХІТ</span>';
         }
         
-        return sorted;
+        const priceHtml = product.is_sale && product.sale_price
+            ? `<span class="product-card__price-current">${this.escapeHtml(product.sale_price)} ₴</span>
+               <span class="product-card__price-old">${this.escapeHtml(product.retail_price)} ₴</span>`
+            : `<span class="product-card__price-current">${this.escapeHtml(product.retail_price)} ₴</span>`;
+        
+        const buttonHtml = product.is_in_stock
+            ? `<button type="button" class="product-card__add-cart" data-product-id="${this.escapeHtml(product.id)}">До кошика</button>`
+            : '<button type="button" class="product-card__add-cart product-card__add-cart--disabled" disabled>Немає в наявності</button>';
+        
+        return `
+            <article class="product-card">
+                <div class="product-card__media">
+                    <a href="${url}">${imageHtml}</a>
+                    <button type="button" class="product-card__wishlist" data-product-id="${this.escapeHtml(product.id)}" aria-label="Додати в обране" title="Додати в обране">
+                        <span class="product-card__wishlist-icon">♡</span>
+                    </button>
+                    <div class="product-card__badges">${badgesHtml}</div>
+                </div>
+                <div class="product-card__content">
+                    <h3 class="product-card__name">
+                        <a href="${url}" class="product-card__link">${name}</a>
+                    </h3>
+                    <div class="product-card__price">${priceHtml}</div>
+                </div>
+                <div class="product-card__actions">${buttonHtml}</div>
+            </article>
+        `;
     }
     
-    displayProducts(products) {
-        if (!this.productsGrid) return;
-        
-        this.productsGrid.innerHTML = '';
-        products.forEach(card => {
-            this.productsGrid.appendChild(card.cloneNode(true));
-        });
-        
+    initProductCards() {
         if (window.cartHandler) {
             window.cartHandler.bindCartButtons();
         }
-        
-        this.toggleEmptyState(products.length === 0);
-        this.hidePagination(products.length !== this.originalCards.length);
+        if (window.wishlistManager) {
+            window.wishlistManager.initializeWishlistState();
+        }
     }
     
     updateActiveFiltersDisplay() {
@@ -319,13 +270,9 @@ class CatalogManager {
         const hasActiveFilters = 
             this.activeFilters.price.min > 0 || 
             this.activeFilters.price.max < Infinity ||
-            this.activeFilters.availability.length > 0 ||
-            this.activeFilters.brands.length > 0 ||
-            this.activeFilters.power.length > 0 ||
-            this.activeFilters.waterproof.length > 0 ||
-            this.activeFilters.vibration.length > 0 ||
-            this.activeFilters.types.length > 0 ||
-            this.currentSort !== 'default';
+            this.activeFilters.subcategories.length > 0 ||
+            this.activeFilters.badges.length > 0 ||
+            this.activeFilters.attributes.length > 0;
         
         if (!hasActiveFilters) {
             this.activeFiltersContainer.classList.add('hidden');
@@ -339,88 +286,60 @@ class CatalogManager {
             this.createFilterChip('price', `Ціна: ${this.activeFilters.price.min || 0} - ${this.activeFilters.price.max === Infinity ? '∞' : this.activeFilters.price.max} ₴`);
         }
         
-        this.activeFilters.availability.forEach(value => {
-            this.createFilterChip('availability', value === 'in_stock' ? 'В наявності' : 'Під замовлення');
-        });
-        
-        this.activeFilters.brands.forEach(brand => {
-            const shortName = brand.split(' (')[0];
-            this.createFilterChip('brand', shortName);
-        });
-        
-        this.activeFilters.power.forEach(power => {
-            const powerLabels = {
-                'вбудовані акумулятори': 'Акумулятор',
-                'батарейки': 'Батарейки',
-                'від мережі 220V': 'Мережа 220V'
-            };
-            this.createFilterChip('power', powerLabels[power] || power);
-        });
-        
-        this.activeFilters.waterproof.forEach(waterproof => {
-            const waterproofLabels = {
-                'можна занурювати': 'Повністю водостійкий',
-                'водостійка': 'Водостійкий',
-                'захист від бризок': 'Захист від бризок'
-            };
-            this.createFilterChip('waterproof', waterproofLabels[waterproof] || waterproof);
+        this.filters.subcategories.forEach(cb => {
+            if (cb.checked) {
+                this.createFilterChip('sub', cb.closest('label')?.textContent.trim() || cb.value, cb.value);
+            }
         });
         
-        this.activeFilters.vibration.forEach(vibration => {
-            this.createFilterChip('vibration', vibration === 'так' ? 'З вібрацією' : 'Без вібрації');
+        this.filters.badges.forEach(cb => {
+            if (cb.checked) {
+                this.createFilterChip('badge', cb.closest('label')?.textContent.trim() || cb.value, cb.value);
+            }
         });
         
-        this.activeFilters.types.forEach(type => {
-            const typeLabels = {
-                'new': 'Новинки',
-                'sale': 'Акційні',
-                'top': 'Хіти продажу'
-            };
-            this.createFilterChip('type', typeLabels[type]);
+        this.filters.attributes.forEach(cb => {
+            if (cb.checked) {
+                this.createFilterChip('attr', cb.value.replace('=', ': '), cb.value);
+            }
         });
     }
     
-    createFilterChip(filterType, text) {
+    createFilterChip(filterType, text, value = null) {
         const chip = document.createElement('div');
         chip.className = 'filter-chip';
         chip.innerHTML = `
-            <span>${text}</span>
+            <span>${this.escapeHtml(text)}</span>
             <button type="button" class="filter-chip__remove" aria-label="Видалити фільтр">✕</button>
         `;
         
         chip.querySelector('.filter-chip__remove').addEventListener('click', () => {
-            this.removeFilter(filterType, text);
+            this.removeFilter(filterType, value);
         });
         
         this.activeFiltersContainer.appendChild(chip);
     }
     
-    removeFilter(filterType, text) {
+    removeFilter(filterType, value) {
         switch (filterType) {
             case 'price':
                 if (this.filters.priceMin) this.filters.priceMin.value = '';
                 if (this.filters.priceMax) this.filters.priceMax.value = '';
                 break;
-            case 'availability':
-                this.filters.availability.forEach(cb => {
-                    if ((cb.value === 'in_stock' && text === 'В наявності') || 
-                        (cb.value === 'out_of_stock' && text === 'Під замовлення')) {
-                        cb.checked = false;
-                    }
+            case 'sub':
+                this.filters.subcategories.forEach(cb => {
+                    if (cb.value === value) cb.checked = false;
                 });
                 break;
-            case 'brand':
-                this.filters.brands.forEach(cb => {
-                    if (cb.value.startsWith(text)) cb.checked = false;
+            case 'badge':
+                this.filters.badges.forEach(cb => {
+                    if (cb.value === value) cb.checked = false;
                 });
                 break;
-            case 'power':
-            case 'waterproof':
-            case 'vibration':
-                this.filters[filterType].forEach(cb => cb.checked = false);
-                break;
-            case 'type':
-                this.filters.types.forEach(cb => cb.checked = false);
+            case 'attr':
+                this.filters.attributes.forEach(cb => {
+                    if (cb.value === value) cb.checked = false;
+                });
                 break;
         }
         
@@ -431,21 +350,8 @@ class CatalogManager {
         if (this.filters.priceMin) this.filters.priceMin.value = '';
         if (this.filters.priceMax) this.filters.priceMax.value = '';
         
-        const allCheckboxes = [
-            ...this.filters.availability,
-            ...this.filters.brands,
-            ...this.filters.power,
-            ...this.filters.waterproof,
-            ...this.filters.vibration,
-            ...this.filters.types
-        ];
-        
-        allCheckboxes.forEach(cb => cb.checked = false);
-        
+        [...this.filters.subcategories, ...this.filters.badges, ...this.filters.attributes].forEach(cb => cb.checked = false);
         this.currentSort = 'default';
-        if (this.sortSelectBtn) {
-            this.sortSelectBtn.querySelector('.sort-select-text').textContent = 'Сортувати';
-        }
         
         this.applyFilters();
     }
@@ -468,16 +374,6 @@ class CatalogManager {
         }
     }
     
-    toggleEmptyState(show) {
-        const emptyState = document.querySelector('.empty-state');
-        if (emptyState) {
-            emptyState.style.display = show ? 'flex' : 'none';
-        }
-        if (this.productsGrid) {
-            this.productsGrid.style.display = show ? 'none' : 'grid';
-        }
-    }
-    
     hidePagination(hide) {
         const pagination = document.querySelector('.pagination');
         if (pagination) {
@@ -627,23 +523,10 @@ class CatalogManager {
             window.Toast.show(message, type);
         }
     }
-    
-    
-    debounce(func, wait) {
-        let timeout;
-        return function executedFunction(...args) {
-            const later = () => {
-                clearTimeout(timeout);
-                func(...args);
-            };
-            clearTimeout(timeout);
-            timeout = setTimeout(later, wait);
-        };
-    }
 }
 
 document.addEventListener('DOMContentLoaded', () => {
-    if (document.getElementById('productsGrid')) {
+    if (document.querySelector('.filters-bar')) {
         new CatalogManager();
     }
 });